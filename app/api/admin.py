@@ -0,0 +1,83 @@
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+
+from app.config import ADMIN_TOKEN
+from app.services.memory_profile import memory_profiler
+
+
+def require_admin(authorization: Optional[str] = Header(None)) -> None:
+    """
+    Require the `Authorization: Bearer <ADMIN_TOKEN>` header.
+
+    Raises:
+        HTTPException:
+            - 401 if the token is missing or wrong
+            - 403 if ADMIN_TOKEN is not set
+    """
+    if not ADMIN_TOKEN:
+        raise HTTPException(
+            status_code=403,
+            detail="Admin endpoints are disabled, set ADMIN_TOKEN to enable them",
+        )
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(
+        token.encode(), ADMIN_TOKEN.encode()
+    ):
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid admin token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+# Operational endpoints, hidden from the schema and therefore from MCP tools
+router = APIRouter(
+    prefix="/admin",
+    tags=["admin"],
+    include_in_schema=False,
+    dependencies=[Depends(require_admin)],
+)
+
+
+def require_memory_profiling() -> None:
+    if not memory_profiler.enabled:
+        raise HTTPException(
+            status_code=404,
+            detail="Memory profiling is disabled, start the server with "
+            "MEMORY_PROFILING=1",
+        )
+
+
+@router.get("/memory-profile")
+def get_memory_profile(top: int = Query(10, ge=1, le=100)):
+    """
+    Report the memory profile of each operation since the last reset.
+
+    Parameters:
+        top (int): Number of call sites to list per stage (default: 10)
+
+    Returns:
+        dict: Peak allocation per operation, and for each stage (`hydrate`,
+            `serialize`, `encode`) the memory it retained by library and its
+            top allocating call sites
+
+    Raises:
+        HTTPException: 404 if memory profiling is disabled
+    """
+    require_memory_profiling()
+    return memory_profiler.report(top)
+
+
+@router.delete("/memory-profile", status_code=204)
+def reset_memory_profile():
+    """
+    Discard the memory profiles collected so far.
+
+    Raises:
+        HTTPException: 404 if memory profiling is disabled
+    """
+    require_memory_profiling()
+    memory_profiler.reset()
+    return Response(status_code=204)
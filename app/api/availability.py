@@ -0,0 +1,176 @@
+import datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.config import AVAILABILITY_MAX_SKIP, MAX_PAGE_SIZE
+from app.database.connection import get_db, get_write_db
+from app.schemas.schemas import InventoryDay, InventoryUpdate, ItineraryAvailability
+from app.services import events
+from app.services.availability_service import AvailabilityService
+
+router = APIRouter(
+    prefix="/availability",
+    tags=["availability"],
+    responses={404: {"description": "Not found"}},
+)
+
+
+@router.get(
+    "/itineraries",
+    response_model=List[ItineraryAvailability],
+    operation_id="Find_Available_Itineraries",
+)
+def find_available_itineraries(
+    start_date: datetime.date,
+    party_size: int = Query(1, ge=1),
+    rooms: Optional[int] = Query(None, ge=1),
+    region: Optional[str] = None,
+    min_nights: Optional[int] = None,
+    max_nights: Optional[int] = None,
+    recommended: Optional[bool] = None,
+    skip: int = Query(0, ge=0, le=AVAILABILITY_MAX_SKIP),
+    limit: int = Query(min(100, MAX_PAGE_SIZE), ge=0, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+):
+    """
+    Find the itineraries that can start on a date for a party, with their
+    price on those dates, cheapest first.
+
+    Parameters:
+        start_date (date): First night of the trip
+        party_size (int): Number of guests (default: 1)
+        rooms (int, optional): Hotel rooms needed each night (default: one per
+            two guests)
+        region (str, optional): Filter itineraries by region
+        min_nights (int, optional): Filter itineraries with duration >= min_nights
+        max_nights (int, optional): Filter itineraries with duration <= max_nights
+        recommended (bool, optional): Filter by recommended status
+        skip (int): Number of results to skip for pagination (default: 0, at
+            most AVAILABILITY_MAX_SKIP)
+        limit (int): Maximum number of results to return (default: 100, at most
+            MAX_PAGE_SIZE)
+        db (Session): Database session dependency
+
+    Returns:
+        List[ItineraryAvailability]: Itineraries whose hotels have enough rooms
+            every night and whose activities have enough places, priced with
+            the rates of those dates
+    """
+    return AvailabilityService.find_available_itineraries(
+        db,
+        start_date,
+        party_size,
+        rooms=rooms,
+        region=region,
+        min_nights=min_nights,
+        max_nights=max_nights,
+        recommended=recommended,
+        skip=skip,
+        limit=limit,
+    )
+
+
+@router.get(
+    "/itineraries/{itinerary_id}",
+    response_model=List[ItineraryAvailability],
+    operation_id="Get_Itinerary_Availability",
+)
+def get_itinerary_availability(
+    itinerary_id: int,
+    from_date: datetime.date,
+    to_date: datetime.date,
+    party_size: int = Query(1, ge=1),
+    rooms: Optional[int] = Query(None, ge=1),
+    db: Session = Depends(get_db),
+):
+    """
+    Availability calendar of an itinerary: whether it can start on each date
+    of a range, and its price when it can.
+
+    Parameters:
+        itinerary_id (int): The ID of the itinerary
+        from_date (date): First start date to check
+        to_date (date): Last start date to check (inclusive)
+        party_size (int): Number of guests (default: 1)
+        rooms (int, optional): Hotel rooms needed each night (default: one per
+            two guests)
+        db (Session): Database session dependency
+
+    Returns:
+        List[ItineraryAvailability]: One entry per start date, listing the
+            hotel nights and activities without enough rooms or places
+
+    Raises:
+        HTTPException:
+            - 400 if the date range is empty or longer than AVAILABILITY_MAX_DAYS
+            - 404 if itinerary with specified ID does not exist
+    """
+    try:
+        calendar = AvailabilityService.get_itinerary_availability(
+            db, itinerary_id, from_date, to_date, party_size, rooms=rooms
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if calendar is None:
+        raise HTTPException(status_code=404, detail="Itinerary not found")
+    return calendar
+
+
+def add_inventory_routes(
+    entity: str, singular: str, plural: str, unit: str, price_unit: str
+) -> None:
+    """
+    Add the endpoints reading and setting the dated inventory of hotels or
+    activities, e.g. `Get_Hotel_Inventory` and `Set_Hotel_Inventory`.
+    """
+
+    @router.get(
+        f"/{plural}/{{entity_id}}",
+        response_model=List[InventoryDay],
+        operation_id=f"Get_{singular}_Inventory",
+        summary=f"Get {singular} Inventory",
+        description=f"Retrieve the {unit} available and the price ({price_unit}) "
+        f"of a {singular.lower()} on each date between `from_date` and `to_date` "
+        "(inclusive). Dates without inventory are not bookable and omitted.",
+    )
+    def get_inventory(
+        entity_id: int,
+        from_date: datetime.date,
+        to_date: datetime.date,
+        db: Session = Depends(get_db),
+    ):
+        try:
+            return AvailabilityService.get_inventory(
+                db, entity, entity_id, from_date, to_date
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    @router.put(
+        f"/{plural}/{{entity_id}}",
+        response_model=List[InventoryDay],
+        operation_id=f"Set_{singular}_Inventory",
+        summary=f"Set {singular} Inventory",
+        description=f"Set the {unit} available and the price ({price_unit}) of "
+        f"a {singular.lower()} on every date from `start_date` to `end_date` "
+        f"(inclusive). Returns 404 if the {singular.lower()} does not exist.",
+    )
+    def set_inventory(
+        entity_id: int, update: InventoryUpdate, db: Session = Depends(get_write_db)
+    ):
+        try:
+            inventory = AvailabilityService.set_inventory(db, entity, entity_id, update)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except SQLAlchemyError as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        if inventory is None:
+            raise HTTPException(status_code=404, detail=f"{singular} not found")
+        return inventory
+
+
+add_inventory_routes(events.HOTEL, "Hotel", "hotels", "rooms", "per room per night")
+add_inventory_routes(events.ACTIVITY, "Activity", "activities", "places", "per person")
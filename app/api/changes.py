@@ -0,0 +1,118 @@
+import asyncio
+import json
+from typing import AsyncIterator, List, Optional
+
+from fastapi import APIRouter, Depends, Header, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.config import CHANGE_STREAM_HEARTBEAT, MAX_PAGE_SIZE
+from app.database.connection import SessionLocal, get_db
+from app.schemas.schemas import ChangePage
+from app.services.change_feed import ChangeFeedService, change_notifier
+
+ENTITY_DESCRIPTION = (
+    "Only return changes of these entity types: `itinerary`, `location`, "
+    "`hotel`, `transfer`, `activity`, `hotel_inventory`, `activity_inventory`."
+)
+
+router = APIRouter(prefix="/changes", tags=["changes"])
+
+
+@router.get("/", response_model=ChangePage, operation_id="Get_Changes")
+def get_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(min(100, MAX_PAGE_SIZE), ge=1, le=MAX_PAGE_SIZE),
+    entity: Optional[List[str]] = Query(None, description=ENTITY_DESCRIPTION),
+    db: Session = Depends(get_db),
+):
+    """
+    Retrieve the changes committed after a sequence number, oldest first, to
+    sync a copy of the catalog incrementally instead of re-reading it.
+
+    Parameters:
+        since (int): Sequence number of the last change already processed
+            (default: 0, from the beginning)
+        limit (int): Maximum number of changes to return (default: 100, at most
+            MAX_PAGE_SIZE)
+        entity (List[str], optional): Only return changes of these entity types
+        db (Session): Database session dependency
+
+    Returns:
+        ChangePage: The changes (entity type, ID, `create` or `update`), the
+            `next_since` to pass to the next call, and whether more changes are
+            already available
+    """
+    return ChangeFeedService.get_changes(db, since=since, limit=limit, entities=entity)
+
+
+def _read_changes(since: int, entities: Optional[List[str]]) -> dict:
+    db = SessionLocal()
+    try:
+        return ChangeFeedService.get_changes(
+            db, since=since, limit=MAX_PAGE_SIZE, entities=entities
+        )
+    finally:
+        db.close()
+
+
+def _latest_seq() -> int:
+    db = SessionLocal()
+    try:
+        return ChangeFeedService.latest_seq(db)
+    finally:
+        db.close()
+
+
+async def _change_events(
+    request: Request, since: int, entities: Optional[List[str]]
+) -> AsyncIterator[str]:
+    wakeup = change_notifier.subscribe()
+    try:
+        while not await request.is_disconnected():
+            # Cleared before reading, so a change committed during the read
+            # wakes the next wait
+            wakeup.clear()
+            page = await run_in_threadpool(_read_changes, since, entities)
+            for change in page["changes"]:
+                data = json.dumps(jsonable_encoder(change))
+                yield f"id: {change['seq']}\nevent: change\ndata: {data}\n\n"
+            since = page["next_since"]
+            if page["has_more"]:
+                continue
+            try:
+                await asyncio.wait_for(wakeup.wait(), CHANGE_STREAM_HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+    finally:
+        change_notifier.unsubscribe(wakeup)
+
+
+# Streams are long-lived, so they are not exposed as an MCP tool. The rate
+# limiter caps the number a client may keep open (see HIDDEN_OPERATIONS).
+@router.get("/stream", include_in_schema=False, operation_id="Stream_Changes")
+async def stream_changes(
+    request: Request,
+    since: Optional[int] = Query(None, ge=0),
+    entity: Optional[List[str]] = Query(None),
+    last_event_id: Optional[str] = Header(None),
+):
+    """
+    Stream changes as Server-Sent Events, each with the change as JSON data
+    and its sequence number as event ID. Starts after `since`, or after the
+    `Last-Event-ID` of a reconnecting client, or else with new changes only.
+    A client may keep CHANGE_STREAM_LIMIT streams open; more get 429.
+    """
+    if since is None:
+        if last_event_id is not None and last_event_id.isdigit():
+            since = int(last_event_id)
+        else:
+            since = await run_in_threadpool(_latest_seq)
+
+    return StreamingResponse(
+        _change_events(request, since, entity),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
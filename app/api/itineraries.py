@@ -1,13 +1,341 @@
-from typing import List, Optional
+import asyncio
+from typing import Any, Dict, Iterator, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-from app.database.connection import get_db
+from app.api.responses import get_response_format, render, render_stream
+from app.config import (
+    MAX_PAGE_SIZE,
+    MAX_RESPONSE_ROWS,
+    STREAM_CHUNK_SIZE,
+    STREAM_RESPONSE_ROWS,
+    WRITE_BEHIND,
+    WRITE_WAIT_TIMEOUT,
+)
+from app.database.connection import SessionLocal, get_db, get_write_db
 from app.schemas.schemas import Itinerary as ItinerarySchema
-from app.schemas.schemas import ItineraryCreate, ItineraryDetailed
-from app.services.itinerary_service import ItineraryService
+from app.schemas.schemas import (
+    ItineraryBatchItem,
+    ItineraryCreate,
+    ItineraryDetailed,
+    ItinerarySortField,
+    ItineraryWriteTicket,
+    RankedItinerary,
+    ResponseFormat,
+    ResponseShape,
+    SortOrder,
+    TransferTypeEnum,
+)
+from app.services.cache import track_cache_lookups
+from app.services.idempotency import (
+    CreateRequestKeys,
+    IdempotencyKeyConflict,
+    find_itinerary_id,
+)
+from app.services.itinerary_service import ItineraryService, ListingPage
+from app.services.memory_profile import profile_stage
+from app.services.projection import ItineraryProjection
+from app.services.ranking_service import RankingService, read_counter
+from app.services.reference_service import MissingReferences
+from app.services.serialization import (
+    normalize_itineraries,
+    serialize_itineraries,
+    side_tables,
+)
+from app.services.single_flight import itinerary_reads
+from app.services.write_queue import WriteQueueFull, itinerary_write_queue
+
+FIELDS_DESCRIPTION = (
+    "Columns to return, e.g. `name` or nested `activities.name`. "
+    "Omit together with `expand` to return the full itinerary."
+)
+EXPAND_DESCRIPTION = (
+    "Relationships to load and return: `days`, `transfer`, `hotel_stay`, "
+    "`activities`. Omit together with `fields` to return the full itinerary."
+)
+
+
+def get_projection(
+    fields: Optional[List[str]] = Query(None, description=FIELDS_DESCRIPTION),
+    expand: Optional[List[str]] = Query(None, description=EXPAND_DESCRIPTION),
+) -> Optional[ItineraryProjection]:
+    """
+    Build the sparse response projection from the `fields` and `expand`
+    query parameters.
+
+    Raises:
+        HTTPException: 400 if an unknown field or relationship is requested
+    """
+    try:
+        return ItineraryProjection.from_params(fields=fields, expand=expand)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def check_shape(
+    projection: Optional[ItineraryProjection], shape: ResponseShape
+) -> None:
+    """
+    Raises:
+        HTTPException: 400 if a sparse projection is combined with the
+            normalized shape
+    """
+    if shape == ResponseShape.NORMALIZED and projection is not None:
+        raise HTTPException(
+            status_code=400,
+            detail="fields/expand cannot be combined with the normalized shape",
+        )
+
+
+def build_content(
+    db: Session,
+    itineraries: list,
+    projection: Optional[ItineraryProjection],
+    shape: ResponseShape,
+    single: bool = False,
+):
+    """
+    Build the JSON-compatible content of itineraries according to the
+    requested projection and shape.
+
+    Raises:
+        HTTPException: 400 if a sparse projection is combined with the
+            normalized shape
+    """
+    check_shape(projection, shape)
+    if shape == ResponseShape.NORMALIZED:
+        return normalize_itineraries(db, itineraries)
+
+    if projection is not None:
+        content = [projection.dump(itinerary) for itinerary in itineraries]
+    else:
+        content = serialize_itineraries(db, itineraries)
+
+    return content[0] if single else content
+
+
+def read_key(
+    kind: str,
+    params: tuple,
+    projection: Optional[ItineraryProjection],
+    shape: ResponseShape,
+) -> tuple:
+    """
+    Single-flight key of a read. The response format is not part of the key,
+    since only the final encoding depends on it.
+    """
+    return (kind, params, projection.key() if projection else None, shape)
+
+
+def stream_itineraries(
+    itinerary_ids: List[int],
+    projection: Optional[ItineraryProjection],
+    shape: ResponseShape = ResponseShape.NESTED,
+    tables: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> Iterator[list]:
+    """
+    Load and serialize itineraries, STREAM_CHUNK_SIZE at a time, so only one
+    chunk is held in memory. With the normalized shape, the entities the
+    chunks reference are added to the side `tables`, which are bounded by the
+    reference data rather than by the number of itineraries.
+
+    Uses a session of its own: the request's session is closed before a
+    streamed body is sent.
+    """
+    db = SessionLocal()
+    try:
+        for start in range(0, len(itinerary_ids), STREAM_CHUNK_SIZE):
+            with profile_stage("hydrate"):
+                itineraries = ItineraryService.load_itineraries(
+                    db, itinerary_ids[start : start + STREAM_CHUNK_SIZE], projection
+                )
+            with profile_stage("serialize"):
+                if shape == ResponseShape.NORMALIZED:
+                    content = normalize_itineraries(db, itineraries, tables)[
+                        "itineraries"
+                    ]
+                else:
+                    content = build_content(db, itineraries, projection, shape)
+            yield content
+            # Release the loaded rows before the next chunk
+            db.expunge_all()
+    finally:
+        db.close()
+
+
+def check_listing_size(
+    page: ListingPage,
+    projection: Optional[ItineraryProjection],
+    shape: ResponseShape,
+) -> int:
+    """
+    Estimate the number of rows a listing response holds.
+
+    Raises:
+        HTTPException: 400 if the estimate exceeds MAX_RESPONSE_ROWS
+    """
+    rows = ItineraryService.estimate_response_rows(page, projection, shape)
+    if rows > MAX_RESPONSE_ROWS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Response too large: about {rows} rows, at most "
+            f"{MAX_RESPONSE_ROWS} allowed. Lower `limit`, narrow the filters "
+            "or select fewer relationships with `fields`/`expand`.",
+        )
+    return rows
+
+
+def read_listing(
+    db: Session,
+    page: ListingPage,
+    filters: dict,
+    projection: Optional[ItineraryProjection],
+    shape: ResponseShape,
+):
+    """
+    Build the content of a listing page. Identical concurrent requests share
+    one query and serialization.
+    """
+
+    def read():
+        with profile_stage("hydrate"):
+            itineraries = ItineraryService.load_itineraries(db, page.ids, projection)
+        with profile_stage("serialize"):
+            return build_content(db, itineraries, projection, shape)
+
+    key = read_key("list", ItineraryService.listing_key(**filters), projection, shape)
+    return itinerary_reads.do(key, read)
+
+
+def read_itinerary(
+    db: Session,
+    itinerary_id: int,
+    projection: Optional[ItineraryProjection],
+    shape: ResponseShape,
+):
+    """
+    Build the content of one itinerary. Identical concurrent requests share
+    one query and serialization.
+
+    Raises:
+        HTTPException: 404 if the itinerary does not exist
+    """
+
+    def read():
+        with profile_stage("hydrate"):
+            itinerary = ItineraryService.get_itinerary_by_id(
+                db, itinerary_id, projection
+            )
+        if itinerary is None:
+            return None
+        with profile_stage("serialize"):
+            return build_content(db, [itinerary], projection, shape, single=True)
+
+    key = read_key("detail", (itinerary_id,), projection, shape)
+    content = itinerary_reads.do(key, read)
+    if content is None:
+        raise HTTPException(status_code=404, detail="Itinerary not found")
+    read_counter.add([itinerary_id])
+    return content
+
+
+def read_batch(
+    db: Session,
+    itinerary_ids: List[int],
+    projection: Optional[ItineraryProjection],
+    shape: ResponseShape,
+):
+    """
+    Build the content of a batch lookup: one item per requested ID, in
+    request order, marking the IDs that don't exist. The itineraries are
+    loaded and serialized together, with a fixed number of queries however
+    many IDs are requested. Identical concurrent requests share the work.
+
+    Raises:
+        HTTPException: 400 if the response is estimated to hold more than
+            MAX_RESPONSE_ROWS rows
+    """
+    unique_ids = list(dict.fromkeys(itinerary_ids))
+    check_listing_size(
+        ListingPage(unique_ids, *ItineraryService.count_nested_rows(db, unique_ids)),
+        projection,
+        shape,
+    )
+
+    def read():
+        with profile_stage("hydrate"):
+            itineraries = ItineraryService.load_itineraries(db, unique_ids, projection)
+        with profile_stage("serialize"):
+            content = build_content(db, itineraries, projection, shape)
+        found = dict(
+            zip(
+                (itinerary.id for itinerary in itineraries),
+                (
+                    content["itineraries"]
+                    if shape == ResponseShape.NORMALIZED
+                    else content
+                ),
+            )
+        )
+        items = [
+            {"id": i, "found": i in found, "itinerary": found.get(i)}
+            for i in itinerary_ids
+        ]
+        if shape == ResponseShape.NORMALIZED:
+            return {**content, "itineraries": items}
+        return items
+
+    key = read_key("batch", tuple(itinerary_ids), projection, shape)
+    content = itinerary_reads.do(key, read)
+    items = content["itineraries"] if shape == ResponseShape.NORMALIZED else content
+    read_counter.add({item["id"] for item in items if item["found"]})
+    return content
+
+
+def read_recommended(
+    db: Session,
+    filters: dict,
+    projection: Optional[ItineraryProjection],
+):
+    """
+    Build the content of a page of the recommendation ranking. Identical
+    concurrent requests share one query and serialization.
+    """
+
+    def read():
+        rankings = RankingService.get_top_ranked(db, **filters)
+        with profile_stage("hydrate"):
+            itineraries = ItineraryService.load_itineraries(
+                db, [r.itinerary_id for r in rankings], projection
+            )
+        with profile_stage("serialize"):
+            content = build_content(db, itineraries, projection, ResponseShape.NESTED)
+        by_id = dict(zip((itinerary.id for itinerary in itineraries), content))
+        return [
+            {
+                "rank": r.rank,
+                "score": r.score,
+                "popularity": r.popularity,
+                "value": r.value,
+                "diversity": r.diversity,
+                "price_per_night": r.price_per_night,
+                "itinerary": by_id[r.itinerary_id],
+            }
+            # An itinerary deleted since the last rebuild is skipped
+            for r in rankings
+            if r.itinerary_id in by_id
+        ]
+
+    key = read_key(
+        "recommended", tuple(filters.items()), projection, ResponseShape.NESTED
+    )
+    return itinerary_reads.do(key, read)
+
 
 router = APIRouter(
     prefix="/itineraries",
@@ -19,13 +347,24 @@ router = APIRouter(
 @router.get(
     "/", response_model=List[ItinerarySchema], operation_id="Get_All_Itineraries"
 )
-async def get_itineraries(
+def get_itineraries(
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(min(100, MAX_PAGE_SIZE), ge=0, le=MAX_PAGE_SIZE),
     region: Optional[str] = None,
     min_nights: Optional[int] = None,
     max_nights: Optional[int] = None,
     recommended: Optional[bool] = None,
+    regions: Optional[List[str]] = Query(None),
+    location_id: Optional[int] = None,
+    hotel_id: Optional[int] = None,
+    min_hotel_rating: Optional[float] = None,
+    activity_id: Optional[int] = None,
+    transfer_type: Optional[TransferTypeEnum] = None,
+    sort_by: ItinerarySortField = ItinerarySortField.ID,
+    sort_order: SortOrder = SortOrder.ASC,
+    projection: Optional[ItineraryProjection] = Depends(get_projection),
+    shape: ResponseShape = ResponseShape.NESTED,
+    format: ResponseFormat = Depends(get_response_format),
     db: Session = Depends(get_db),
 ):
     """
@@ -33,25 +372,193 @@ async def get_itineraries(
 
     Parameters:
         skip (int): Number of records to skip for pagination (default: 0)
-        limit (int): Maximum number of records to return (default: 100)
+        limit (int): Maximum number of records to return (default: 100, at most
+            MAX_PAGE_SIZE)
         region (str, optional): Filter itineraries by region
         min_nights (int, optional): Filter itineraries with duration >= min_nights
         max_nights (int, optional): Filter itineraries with duration <= max_nights
         recommended (bool, optional): Filter by recommended status
+        regions (List[str], optional): Filter itineraries in any of the given regions
+        location_id (int, optional): Filter itineraries staying at or visiting an
+            activity in the location
+        hotel_id (int, optional): Filter itineraries with a stay at the hotel
+        min_hotel_rating (float, optional): Filter itineraries whose hotels are all
+            rated >= min_hotel_rating
+        activity_id (int, optional): Filter itineraries including the activity
+        transfer_type (TransferTypeEnum, optional): Filter itineraries with a
+            transfer of the given type
+        sort_by (ItinerarySortField): Field to sort by (default: id)
+        sort_order (SortOrder): Sort direction, asc or desc (default: asc)
+        fields (List[str], optional): Columns to return (sparse response)
+        expand (List[str], optional): Relationships to return (sparse response)
+        shape (ResponseShape): `nested` (default) or `normalized`, which returns
+            referenced hotels, transfers and activities once in side tables
+        format (ResponseFormat, optional): `json` or `msgpack`, defaults to the
+            Accept header
         db (Session): Database session dependency
 
     Returns:
-        List[ItinerarySchema]: List of matching itineraries
+        List[ItinerarySchema]: List of matching itineraries. Large responses
+            are streamed in chunks.
+
+    Raises:
+        HTTPException: 400 if the response is estimated to hold more than
+            MAX_RESPONSE_ROWS rows
     """
-    return ItineraryService.get_itineraries(
-        db=db,
+    filters = dict(
         skip=skip,
         limit=limit,
         region=region,
         min_nights=min_nights,
         max_nights=max_nights,
         recommended=recommended,
+        regions=regions,
+        location_id=location_id,
+        hotel_id=hotel_id,
+        min_hotel_rating=min_hotel_rating,
+        activity_id=activity_id,
+        transfer_type=transfer_type,
+        sort_by=sort_by,
+        sort_order=sort_order,
+    )
+
+    with track_cache_lookups() as stats:
+        page = ItineraryService.get_listing_page(db, **filters)
+        rows = check_listing_size(page, projection, shape)
+        if rows > STREAM_RESPONSE_ROWS:
+            check_shape(projection, shape)
+            if shape == ResponseShape.NORMALIZED:
+                tables = side_tables()
+                response = render_stream(
+                    stream_itineraries(page.ids, projection, shape, tables),
+                    len(page.ids),
+                    format,
+                    key="itineraries",
+                    trailer=tables,
+                )
+            else:
+                response = render_stream(
+                    stream_itineraries(page.ids, projection), len(page.ids), format
+                )
+            response.headers["X-Cache"] = "MISS"
+            return response
+
+        content = read_listing(db, page, filters, projection, shape)
+
+    with profile_stage("encode"):
+        response = render(content, format)
+    response.headers["X-Cache"] = stats.status
+    return response
+
+
+# Declared before /{itinerary_id}, which would otherwise match /batch
+@router.get(
+    "/batch",
+    response_model=List[ItineraryBatchItem],
+    operation_id="Get_Itineraries_By_IDs",
+)
+def get_itineraries_by_ids(
+    ids: List[int] = Query(..., min_length=1, max_length=MAX_PAGE_SIZE),
+    projection: Optional[ItineraryProjection] = Depends(get_projection),
+    shape: ResponseShape = ResponseShape.NESTED,
+    format: ResponseFormat = Depends(get_response_format),
+    db: Session = Depends(get_db),
+):
+    """
+    Retrieve several itineraries by their IDs in one request, e.g. to compare
+    them, instead of one Get_Itinerary_by_ID call per itinerary.
+
+    Parameters:
+        ids (List[int]): IDs of the itineraries to retrieve (at most
+            MAX_PAGE_SIZE)
+        fields (List[str], optional): Columns to return (sparse response)
+        expand (List[str], optional): Relationships to return (sparse response)
+        shape (ResponseShape): `nested` (default) or `normalized`, which returns
+            referenced hotels, transfers and activities once in side tables
+        format (ResponseFormat, optional): `json` or `msgpack`, defaults to the
+            Accept header
+        db (Session): Database session dependency
+
+    Returns:
+        List[ItineraryBatchItem]: One item per requested ID, in request order,
+            with `found` false and no itinerary for IDs that don't exist. With
+            the normalized shape, the items are under `itineraries` next to
+            the side tables.
+
+    Raises:
+        HTTPException:
+            - 400 if an unknown field or relationship is requested, if
+              fields/expand is combined with the normalized shape, or if the
+              response is estimated to hold more than MAX_RESPONSE_ROWS rows
+    """
+    with track_cache_lookups() as stats:
+        content = read_batch(db, ids, projection, shape)
+
+    with profile_stage("encode"):
+        response = render(content, format)
+    response.headers["X-Cache"] = stats.status
+    return response
+
+
+# Declared before /{itinerary_id}, which would otherwise match /recommended
+@router.get(
+    "/recommended",
+    response_model=List[RankedItinerary],
+    operation_id="Get_Recommended_Itineraries",
+)
+def get_recommended_itineraries(
+    region: Optional[str] = None,
+    min_nights: Optional[int] = None,
+    max_nights: Optional[int] = None,
+    skip: int = 0,
+    limit: int = Query(min(10, MAX_PAGE_SIZE), ge=0, le=MAX_PAGE_SIZE),
+    projection: Optional[ItineraryProjection] = Depends(get_projection),
+    format: ResponseFormat = Depends(get_response_format),
+    db: Session = Depends(get_db),
+):
+    """
+    Retrieve the best itineraries to recommend, e.g. the top 5 in a region for
+    4 to 6 nights, ranked by popularity, value for money, variety of
+    activities and editorial selection.
+
+    The ranking is precomputed periodically (every RANKING_INTERVAL seconds),
+    so recently created itineraries and recent reads are ranked at the next
+    rebuild.
+
+    Parameters:
+        region (str, optional): Only rank itineraries in the region
+        min_nights (int, optional): Only rank itineraries with duration >= min_nights
+        max_nights (int, optional): Only rank itineraries with duration <= max_nights
+        skip (int): Number of ranked itineraries to skip for pagination (default: 0)
+        limit (int): Maximum number of itineraries to return (default: 10, at
+            most MAX_PAGE_SIZE)
+        fields (List[str], optional): Columns to return (sparse response)
+        expand (List[str], optional): Relationships to return (sparse response)
+        format (ResponseFormat, optional): `json` or `msgpack`, defaults to the
+            Accept header
+        db (Session): Database session dependency
+
+    Returns:
+        List[RankedItinerary]: Itineraries in rank order, with their score, its
+            components (between 0 and 1) and their price per night
+
+    Raises:
+        HTTPException: 400 if an unknown field or relationship is requested
+    """
+    filters = dict(
+        region=region,
+        min_nights=min_nights,
+        max_nights=max_nights,
+        skip=skip,
+        limit=limit,
     )
+    with track_cache_lookups() as stats:
+        content = read_recommended(db, filters, projection)
+
+    with profile_stage("encode"):
+        response = render(content, format)
+    response.headers["X-Cache"] = stats.status
+    return response
 
 
 @router.get(
@@ -59,25 +566,67 @@ async def get_itineraries(
     response_model=ItineraryDetailed,
     operation_id="Get_Itinerary_by_ID",
 )
-async def get_itinerary(itinerary_id: int, db: Session = Depends(get_db)):
+def get_itinerary(
+    itinerary_id: int,
+    projection: Optional[ItineraryProjection] = Depends(get_projection),
+    shape: ResponseShape = ResponseShape.NESTED,
+    format: ResponseFormat = Depends(get_response_format),
+    db: Session = Depends(get_db),
+):
     """
     Retrieve detailed information for a specific itinerary by its ID.
 
     Parameters:
         itinerary_id (int): The ID of the itinerary to retrieve
+        fields (List[str], optional): Columns to return (sparse response)
+        expand (List[str], optional): Relationships to return (sparse response)
+        shape (ResponseShape): `nested` (default) or `normalized`, which returns
+            referenced hotels, transfers and activities once in side tables
+        format (ResponseFormat, optional): `json` or `msgpack`, defaults to the
+            Accept header
         db (Session): Database session dependency
 
     Returns:
         ItineraryDetailed: Detailed representation of the itinerary including related data
 
     Raises:
-        HTTPException: 404 if itinerary with specified ID does not exist
+        HTTPException:
+            - 400 if an unknown field or relationship is requested, or if
+              fields/expand is combined with the normalized shape
+            - 404 if itinerary with specified ID does not exist
     """
-    itinerary = ItineraryService.get_itinerary_by_id(db, itinerary_id)
-    if itinerary is None:
-        raise HTTPException(status_code=404, detail="Itinerary not found")
+    with track_cache_lookups() as stats:
+        content = read_itinerary(db, itinerary_id, projection, shape)
 
-    return itinerary
+    with profile_stage("encode"):
+        response = render(content, format)
+    response.headers["X-Cache"] = stats.status
+    return response
+
+
+@router.get(
+    "/writes/{ticket_id}",
+    response_model=ItineraryWriteTicket,
+    operation_id="Get_Itinerary_Write_Status",
+)
+def get_write_status(ticket_id: str):
+    """
+    Retrieve the status of a queued itinerary create (write-behind mode).
+
+    Parameters:
+        ticket_id (str): Ticket ID returned by Create_Itinerary with status 202
+
+    Returns:
+        ItineraryWriteTicket: Status of the write, with the itinerary ID once
+            it is written
+
+    Raises:
+        HTTPException: 404 if the ticket is unknown or no longer tracked
+    """
+    ticket = itinerary_write_queue.get_ticket(ticket_id)
+    if ticket is None:
+        raise HTTPException(status_code=404, detail="Write ticket not found")
+    return ticket.to_dict()
 
 
 @router.post(
@@ -85,28 +634,166 @@ async def get_itinerary(itinerary_id: int, db: Session = Depends(get_db)):
     response_model=ItineraryDetailed,
     status_code=201,
     operation_id=("Create_Itinerary"),
+    responses={
+        202: {
+            "model": ItineraryWriteTicket,
+            "description": "Queued, not yet written (write-behind mode)",
+        },
+        503: {"description": "Write queue is full, retry after `Retry-After`"},
+    },
 )
-async def create_itinerary(itinerary: ItineraryCreate, db: Session = Depends(get_db)):
+async def create_itinerary(
+    itinerary: ItineraryCreate,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
+    wait: Optional[float] = Query(None, ge=0, le=60),
+    db: Session = Depends(get_write_db),
+):
     """
     Create a new itinerary with associated days, hotel stays, and activities.
 
+    Retries are safe when an idempotency key is given, either as the
+    `Idempotency-Key` header or the `idempotency_key` field: a repeated request
+    returns the itinerary created by the first one, with an
+    `Idempotent-Replayed: true` header, instead of creating another.
+
+    In write-behind mode the create is queued and written in a batch by a
+    background writer. The request waits up to `wait` seconds for the write
+    and returns the itinerary, or returns 202 with a ticket whose status can
+    be followed with Get_Itinerary_Write_Status.
+
     Parameters:
         itinerary (ItineraryCreate): The itinerary data to create
+        idempotency_key (str, optional): Idempotency key (`Idempotency-Key` header)
+        wait (float, optional): Seconds to wait for a queued write (write-behind
+            mode only, default: WRITE_WAIT_TIMEOUT)
         db (Session): Database session dependency
 
     Returns:
         ItineraryDetailed: Created itinerary with all related entities
 
+    Raises:
+        HTTPException:
+            - 400 for validation or input errors, e.g. a hotel, transfer or
+              activity that doesn't exist
+            - 422 if the idempotency key was used with a different request
+            - 500 for database errors during creation
+            - 503 if the write queue is full
+    """
+    result, created = await create_or_raise(db, itinerary, idempotency_key, wait)
+    if isinstance(result, JSONResponse):
+        return result
+
+    # Serialized in the threadpool: validating the ORM object against the
+    # response model would lazy-load its relationships on the event loop
+    content = await run_in_threadpool(
+        build_content, db, [result], None, ResponseShape.NESTED, single=True
+    )
+    return JSONResponse(
+        status_code=201,
+        content=content,
+        headers=None if created else {"Idempotent-Replayed": "true"},
+    )
+
+
+async def create_or_raise(
+    db: Session,
+    itinerary: ItineraryCreate,
+    idempotency_key: Optional[str],
+    wait: Optional[float],
+):
+    """
+    Create an itinerary, through the write-behind queue when it is running.
+    Database work runs in the threadpool; waiting for a queued write doesn't
+    hold a thread.
+
+    Returns:
+        The itinerary and whether it was created by this request, or a 202
+        response with the write ticket if a queued write didn't finish in time
+
     Raises:
         HTTPException:
             - 400 for validation or input errors
+            - 422 if the idempotency key was used with a different request
             - 500 for database errors during creation
+            - 503 if the write queue is full
     """
+    if (
+        idempotency_key
+        and itinerary.idempotency_key
+        and idempotency_key != itinerary.idempotency_key
+    ):
+        raise HTTPException(
+            status_code=400,
+            detail="Idempotency-Key header and idempotency_key field differ",
+        )
+
     try:
-        return ItineraryService.create_itinerary(db, itinerary)
+        if WRITE_BEHIND and itinerary_write_queue.running:
+            result = await enqueue_itinerary(db, itinerary, idempotency_key, wait)
+            if isinstance(result, JSONResponse):
+                return result, True
+            return result
+        return await run_in_threadpool(
+            ItineraryService.create_itinerary, db, itinerary, idempotency_key
+        )
+    except IdempotencyKeyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except MissingReferences as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except WriteQueueFull as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
     except Exception as e:
         raise HTTPException(
             status_code=400, detail=f"Error creating itinerary: {str(e)}"
         )
+
+
+async def enqueue_itinerary(
+    db: Session,
+    itinerary: ItineraryCreate,
+    idempotency_key: Optional[str],
+    wait: Optional[float],
+):
+    """
+    Queue a create on the write-behind queue and wait up to `wait` seconds
+    for it to be written.
+
+    Returns:
+        The itinerary and whether it was created by this request, or a 202
+        response with the write ticket if the write didn't finish in time
+    """
+    keys = CreateRequestKeys(itinerary, idempotency_key or itinerary.idempotency_key)
+    existing_id = await run_in_threadpool(find_itinerary_id, db, keys)
+    if existing_id is not None:
+        return (
+            await run_in_threadpool(
+                ItineraryService.get_itinerary_by_id, db, existing_id
+            ),
+            False,
+        )
+    # Rejected now rather than by the writer, after a 202
+    await run_in_threadpool(ItineraryService.check_references, db, [itinerary])
+
+    ticket = itinerary_write_queue.submit(itinerary, keys)
+    try:
+        # Shielded: a timeout must not cancel the queued write
+        itinerary_id = await asyncio.wait_for(
+            asyncio.shield(asyncio.wrap_future(ticket.future)),
+            timeout=WRITE_WAIT_TIMEOUT if wait is None else wait,
+        )
+    except asyncio.TimeoutError:
+        return JSONResponse(
+            status_code=202,
+            content=jsonable_encoder(ticket.to_dict()),
+            headers={"Location": f"{router.prefix}/writes/{ticket.id}"},
+        )
+    return (
+        await run_in_threadpool(ItineraryService.get_itinerary_by_id, db, itinerary_id),
+        True,
+    )
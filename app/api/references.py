@@ -0,0 +1,132 @@
+from typing import List, Type
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.config import MAX_PAGE_SIZE
+from app.database.connection import get_db, get_write_db
+from app.schemas.schemas import (
+    Activity,
+    ActivityCreate,
+    ActivityUpsert,
+    Hotel,
+    HotelCreate,
+    HotelUpsert,
+    Location,
+    LocationCreate,
+    LocationUpsert,
+    Transfer,
+    TransferCreate,
+    TransferUpsert,
+)
+from app.services import events
+from app.services.reference_service import MissingReferences, ReferenceService
+
+
+def build_reference_router(
+    entity: str,
+    singular: str,
+    plural: str,
+    schema: Type[BaseModel],
+    create_schema: Type[BaseModel],
+    upsert_schema: Type[BaseModel],
+) -> APIRouter:
+    """
+    Build the list, create, update and batch upsert endpoints for a reference
+    entity. Operation IDs follow the itinerary tools, e.g. `Get_All_Hotels`,
+    `Create_Hotel`, `Update_Hotel` and `Upsert_Hotels`.
+    """
+    router = APIRouter(
+        prefix=f"/{plural.lower()}",
+        tags=[plural.lower()],
+        responses={404: {"description": "Not found"}},
+    )
+
+    @router.get(
+        "/",
+        response_model=List[schema],
+        operation_id=f"Get_All_{plural}",
+        summary=f"List {plural}",
+        description=f"Retrieve a list of {plural.lower()} ordered by ID, "
+        "paginated with `skip` and `limit`.",
+    )
+    def list_entities(
+        skip: int = 0,
+        limit: int = Query(min(100, MAX_PAGE_SIZE), ge=0, le=MAX_PAGE_SIZE),
+        db: Session = Depends(get_db),
+    ):
+        return ReferenceService.list_entities(db, entity, skip=skip, limit=limit)
+
+    @router.post(
+        "/",
+        response_model=schema,
+        status_code=201,
+        operation_id=f"Create_{singular}",
+        summary=f"Create {singular}",
+        description=f"Create a new {singular.lower()}.",
+    )
+    def create_entity(data: create_schema, db: Session = Depends(get_write_db)):
+        try:
+            return ReferenceService.create_entity(db, entity, data)
+        except MissingReferences as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except SQLAlchemyError as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+    @router.put(
+        "/{entity_id}",
+        response_model=schema,
+        operation_id=f"Update_{singular}",
+        summary=f"Update {singular}",
+        description=f"Replace all fields of an existing {singular.lower()}. "
+        f"Returns 404 if the {singular.lower()} does not exist.",
+    )
+    def update_entity(
+        entity_id: int, data: create_schema, db: Session = Depends(get_write_db)
+    ):
+        try:
+            db_entity = ReferenceService.update_entity(db, entity, entity_id, data)
+        except MissingReferences as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except SQLAlchemyError as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        if db_entity is None:
+            raise HTTPException(status_code=404, detail=f"{singular} not found")
+        return db_entity
+
+    @router.post(
+        "/batch",
+        response_model=List[schema],
+        operation_id=f"Upsert_{plural}",
+        summary=f"Upsert {plural}",
+        description=f"Create or update a batch of {plural.lower()} in one "
+        f"transaction. Items with the `id` of an existing {singular.lower()} "
+        "update it, all others are created.",
+    )
+    def upsert_entities(
+        items: List[upsert_schema], db: Session = Depends(get_write_db)
+    ):
+        try:
+            return ReferenceService.upsert_entities(db, entity, items)
+        except MissingReferences as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except SQLAlchemyError as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+    return router
+
+
+location_router = build_reference_router(
+    events.LOCATION, "Location", "Locations", Location, LocationCreate, LocationUpsert
+)
+hotel_router = build_reference_router(
+    events.HOTEL, "Hotel", "Hotels", Hotel, HotelCreate, HotelUpsert
+)
+transfer_router = build_reference_router(
+    events.TRANSFER, "Transfer", "Transfers", Transfer, TransferCreate, TransferUpsert
+)
+activity_router = build_reference_router(
+    events.ACTIVITY, "Activity", "Activities", Activity, ActivityCreate, ActivityUpsert
+)
@@ -0,0 +1,142 @@
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from fastapi import HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+from app.schemas.schemas import ResponseFormat
+from app.services.memory_profile import profile_step
+
+# MessagePack support is optional
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+
+
+class MsgPackResponse(Response):
+    media_type = "application/msgpack"
+
+    def render(self, content: Any) -> bytes:
+        return msgpack.packb(content, use_bin_type=True)
+
+
+def get_response_format(
+    request: Request,
+    format: Optional[ResponseFormat] = Query(
+        None,
+        description="Response encoding. Defaults to the request's Accept header, "
+        "falling back to JSON.",
+    ),
+) -> ResponseFormat:
+    """
+    Resolve the response encoding from the `format` query parameter or the
+    Accept header.
+
+    Raises:
+        HTTPException: 406 if MessagePack is requested but not installed
+    """
+    if format is None:
+        accept = request.headers.get("accept", "")
+        format = (
+            ResponseFormat.MSGPACK
+            if any(media_type in accept for media_type in MSGPACK_MEDIA_TYPES)
+            else ResponseFormat.JSON
+        )
+
+    if format == ResponseFormat.MSGPACK and msgpack is None:
+        raise HTTPException(
+            status_code=406, detail="MessagePack responses are not available"
+        )
+    return format
+
+
+def render(content: Any, format: ResponseFormat) -> Response:
+    """
+    Encode JSON-compatible content in the negotiated response format.
+    """
+    if format == ResponseFormat.MSGPACK:
+        return MsgPackResponse(content=content)
+    # As JSONResponse, with a profiling step while the text is alive: it is
+    # freed once encoded, and would otherwise not appear in memory profiles
+    text = _json_encode(content)
+    profile_step()
+    return Response(text.encode("utf-8"), media_type=JSONResponse.media_type)
+
+
+def render_stream(
+    chunks: Iterable[List[Any]],
+    length: int,
+    format: ResponseFormat,
+    key: Optional[str] = None,
+    trailer: Optional[Dict[str, Any]] = None,
+) -> StreamingResponse:
+    """
+    Encode an array of JSON-compatible items produced in chunks, sending each
+    chunk as soon as it is encoded instead of building the whole body.
+
+    `length` is the number of items announced in a MessagePack array header;
+    missing items are sent as nil.
+
+    With a `key`, the body is an object holding the array under that key,
+    followed by the entries of `trailer`. The trailer is encoded after the
+    last chunk, so it can be filled while the chunks are produced.
+    """
+    if format == ResponseFormat.MSGPACK:
+        body = _msgpack_chunks(chunks, length)
+        if key is not None:
+            body = _msgpack_object(key, body, trailer or {})
+        return StreamingResponse(body, media_type=MsgPackResponse.media_type)
+
+    body = _json_chunks(chunks)
+    if key is not None:
+        body = _json_object(key, body, trailer or {})
+    return StreamingResponse(body, media_type="application/json")
+
+
+# Same encoding as JSONResponse
+_json_encode = json.JSONEncoder(
+    ensure_ascii=False, allow_nan=False, separators=(",", ":")
+).encode
+
+
+def _json_chunks(chunks: Iterable[List[Any]]) -> Iterator[bytes]:
+    separator = b"["
+    for chunk in chunks:
+        if chunk:
+            yield separator + ",".join(_json_encode(item) for item in chunk).encode()
+            separator = b","
+    yield b"[]" if separator == b"[" else b"]"
+
+
+def _json_object(
+    key: str, array: Iterator[bytes], trailer: Dict[str, Any]
+) -> Iterator[bytes]:
+    yield b"{" + _json_encode(key).encode() + b":"
+    yield from array
+    for name, value in trailer.items():
+        yield b"," + _json_encode(name).encode() + b":" + _json_encode(value).encode()
+    yield b"}"
+
+
+def _msgpack_chunks(chunks: Iterable[List[Any]], length: int) -> Iterator[bytes]:
+    packer = msgpack.Packer(use_bin_type=True)
+    yield packer.pack_array_header(length)
+    for chunk in chunks:
+        chunk = chunk[:length]
+        length -= len(chunk)
+        yield b"".join(packer.pack(item) for item in chunk)
+    yield packer.pack(None) * length
+
+
+def _msgpack_object(
+    key: str, array: Iterator[bytes], trailer: Dict[str, Any]
+) -> Iterator[bytes]:
+    packer = msgpack.Packer(use_bin_type=True)
+    # The trailer's keys are known upfront, only its values are filled later
+    yield packer.pack_map_header(1 + len(trailer)) + packer.pack(key)
+    yield from array
+    for name, value in trailer.items():
+        yield packer.pack(name) + packer.pack(value)
@@ -0,0 +1,113 @@
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./travel_itinerary.db")
+
+# Read replicas (comma-separated URLs). Reads are spread over the replicas and
+# writes go to DATABASE_URL. Without replicas, a SQLite database is read
+# through separate read-only connections (disable with SQLITE_READ_ONLY=0).
+DATABASE_READ_URLS = [
+    url.strip() for url in os.getenv("DATABASE_READ_URLS", "").split(",") if url.strip()
+]
+SQLITE_READ_ONLY = os.getenv("SQLITE_READ_ONLY", "1") == "1"
+
+# Run pending migrations and seed data on startup. Disable when running several
+# workers and run `python -m app.database.migrate` once per deployment instead.
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "1") == "1"
+
+# Where generated MCP tool definitions are cached between starts (empty disables)
+MCP_TOOLS_CACHE_PATH = os.getenv("MCP_TOOLS_CACHE_PATH", ".cache/mcp_tools.json")
+
+# Responses smaller than this (in bytes) are sent uncompressed
+COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))
+
+# Maximum number of entries kept in the in-process response caches
+ITINERARY_CACHE_SIZE = int(os.getenv("ITINERARY_CACHE_SIZE", "1024"))
+LISTING_CACHE_SIZE = int(os.getenv("LISTING_CACHE_SIZE", "256"))
+
+# How often (in seconds) each worker checks the change log for writes made by
+# other workers, to invalidate its caches
+CHANGE_POLL_INTERVAL = float(os.getenv("CHANGE_POLL_INTERVAL", "0.1"))
+
+# How long (in seconds) a gap in change log sequence numbers is waited on
+# before it is taken to be a rolled back transaction and skipped. Sequence
+# numbers are assigned at insert, so a concurrent transaction may commit a
+# lower one after a higher one is visible (not on SQLite, which has a single
+# writer).
+CHANGE_GAP_GRACE = float(os.getenv("CHANGE_GAP_GRACE", "5"))
+
+# How long (in seconds) idempotency keys of Create_Itinerary are remembered
+IDEMPOTENCY_KEY_TTL = int(os.getenv("IDEMPOTENCY_KEY_TTL", "86400"))
+
+# Return the existing itinerary when an identical create request (same payload,
+# no idempotency key) was made within this many seconds. 0 disables.
+ITINERARY_DEDUP_WINDOW = int(os.getenv("ITINERARY_DEDUP_WINDOW", "0"))
+
+# Write-behind mode: creates are queued and written in batches by a background
+# writer, instead of inside the request
+WRITE_BEHIND = os.getenv("WRITE_BEHIND", "0") == "1"
+# Maximum number of queued creates; further requests get 503 with Retry-After
+WRITE_QUEUE_SIZE = int(os.getenv("WRITE_QUEUE_SIZE", "1000"))
+# Maximum number of itineraries written per transaction
+WRITE_BATCH_SIZE = int(os.getenv("WRITE_BATCH_SIZE", "100"))
+# Number of recent write tickets whose status can be queried
+WRITE_TICKET_LIMIT = int(os.getenv("WRITE_TICKET_LIMIT", "10000"))
+# Default time (in seconds) a create waits for its write before returning 202
+WRITE_WAIT_TIMEOUT = float(os.getenv("WRITE_WAIT_TIMEOUT", "5"))
+
+# Per-client rate limiting of API operations and MCP tool calls. Each client
+# gets a token bucket per operation refilled at RATE_LIMIT_RATE tokens per second
+# up to RATE_LIMIT_BURST; list and bulk write operations cost more tokens.
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+RATE_LIMIT_RATE = float(os.getenv("RATE_LIMIT_RATE", "20"))
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "40"))
+# Maximum number of requests a client may have in flight, in total and per
+# operation (MCP tools are operations)
+RATE_LIMIT_CONCURRENCY = int(os.getenv("RATE_LIMIT_CONCURRENCY", "16"))
+RATE_LIMIT_OPERATION_CONCURRENCY = int(
+    os.getenv("RATE_LIMIT_OPERATION_CONCURRENCY", "8")
+)
+# Fraction of the cost charged for responses served from the cache
+RATE_LIMIT_CACHED_COST = float(os.getenv("RATE_LIMIT_CACHED_COST", "0.2"))
+
+# Maximum `limit` accepted by list endpoints
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "500"))
+# Itinerary listings estimated to hold more rows (itineraries, days and the
+# objects nested in them) than this are rejected; narrow the filters, lower
+# `limit` or select fewer relationships with `fields`/`expand`
+MAX_RESPONSE_ROWS = int(os.getenv("MAX_RESPONSE_ROWS", "100000"))
+# Itinerary listings estimated to hold more rows than this are streamed in
+# chunks of STREAM_CHUNK_SIZE itineraries instead of built in memory
+STREAM_RESPONSE_ROWS = int(os.getenv("STREAM_RESPONSE_ROWS", "5000"))
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", "50"))
+
+# Profile the memory of each request with tracemalloc and report it at
+# /admin/memory-profile. Slows requests down and serves them one at a time;
+# for diagnosis only.
+MEMORY_PROFILING = os.getenv("MEMORY_PROFILING", "0") == "1"
+
+# Bearer token required by the /admin endpoints, which are disabled when unset
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# How MCP tool calls are executed: "direct" calls the services in-process for
+# the tools that support it, "http" proxies every call through the API
+MCP_DISPATCH = os.getenv("MCP_DISPATCH", "direct")
+
+# Longest date range of an inventory update or itinerary availability calendar
+AVAILABILITY_MAX_DAYS = int(os.getenv("AVAILABILITY_MAX_DAYS", "366"))
+# Largest `skip` of an availability search, which keeps the skip + limit
+# cheapest itineraries in memory
+AVAILABILITY_MAX_SKIP = int(os.getenv("AVAILABILITY_MAX_SKIP", "5000"))
+
+# Seconds between keep-alive comments on an idle change stream
+CHANGE_STREAM_HEARTBEAT = float(os.getenv("CHANGE_STREAM_HEARTBEAT", "15"))
+# Maximum number of change streams a client may have open (when rate limiting
+# is enabled)
+CHANGE_STREAM_LIMIT = int(os.getenv("CHANGE_STREAM_LIMIT", "2"))
+
+# Seconds between rebuilds of the recommendation ranking (and flushes of
+# itinerary read counts); 0 disables the background job
+RANKING_INTERVAL = float(os.getenv("RANKING_INTERVAL", "300"))
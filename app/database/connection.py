@@ -1,25 +1,139 @@
-from sqlalchemy import create_engine
+import itertools
+import os
+from typing import Generator, List, Union
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator, Union
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./travel_itinerary.db"
+from app.config import DATABASE_READ_URLS, DATABASE_URL, SQLITE_READ_ONLY
+
+SQLALCHEMY_DATABASE_URL = DATABASE_URL
+
+
+def _create_engine(url: str) -> Engine:
+    connect_args = {}
+    if make_url(url).get_backend_name() == "sqlite":
+        connect_args["check_same_thread"] = False
+    return create_engine(url, connect_args=connect_args)
+
+
+# The primary database: every write, and reads following a write
+engine = _create_engine(SQLALCHEMY_DATABASE_URL)
+
+
+if engine.dialect.name == "sqlite":
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        # WAL lets readers in every worker proceed while a writer commits
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
+
+def _sqlite_read_only_url(url: str) -> Union[str, None]:
+    """
+    URL opening the same SQLite file read-only, or None for in-memory
+    databases.
+    """
+    database = make_url(url).database
+    if not database or database == ":memory:":
+        return None
+    return f"sqlite:///file:{os.path.abspath(database)}?mode=ro&uri=true"
+
+
+def _create_read_engines() -> List[Engine]:
+    if DATABASE_READ_URLS:
+        return [_create_engine(url) for url in DATABASE_READ_URLS]
+    if engine.dialect.name == "sqlite" and SQLITE_READ_ONLY:
+        url = _sqlite_read_only_url(SQLALCHEMY_DATABASE_URL)
+        if url is not None:
+            return [_create_engine(url)]
+    return [engine]
+
+
+# Engines serving reads: replicas, read-only SQLite connections, or the primary
+read_engines = _create_read_engines()
+_next_read_engine = itertools.cycle(read_engines).__next__
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+
+class RoutingSession(Session):
+    """
+    Session that sends reads to a read engine and writes to the primary.
+
+    Each session reads from one read engine, so it sees a consistent view.
+    Once the session writes (flushes, or executes an INSERT, UPDATE or
+    DELETE), it is pinned to the primary for the rest of its life, so a
+    request always reads its own writes. Sessions opened with `primary=True`
+    (for read-modify-write requests) never use a read engine.
+    """
+
+    def __init__(self, *args, primary: bool = False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.primary = primary
+        self.read_engine = _next_read_engine()
+
+    @property
+    def reads_from_replica(self) -> bool:
+        """
+        Whether reads go to a replica, which may lag behind the primary.
+        Read-only SQLite connections read the primary's file.
+        """
+        return (
+            not self.primary
+            and bool(DATABASE_READ_URLS)
+            and self.read_engine is not engine
+        )
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        return engine if self.primary else self.read_engine
+
+
+@event.listens_for(RoutingSession, "before_flush")
+def _pin_on_flush(session, flush_context, instances):
+    session.primary = True
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _pin_on_write(orm_execute_state):
+    if (
+        orm_execute_state.is_insert
+        or orm_execute_state.is_update
+        or orm_execute_state.is_delete
+    ):
+        orm_execute_state.session.primary = True
+
+
+SessionLocal = sessionmaker(
+    class_=RoutingSession, autocommit=False, autoflush=False, bind=engine
 )
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
 
-def get_db(mcp: bool = False) -> Union[Session, Generator[Session, None, None]]:
+def get_db() -> Generator[Session, None, None]:
+    """
+    Session for a request, closed when the request finishes. In-process
+    callers (MCP tool calls, background writers) open their own sessions
+    with `SessionLocal()`.
+    """
     db = SessionLocal()
     try:
-        if mcp:
-            return db
-        else:
-            yield db
+        yield db
+    finally:
+        db.close()
+
+
+def get_write_db() -> Generator[Session, None, None]:
+    """
+    Session pinned to the primary, for requests that read data they are
+    about to modify.
+    """
+    db = SessionLocal(primary=True)
+    try:
+        yield db
     finally:
-        if not mcp:
-            db.close()
+        db.close()
@@ -0,0 +1,83 @@
+import os
+from typing import Optional
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.database.connection import engine
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+ALEMBIC_INI = os.path.join(ROOT_DIR, "alembic.ini")
+MIGRATIONS_DIR = os.path.join(ROOT_DIR, "migrations")
+VERSIONS_DIR = os.path.join(MIGRATIONS_DIR, "versions")
+
+# Schema created by Base.metadata.create_all() before migrations were introduced
+BASELINE_REVISION = "0001"
+
+
+def head_revision() -> str:
+    """
+    The latest migration revision.
+
+    Revision IDs are zero-padded sequence numbers matching the migration file
+    name prefix, so the head is found without importing Alembic.
+    """
+    return max(
+        name.split("_", 1)[0]
+        for name in os.listdir(VERSIONS_DIR)
+        if name.endswith(".py") and name.split("_", 1)[0].isdigit()
+    )
+
+
+def current_revision(connection: Connection) -> Optional[str]:
+    """
+    The revision the database is at, or None if it has never been migrated.
+    """
+    if not inspect(connection).has_table("alembic_version"):
+        return None
+    return connection.execute(text("SELECT version_num FROM alembic_version")).scalar()
+
+
+def database_is_current() -> bool:
+    """
+    Cheap startup check: a single query comparing the database revision with
+    the latest migration.
+    """
+    try:
+        with engine.connect() as connection:
+            revision = connection.execute(
+                text("SELECT version_num FROM alembic_version")
+            ).scalar()
+    except SQLAlchemyError:
+        return False
+    return revision == head_revision()
+
+
+def upgrade_database() -> None:
+    """
+    Apply all pending migrations. Databases created before migrations were
+    introduced are stamped with the baseline revision first.
+    """
+    # Alembic is only imported when there is schema work to do
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("script_location", MIGRATIONS_DIR)
+    config.attributes["configure_logger"] = False
+
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        if current_revision(connection) is None and inspect(connection).has_table(
+            "itineraries"
+        ):
+            command.stamp(config, BASELINE_REVISION)
+        command.upgrade(config, "head")
+
+
+if __name__ == "__main__":
+    # Run once per deployment, before starting the workers
+    from app.database.seed import init_db
+
+    init_db()
@@ -9,7 +9,8 @@ from app.models.models import (
     HotelStay,
     TransferType,
 )
-from app.database.connection import engine, Base, SessionLocal
+from app.database.connection import SessionLocal
+from app.database.migrate import database_is_current, upgrade_database
 
 
 def seed_database(db: Session):
@@ -542,9 +543,20 @@ def seed_database(db: Session):
 
 
 def init_db():
+    """
+    Bring the database schema up to date and seed it on first run.
+
+    When the database is already at the latest migration this is a single
+    query, so it is cheap to call on every startup. Data is seeded when the
+    migrations run, if the database holds no locations yet.
+    """
     print("Initialising Database...")
-    Base.metadata.create_all(bind=engine)
-    db = SessionLocal()
+    if database_is_current():
+        print("Database is up to date")
+        return
+
+    upgrade_database()
+    db = SessionLocal(primary=True)
     try:
         # Check if database is already seeded by checking for a location
         location = db.query(Location).first()
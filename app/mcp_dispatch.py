@@ -0,0 +1,349 @@
+import asyncio
+import json
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+
+from fastapi import APIRouter, HTTPException
+from fastapi.dependencies.utils import get_flat_dependant
+from fastapi.exceptions import RequestValidationError
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from pydantic import BaseModel, ValidationError, create_model
+from pydantic.fields import FieldInfo
+from starlette.concurrency import run_in_threadpool
+
+from app.api.itineraries import (
+    build_content,
+    check_listing_size,
+    create_or_raise,
+    get_projection,
+    read_batch,
+    read_itinerary,
+    read_listing,
+    read_recommended,
+)
+from app.api.itineraries import router as itinerary_router
+from app.api.references import (
+    activity_router,
+    hotel_router,
+    location_router,
+    transfer_router,
+)
+from app.config import RATE_LIMIT_ENABLED
+from app.database.connection import SessionLocal
+from app.middleware.rate_limit import rate_limiter, retry_after_header
+from app.schemas.schemas import (
+    Activity,
+    Hotel,
+    Location,
+    ResponseShape,
+    Transfer,
+)
+from app.services import events
+from app.services.cache import track_cache_lookups
+from app.services.itinerary_service import ItineraryService
+from app.services.memory_profile import memory_profiler, profile_request
+from app.services.reference_service import ReferenceService
+from app.services.write_queue import itinerary_write_queue
+
+# Route parameters that only affect HTTP encoding, ignored in-process
+IGNORED_PARAMETERS = {"format"}
+
+
+class RouteArguments:
+    """
+    Validates the arguments of a tool against the parameters of the route it
+    is generated from, read from the route's dependant (including those of
+    its dependencies, e.g. `fields` and `expand`), so the two can't drift
+    apart.
+
+    Arguments are named as in the tool's input schema, which is also how a
+    proxied call maps them: path and query parameters by name, headers by
+    their HTTP name (e.g. `idempotency-key`), and the fields of a request
+    body model at the top level.
+    """
+
+    def __init__(self, route: APIRoute):
+        dependant = get_flat_dependant(route.dependant, skip_repeats=True)
+        # Argument name -> location, for error reporting as in the API
+        self.locations: Dict[str, str] = {}
+        fields: Dict[str, Any] = {}
+        for location, params in (
+            ("path", dependant.path_params),
+            ("query", dependant.query_params),
+            ("header", dependant.header_params),
+        ):
+            for param in params:
+                if param.name in IGNORED_PARAMETERS:
+                    continue
+                self.locations[param.alias] = location
+                fields[param.name] = (
+                    param.field_info.annotation,
+                    FieldInfo.merge_field_infos(
+                        param.field_info,
+                        alias=param.alias,
+                        validation_alias=param.alias,
+                    ),
+                )
+        self.parameters = create_model(f"{route.operation_id}Parameters", **fields)
+
+        if len(dependant.body_params) > 1:
+            raise ValueError(f"{route.operation_id}: embedded bodies are not supported")
+        self.body: Optional[Type[BaseModel]] = (
+            dependant.body_params[0].field_info.annotation
+            if dependant.body_params
+            else None
+        )
+
+    def parse(self, arguments: Dict[str, Any]) -> Tuple[BaseModel, Optional[BaseModel]]:
+        """
+        Validate tool arguments, reporting errors as the API does for the
+        corresponding request, e.g. with a `["query", "limit"]` location.
+
+        Returns:
+            The route parameters, by parameter name, and the request body
+
+        Raises:
+            RequestValidationError: If the arguments are invalid
+        """
+        errors: List[Dict[str, Any]] = []
+        parameters = body = None
+        try:
+            parameters = self.parameters.model_validate(
+                {k: v for k, v in arguments.items() if k in self.locations}
+            )
+        except ValidationError as e:
+            errors.extend(
+                {**error, "loc": (self.locations[error["loc"][0]], *error["loc"])}
+                for error in e.errors(include_url=False)
+            )
+        if self.body is not None:
+            try:
+                body = self.body.model_validate(
+                    {k: v for k, v in arguments.items() if k not in self.locations}
+                )
+            except ValidationError as e:
+                errors.extend(
+                    {**error, "loc": ("body", *error["loc"])}
+                    for error in e.errors(include_url=False)
+                )
+        if errors:
+            raise RequestValidationError(errors)
+        return parameters, body
+
+
+def route_arguments(router: APIRouter, operation_id: str) -> RouteArguments:
+    for route in router.routes:
+        if isinstance(route, APIRoute) and route.operation_id == operation_id:
+            return RouteArguments(route)
+    raise LookupError(f"No route with operation ID {operation_id}")
+
+
+LIST_ITINERARIES = route_arguments(itinerary_router, "Get_All_Itineraries")
+GET_ITINERARY = route_arguments(itinerary_router, "Get_Itinerary_by_ID")
+GET_BATCH = route_arguments(itinerary_router, "Get_Itineraries_By_IDs")
+GET_RECOMMENDED = route_arguments(itinerary_router, "Get_Recommended_Itineraries")
+GET_WRITE_STATUS = route_arguments(itinerary_router, "Get_Itinerary_Write_Status")
+CREATE_ITINERARY = route_arguments(itinerary_router, "Create_Itinerary")
+
+
+def list_itineraries(arguments: Dict[str, Any]):
+    args, _ = LIST_ITINERARIES.parse(arguments)
+    projection = get_projection(args.fields, args.expand)
+    filters = args.model_dump(exclude={"fields", "expand", "shape"})
+    db = SessionLocal()
+    try:
+        page = ItineraryService.get_listing_page(db, **filters)
+        check_listing_size(page, projection, args.shape)
+        return read_listing(db, page, filters, projection, args.shape)
+    finally:
+        db.close()
+
+
+def get_itinerary(arguments: Dict[str, Any]):
+    args, _ = GET_ITINERARY.parse(arguments)
+    projection = get_projection(args.fields, args.expand)
+    db = SessionLocal()
+    try:
+        return read_itinerary(db, args.itinerary_id, projection, args.shape)
+    finally:
+        db.close()
+
+
+def get_itineraries_by_ids(arguments: Dict[str, Any]):
+    args, _ = GET_BATCH.parse(arguments)
+    projection = get_projection(args.fields, args.expand)
+    db = SessionLocal()
+    try:
+        return read_batch(db, args.ids, projection, args.shape)
+    finally:
+        db.close()
+
+
+def get_recommended_itineraries(arguments: Dict[str, Any]):
+    args, _ = GET_RECOMMENDED.parse(arguments)
+    projection = get_projection(args.fields, args.expand)
+    filters = args.model_dump(exclude={"fields", "expand"})
+    db = SessionLocal()
+    try:
+        return read_recommended(db, filters, projection)
+    finally:
+        db.close()
+
+
+def get_write_status(arguments: Dict[str, Any]):
+    args, _ = GET_WRITE_STATUS.parse(arguments)
+    ticket = itinerary_write_queue.get_ticket(args.ticket_id)
+    if ticket is None:
+        raise HTTPException(status_code=404, detail="Write ticket not found")
+    return jsonable_encoder(ticket.to_dict())
+
+
+async def create_itinerary(arguments: Dict[str, Any]):
+    args, itinerary = CREATE_ITINERARY.parse(arguments)
+    db = SessionLocal(primary=True)
+    try:
+        result, _ = await create_or_raise(
+            db, itinerary, args.idempotency_key, args.wait
+        )
+        if isinstance(result, JSONResponse):
+            # Queued, not yet written: the write ticket
+            return json.loads(result.body)
+        return await run_in_threadpool(
+            build_content, db, [result], None, ResponseShape.NESTED, single=True
+        )
+    finally:
+        db.close()
+
+
+def list_references(
+    entity: str, schema: type, router: APIRouter, operation_id: str
+) -> Callable[[Dict[str, Any]], Any]:
+    route = route_arguments(router, operation_id)
+
+    def handler(arguments: Dict[str, Any]):
+        args, _ = route.parse(arguments)
+        db = SessionLocal()
+        try:
+            return [
+                schema.model_validate(item).model_dump(mode="json")
+                for item in ReferenceService.list_entities(
+                    db, entity, skip=args.skip, limit=args.limit
+                )
+            ]
+        finally:
+            db.close()
+
+    return handler
+
+
+def _dumps(content: Any) -> str:
+    # Compact, as in API response bodies
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"))
+
+
+class ToolCallError(Exception):
+    """
+    A tool call that failed as the equivalent API request would have, with
+    the same message as a failed proxied call.
+    """
+
+    def __init__(self, tool_name: str, status_code: int, detail: Any):
+        super().__init__(
+            f"Error calling {tool_name}. Status code: {status_code}. "
+            f"Response: {_dumps({'detail': jsonable_encoder(detail)})}"
+        )
+        self.status_code = status_code
+
+
+class DirectToolDispatcher:
+    """
+    Runs MCP tool calls in-process: the arguments are validated against the
+    route's parameters and passed straight to the services, skipping the
+    loopback HTTP request, routing, dependency injection and JSON decoding of
+    a proxied call. Results are the same as the API's.
+
+    Tool calls are rate limited and memory profiled like API requests.
+    """
+
+    def __init__(self):
+        self.handlers: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+            "Get_All_Itineraries": list_itineraries,
+            "Get_Itinerary_by_ID": get_itinerary,
+            "Get_Itineraries_By_IDs": get_itineraries_by_ids,
+            "Get_Recommended_Itineraries": get_recommended_itineraries,
+            "Get_Itinerary_Write_Status": get_write_status,
+            "Create_Itinerary": create_itinerary,
+            "Get_All_Locations": list_references(
+                events.LOCATION, Location, location_router, "Get_All_Locations"
+            ),
+            "Get_All_Hotels": list_references(
+                events.HOTEL, Hotel, hotel_router, "Get_All_Hotels"
+            ),
+            "Get_All_Transfers": list_references(
+                events.TRANSFER, Transfer, transfer_router, "Get_All_Transfers"
+            ),
+            "Get_All_Activities": list_references(
+                events.ACTIVITY, Activity, activity_router, "Get_All_Activities"
+            ),
+        }
+        self._profile_lock: Optional[asyncio.Lock] = None
+
+    def handles(self, tool_name: str) -> bool:
+        return tool_name in self.handlers
+
+    async def call(
+        self, tool_name: str, arguments: Dict[str, Any], client: Optional[str]
+    ) -> str:
+        """
+        Run a tool call and return its result as JSON text.
+
+        Raises:
+            ToolCallError: If the call is rate limited, its arguments are
+                invalid or the operation fails
+        """
+        limited = RATE_LIMIT_ENABLED and client is not None
+        if limited:
+            retry_after = rate_limiter.acquire(client, tool_name)
+            if retry_after is not None:
+                seconds = retry_after_header(retry_after)
+                raise ToolCallError(
+                    tool_name,
+                    429,
+                    f"Rate limit exceeded, retry after {seconds} seconds",
+                )
+
+        handler = self.handlers[tool_name]
+        with track_cache_lookups() as stats:
+            try:
+                if memory_profiler.enabled:
+                    # One at a time, as in MemoryProfileMiddleware
+                    if self._profile_lock is None:
+                        self._profile_lock = asyncio.Lock()
+                    async with self._profile_lock:
+                        with profile_request(tool_name):
+                            content = await self._invoke(handler, arguments)
+                else:
+                    content = await self._invoke(handler, arguments)
+            except RequestValidationError as e:
+                raise ToolCallError(tool_name, 422, e.errors())
+            except HTTPException as e:
+                raise ToolCallError(tool_name, e.status_code, e.detail)
+            finally:
+                if limited:
+                    rate_limiter.release(
+                        client, tool_name, cached=stats.status == "HIT"
+                    )
+
+        # Same formatting as results of proxied calls
+        return json.dumps(content, indent=2, ensure_ascii=False)
+
+    @staticmethod
+    async def _invoke(handler: Callable, arguments: Dict[str, Any]) -> Any:
+        # Async handlers do their own threadpool offloading
+        if asyncio.iscoroutinefunction(handler):
+            return await handler(arguments)
+        return await run_in_threadpool(handler, arguments)
+
+
+direct_tools = DirectToolDispatcher()
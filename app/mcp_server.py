@@ -0,0 +1,222 @@
+import hashlib
+import json
+import os
+from contextvars import ContextVar
+from importlib.metadata import version
+from typing import Any, Dict, List, Optional, Union
+
+import mcp.types as types
+from fastapi.openapi.utils import get_openapi
+from fastapi_mcp import FastApiMCP
+from fastapi_mcp.openapi.convert import convert_openapi_to_mcp_tools
+from fastapi_mcp.server import LowlevelMCPServer
+from fastapi_mcp.types import HTTPRequestInfo
+
+from app.config import MCP_DISPATCH, MCP_TOOLS_CACHE_PATH
+from app.mcp_dispatch import direct_tools
+from app.middleware.rate_limit import MCP_CLIENT_HEADER, connection_client
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Rate limiting key of the MCP client whose tool call is being executed
+_mcp_client: ContextVar[Optional[str]] = ContextVar("mcp_client", default=None)
+
+
+def mcp_client_key() -> Optional[str]:
+    """
+    Identify the MCP client making a tool call by the address of its SSE
+    connection, like API requests, so opening more sessions doesn't give a
+    client more budget. The call runs inside the connection's request; None
+    outside of one (in-process calls).
+    """
+    return connection_client.get()
+
+
+def source_fingerprint(*extra: Any) -> str:
+    """
+    Hash of the application sources and the libraries that shape the OpenAPI
+    schema. Tool definitions cached under a different fingerprint are stale.
+    """
+    digest = hashlib.sha256()
+    for package in ("fastapi", "fastapi-mcp", "pydantic"):
+        digest.update(f"{package}=={version(package)}".encode())
+    digest.update(repr(extra).encode())
+
+    paths = [os.path.join(ROOT_DIR, "main.py")]
+    for directory, _, files in os.walk(os.path.join(ROOT_DIR, "app")):
+        paths.extend(os.path.join(directory, f) for f in files if f.endswith(".py"))
+    for path in sorted(paths):
+        digest.update(path.encode())
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+class LazyFastApiMCP(FastApiMCP):
+    """
+    FastApiMCP that builds its tool definitions on first use instead of at
+    import time.
+
+    Converting the OpenAPI schema into tools (with full response schemas) is
+    the most expensive part of startup, and only MCP clients need it. The
+    result is also cached on disk, keyed by a fingerprint of the application
+    sources, so later starts skip the conversion entirely.
+
+    It overrides and calls private methods of FastApiMCP (`_request`,
+    `_execute_api_tool`, `_filter_tools`), so fastapi-mcp is pinned to 0.3.x
+    and tests/test_mcp_server.py checks them on upgrades.
+    """
+
+    def __init__(
+        self,
+        *args,
+        tools_cache_path: Optional[str] = None,
+        dispatch: str = MCP_DISPATCH,
+        **kwargs,
+    ):
+        # "direct" runs supported tools in-process, "http" proxies every call
+        self.dispatch = dispatch
+        self._tools: Optional[List[types.Tool]] = None
+        self._operation_map: Optional[Dict[str, Dict[str, Any]]] = None
+        self._tools_cache_path = (
+            MCP_TOOLS_CACHE_PATH if tools_cache_path is None else tools_cache_path
+        )
+        super().__init__(*args, **kwargs)
+
+    @property
+    def tools(self) -> List[types.Tool]:
+        if self._tools is None:
+            self._build_tools()
+        return self._tools
+
+    @tools.setter
+    def tools(self, value: List[types.Tool]) -> None:
+        self._tools = value
+
+    @property
+    def operation_map(self) -> Dict[str, Dict[str, Any]]:
+        if self._operation_map is None:
+            self._build_tools()
+        return self._operation_map
+
+    @operation_map.setter
+    def operation_map(self, value: Dict[str, Dict[str, Any]]) -> None:
+        self._operation_map = value
+
+    def setup_server(self) -> None:
+        """
+        Create the MCP server. Unlike the base class, tools are not generated
+        here; the handlers build them on first access.
+        """
+        mcp_server: LowlevelMCPServer = LowlevelMCPServer(self.name, self.description)
+
+        @mcp_server.list_tools()
+        async def handle_list_tools() -> List[types.Tool]:
+            return self.tools
+
+        @mcp_server.call_tool()
+        async def handle_call_tool(
+            name: str,
+            arguments: Dict[str, Any],
+            http_request_info: Optional[HTTPRequestInfo] = None,
+        ) -> List[Union[types.TextContent, types.ImageContent, types.EmbeddedResource]]:
+            return await self.call_tool(name, arguments, http_request_info)
+
+        self.server = mcp_server
+
+    async def call_tool(
+        self,
+        name: str,
+        arguments: Dict[str, Any],
+        http_request_info: Optional[HTTPRequestInfo] = None,
+    ) -> List[Union[types.TextContent, types.ImageContent, types.EmbeddedResource]]:
+        """
+        Execute a tool call, in-process when the tool supports it and direct
+        dispatch is enabled, otherwise as a request to the API.
+        """
+        client = mcp_client_key()
+        if self.dispatch == "direct" and direct_tools.handles(name):
+            text = await direct_tools.call(name, dict(arguments), client)
+            return [types.TextContent(type="text", text=text)]
+
+        # The API request made for the tool is rate limited as this client
+        _mcp_client.set(client)
+        return await self._execute_api_tool(
+            client=self._http_client,
+            tool_name=name,
+            arguments=arguments,
+            operation_map=self.operation_map,
+            http_request_info=http_request_info,
+        )
+
+    async def _request(self, client, method, path, query, headers, body):
+        mcp_client = _mcp_client.get()
+        if mcp_client is not None:
+            headers = {**headers, MCP_CLIENT_HEADER: mcp_client}
+        return await super()._request(client, method, path, query, headers, body)
+
+    def _build_tools(self) -> None:
+        fingerprint = source_fingerprint(
+            self._describe_all_responses,
+            self._describe_full_response_schema,
+            self._include_operations,
+            self._exclude_operations,
+            self._include_tags,
+            self._exclude_tags,
+        )
+        if self._load_cached_tools(fingerprint):
+            return
+
+        openapi_schema = get_openapi(
+            title=self.fastapi.title,
+            version=self.fastapi.version,
+            openapi_version=self.fastapi.openapi_version,
+            description=self.fastapi.description,
+            routes=self.fastapi.routes,
+        )
+        all_tools, self._operation_map = convert_openapi_to_mcp_tools(
+            openapi_schema,
+            describe_all_responses=self._describe_all_responses,
+            describe_full_response_schema=self._describe_full_response_schema,
+        )
+        self._tools = self._filter_tools(all_tools, openapi_schema)
+        self._save_cached_tools(fingerprint)
+
+    def _load_cached_tools(self, fingerprint: str) -> bool:
+        if not self._tools_cache_path:
+            return False
+        try:
+            with open(self._tools_cache_path) as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if cached.get("fingerprint") != fingerprint:
+            return False
+
+        self._tools = [types.Tool.model_validate(tool) for tool in cached["tools"]]
+        self._operation_map = cached["operation_map"]
+        return True
+
+    def _save_cached_tools(self, fingerprint: str) -> None:
+        if not self._tools_cache_path:
+            return
+        try:
+            directory = os.path.dirname(self._tools_cache_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Write to a temporary file first so concurrent workers never read
+            # a partially written cache
+            tmp_path = f"{self._tools_cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(
+                    {
+                        "fingerprint": fingerprint,
+                        "tools": [tool.model_dump(mode="json") for tool in self._tools],
+                        "operation_map": self._operation_map,
+                    },
+                    f,
+                )
+            os.replace(tmp_path, self._tools_cache_path)
+        except OSError:
+            # The cache is an optimization only
+            pass
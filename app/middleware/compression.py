@@ -0,0 +1,206 @@
+import gzip
+import zlib
+from typing import Callable, Dict, List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import COMPRESSION_MINIMUM_SIZE
+
+# Optional encoders, enabled when their packages are installed
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+
+def _gzip(body: bytes) -> bytes:
+    return gzip.compress(body, compresslevel=6)
+
+
+def _build_encoders() -> Dict[str, Callable[[bytes], bytes]]:
+    encoders: Dict[str, Callable[[bytes], bytes]] = {}
+    if zstandard is not None:
+        compressor = zstandard.ZstdCompressor(level=3)
+        encoders["zstd"] = compressor.compress
+    if brotli is not None:
+        encoders["br"] = lambda body: brotli.compress(body, quality=4)
+    encoders["gzip"] = _gzip
+    return encoders
+
+
+# Server preference order, fastest/best ratio first
+ENCODERS = _build_encoders()
+
+
+class GzipStream:
+    """
+    Incremental gzip encoder for a streamed response. Every chunk is flushed,
+    so the client can decode each part of the response as it arrives.
+    """
+
+    def __init__(self):
+        # wbits=31 writes the gzip container
+        self._compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+
+    def compress(self, chunk: bytes) -> bytes:
+        return self._compressor.compress(chunk) + self._compressor.flush(
+            zlib.Z_SYNC_FLUSH
+        )
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class ZstdStream:
+    def __init__(self):
+        self._compressor = zstandard.ZstdCompressor(level=3).compressobj()
+
+    def compress(self, chunk: bytes) -> bytes:
+        return self._compressor.compress(chunk) + self._compressor.flush(
+            zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        )
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class BrotliStream:
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=4)
+
+    def compress(self, chunk: bytes) -> bytes:
+        return self._compressor.process(chunk) + self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+# Incremental encoders for streamed responses, one instance per response
+STREAM_ENCODERS = {"zstd": ZstdStream, "br": BrotliStream, "gzip": GzipStream}
+
+# Streams are passed through untouched so events are not held back
+UNCOMPRESSED_MEDIA_TYPES = ("text/event-stream",)
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """
+    Parse an Accept-Encoding header into a mapping of encoding -> q-value.
+    """
+    accepted: Dict[str, float] = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding] = quality
+    return accepted
+
+
+def select_encoding(header: str) -> Optional[str]:
+    """
+    Pick the best available encoding accepted by the client, or None.
+    """
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get("*", 0.0)
+    candidates: List[Tuple[float, int, str]] = []
+    for preference, coding in enumerate(ENCODERS):
+        quality = accepted.get(coding, wildcard)
+        if quality > 0:
+            candidates.append((-quality, preference, coding))
+    if not candidates:
+        return None
+    return min(candidates)[2]
+
+
+class CompressionMiddleware:
+    """
+    Compress HTTP responses with zstd, brotli or gzip, negotiated from the
+    client's Accept-Encoding header.
+
+    Complete responses are compressed at once. Streamed responses (sent in
+    several body messages) are compressed chunk by chunk, without a
+    Content-Length. Responses below the size threshold, already encoded
+    responses and event streams (e.g. the MCP SSE transport) are sent as-is.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = COMPRESSION_MINIMUM_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = select_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        passthrough = False
+        stream = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start_message, passthrough, stream
+
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                media_type = headers.get("content-type", "")
+                if "content-encoding" in headers or media_type.startswith(
+                    UNCOMPRESSED_MEDIA_TYPES
+                ):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start_message = message
+                return
+
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if stream is None and more_body:
+                # Streaming response: compress each chunk as it is sent
+                stream = STREAM_ENCODERS[encoding]()
+                headers = MutableHeaders(raw=start_message["headers"])
+                headers.add_vary_header("Accept-Encoding")
+                headers["Content-Encoding"] = encoding
+                if "content-length" in headers:
+                    del headers["Content-Length"]
+                await send(start_message)
+            if stream is not None:
+                body = stream.compress(body)
+                if not more_body:
+                    body += stream.finish()
+                await send(
+                    {"type": "http.response.body", "body": body, "more_body": more_body}
+                )
+                return
+
+            headers = MutableHeaders(raw=start_message["headers"])
+            headers.add_vary_header("Accept-Encoding")
+            if len(body) >= self.minimum_size:
+                body = ENCODERS[encoding](body)
+                headers["Content-Encoding"] = encoding
+                headers["Content-Length"] = str(len(body))
+
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,37 @@
+import asyncio
+from typing import Optional
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.middleware.routing import resolve_operation
+from app.services.memory_profile import memory_profiler, profile_request
+
+
+class MemoryProfileMiddleware:
+    """
+    Profile the memory of every API operation with tracemalloc (see
+    MEMORY_PROFILING). Results are served at `/admin/memory-profile`.
+
+    tracemalloc measures the whole process, so profiled requests are served
+    one at a time to keep their numbers apart.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not memory_profiler.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        operation = resolve_operation(scope)
+        if operation is None:
+            await self.app(scope, receive, send)
+            return
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            with profile_request(operation):
+                await self.app(scope, receive, send)
@@ -0,0 +1,224 @@
+import math
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import (
+    CHANGE_STREAM_LIMIT,
+    RATE_LIMIT_BURST,
+    RATE_LIMIT_CACHED_COST,
+    RATE_LIMIT_CONCURRENCY,
+    RATE_LIMIT_ENABLED,
+    RATE_LIMIT_OPERATION_CONCURRENCY,
+    RATE_LIMIT_RATE,
+)
+from app.middleware.routing import resolve_operation
+
+# ASGI client address of the in-process requests made by MCP tool calls. They
+# carry the key of the MCP client in the MCP_CLIENT_HEADER header, which is only
+# trusted on these requests.
+INTERNAL_CLIENT = ("mcp-internal", 0)
+MCP_CLIENT_HEADER = "x-mcp-client"
+
+# Client key of the HTTP connection being served. MCP tool calls run inside
+# the SSE connection of their session, so they are identified by its peer.
+connection_client: ContextVar[Optional[str]] = ContextVar(
+    "connection_client", default=None
+)
+
+# Token cost of each operation. Operations returning or writing many rows cost
+# more; anything not listed costs 1.
+OPERATION_COSTS: Dict[str, float] = {
+    "Get_All_Itineraries": 4,
+    "Get_Itineraries_By_IDs": 4,
+    "Get_Recommended_Itineraries": 4,
+    "Create_Itinerary": 4,
+    "Upsert_Locations": 4,
+    "Upsert_Hotels": 4,
+    "Upsert_Transfers": 4,
+    "Upsert_Activities": 4,
+    "Find_Available_Itineraries": 4,
+    "Get_Itinerary_Availability": 4,
+}
+
+# Operations hidden from the schema that are limited all the same. A change
+# stream costs one token to open and stays in flight until it is closed, so
+# its concurrency cap is the number of streams a client may keep open.
+HIDDEN_OPERATIONS = {"Stream_Changes"}
+
+# Concurrency caps of operations that don't use operation_concurrency
+OPERATION_CONCURRENCY: Dict[str, int] = {"Stream_Changes": CHANGE_STREAM_LIMIT}
+
+# Buckets kept in memory; the least recently used (idle) ones are dropped
+MAX_BUCKETS = 10000
+
+
+class RateLimiter:
+    """
+    In-process token bucket per (client, operation), plus caps on the number
+    of requests a client may have in flight, in total and per operation. MCP
+    tools are operations, so a tool is limited like the route it comes from.
+
+    A request reserves the full cost of its operation when it is admitted.
+    Responses served from the cache (`X-Cache: HIT`) are refunded down to
+    `cached_cost` times that, so cheap repeated reads aren't limited like
+    database work.
+
+    Only used from the event loop thread, so it needs no locking.
+    """
+
+    def __init__(
+        self,
+        rate: float = RATE_LIMIT_RATE,
+        burst: float = RATE_LIMIT_BURST,
+        concurrency: int = RATE_LIMIT_CONCURRENCY,
+        operation_concurrency: int = RATE_LIMIT_OPERATION_CONCURRENCY,
+        cached_cost: float = RATE_LIMIT_CACHED_COST,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.concurrency = concurrency
+        self.operation_concurrency = operation_concurrency
+        self.cached_cost = cached_cost
+        # (client, operation) -> [tokens, last update]
+        self._buckets: "OrderedDict[Tuple[str, str], List[float]]" = OrderedDict()
+        # client or (client, operation) -> requests in flight
+        self._in_flight: Dict[object, int] = {}
+
+    def cost(self, operation: str) -> float:
+        # A cost above the burst size could never be admitted
+        return min(OPERATION_COSTS.get(operation, 1), self.burst)
+
+    def acquire(self, client: str, operation: str) -> Optional[float]:
+        """
+        Admit a request. Returns None when admitted, otherwise the number of
+        seconds after which the client should retry.
+        """
+        key = (client, operation)
+        if self._in_flight.get(client, 0) >= self.concurrency or self._in_flight.get(
+            key, 0
+        ) >= OPERATION_CONCURRENCY.get(operation, self.operation_concurrency):
+            return 1.0
+
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [self.burst, now]
+            if len(self._buckets) > MAX_BUCKETS:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+
+        cost = self.cost(operation)
+        if bucket[0] < cost:
+            return (cost - bucket[0]) / self.rate
+
+        bucket[0] -= cost
+        for counter in (client, key):
+            self._in_flight[counter] = self._in_flight.get(counter, 0) + 1
+        return None
+
+    def release(self, client: str, operation: str, cached: bool = False) -> None:
+        """
+        Finish an admitted request, refunding part of its cost if it was
+        served from the cache.
+        """
+        for counter in (client, (client, operation)):
+            in_flight = self._in_flight.get(counter, 0) - 1
+            if in_flight > 0:
+                self._in_flight[counter] = in_flight
+            else:
+                self._in_flight.pop(counter, None)
+
+        if cached:
+            bucket = self._buckets.get((client, operation))
+            if bucket is not None:
+                refund = self.cost(operation) * (1 - self.cached_cost)
+                bucket[0] = min(self.burst, bucket[0] + refund)
+
+
+rate_limiter = RateLimiter()
+
+
+def client_key(scope: Scope) -> Optional[str]:
+    """
+    Identify the client of a request by its address. Credentials are not
+    verified by the API, so they can't identify a client: a caller could get a
+    fresh budget with every made-up token. Requests made by MCP tool calls are
+    identified by the MCP client; None when they don't name one.
+    """
+    client = scope.get("client")
+    if client is not None and tuple(client) == INTERNAL_CLIENT:
+        return Headers(scope=scope).get(MCP_CLIENT_HEADER)
+    return f"ip:{client[0]}" if client else "ip:unknown"
+
+
+def retry_after_header(seconds: float) -> str:
+    return str(max(1, math.ceil(seconds)))
+
+
+class RateLimitMiddleware:
+    """
+    Apply the rate limiter to API operations (routes with an operation ID that
+    appear in the schema, and HIDDEN_OPERATIONS), including those called by
+    MCP tools. Limited requests get 429 with Retry-After before reaching the
+    route.
+    """
+
+    def __init__(self, app: ASGIApp, limiter: RateLimiter = rate_limiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if not RATE_LIMIT_ENABLED or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if tuple(scope.get("client") or ()) != INTERNAL_CLIENT:
+            token = connection_client.set(client_key(scope))
+            try:
+                await self._limit(scope, receive, send)
+            finally:
+                connection_client.reset(token)
+        else:
+            await self._limit(scope, receive, send)
+
+    async def _limit(self, scope: Scope, receive: Receive, send: Send) -> None:
+        operation = resolve_operation(scope, HIDDEN_OPERATIONS)
+        client = client_key(scope) if operation is not None else None
+        if client is None:
+            await self.app(scope, receive, send)
+            return
+
+        retry_after = self.limiter.acquire(client, operation)
+        if retry_after is not None:
+            # The delay is repeated in the body for MCP clients, which only
+            # see the body of failed tool calls
+            seconds = retry_after_header(retry_after)
+            response = JSONResponse(
+                {"detail": f"Rate limit exceeded, retry after {seconds} seconds"},
+                status_code=429,
+                headers={"Retry-After": seconds},
+            )
+            await response(scope, receive, send)
+            return
+
+        cached = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal cached
+            if message["type"] == "http.response.start":
+                cached = Headers(raw=message["headers"]).get("x-cache") == "HIT"
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.limiter.release(client, operation, cached)
@@ -0,0 +1,24 @@
+from typing import Collection, Optional
+
+from fastapi.routing import APIRoute
+from starlette.routing import Match
+from starlette.types import Scope
+
+
+def resolve_operation(scope: Scope, hidden: Collection[str] = ()) -> Optional[str]:
+    """
+    Operation ID of the API route a request will be dispatched to, or None
+    for routes without one or hidden from the schema (docs, the MCP
+    transport), unless their operation ID is in `hidden`.
+    """
+    for route in scope["app"].router.routes:
+        if not isinstance(route, APIRoute):
+            continue
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            if route.operation_id and (
+                route.include_in_schema or route.operation_id in hidden
+            ):
+                return route.operation_id
+            return None
+    return None
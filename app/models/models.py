@@ -1,5 +1,6 @@
 from sqlalchemy import (
     Column,
+    DateTime,
     Integer,
     String,
     Float,
@@ -7,18 +8,31 @@ from sqlalchemy import (
     Text,
     Enum,
     Table,
+    Index,
+    LargeBinary,
 )
+from sqlalchemy.ext.associationproxy import association_proxy
+from sqlalchemy.ext.orderinglist import ordering_list
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
 import enum
 
 from app.database.connection import Base
 
-# Association table for many-to-many relationships
+# Association table for many-to-many relationships. The composite primary key
+# rejects duplicate links and clusters each day's links together (the table is
+# stored WITHOUT ROWID on SQLite), the reverse index serves activity -> day
+# lookups, and `position` keeps the order activities were added in.
 itinerary_activity = Table(
     "itinerary_activity",
     Base.metadata,
-    Column("itinerary_day_id", Integer, ForeignKey("itinerary_days.id")),
-    Column("activity_id", Integer, ForeignKey("activities.id")),
+    Column(
+        "itinerary_day_id", Integer, ForeignKey("itinerary_days.id"), primary_key=True
+    ),
+    Column("activity_id", Integer, ForeignKey("activities.id"), primary_key=True),
+    Column("position", Integer, nullable=False, default=0),
+    Index("ix_itinerary_activity_activity_day", "activity_id", "itinerary_day_id"),
+    sqlite_with_rowid=False,
 )
 
 
@@ -43,9 +57,11 @@ class Hotel(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
-    location_id = Column(Integer, ForeignKey("locations.id"), nullable=False)
+    location_id = Column(
+        Integer, ForeignKey("locations.id"), nullable=False, index=True
+    )
     description = Column(Text)
-    rating = Column(Float)  # e.g., 4.5 stars
+    rating = Column(Float, index=True)  # e.g., 4.5 stars
     price_per_night = Column(Float)  # Average price per night
 
     # Relationships
@@ -72,7 +88,7 @@ class Transfer(Base):
     destination_location_id = Column(
         Integer, ForeignKey("locations.id"), nullable=False
     )
-    transfer_type = Column(Enum(TransferType), nullable=False)
+    transfer_type = Column(Enum(TransferType), nullable=False, index=True)
     duration_minutes = Column(Integer)  # Duration in minutes
     price = Column(Float)
 
@@ -90,7 +106,9 @@ class Activity(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
-    location_id = Column(Integer, ForeignKey("locations.id"), nullable=False)
+    location_id = Column(
+        Integer, ForeignKey("locations.id"), nullable=False, index=True
+    )
     description = Column(Text)
     duration_minutes = Column(Integer)  # Duration in minutes
     price = Column(Float)
@@ -98,7 +116,7 @@ class Activity(Base):
     # Relationships
     location = relationship("Location", back_populates="activities")
     itinerary_days = relationship(
-        "ItineraryDay", secondary=itinerary_activity, back_populates="activities"
+        "ItineraryDay", secondary=itinerary_activity, viewonly=True
     )
 
     def __repr__(self):
@@ -115,6 +133,10 @@ class Itinerary(Base):
     duration_nights = Column(Integer, nullable=False)  # e.g., 5 nights
     is_recommended = Column(Integer, default=0)  # 1 for recommended itineraries
 
+    __table_args__ = (
+        Index("ix_itineraries_region_duration", "region", "duration_nights"),
+    )
+
     # Relationships
     days = relationship(
         "ItineraryDay", back_populates="itinerary", order_by="ItineraryDay.day_number"
@@ -128,12 +150,14 @@ class ItineraryDay(Base):
     __tablename__ = "itinerary_days"
 
     id = Column(Integer, primary_key=True, index=True)
-    itinerary_id = Column(Integer, ForeignKey("itineraries.id"), nullable=False)
+    itinerary_id = Column(
+        Integer, ForeignKey("itineraries.id"), nullable=False, index=True
+    )
     day_number = Column(
         Integer, nullable=False
     )  # 1-based index of the day in the itinerary
     transfer_id = Column(
-        Integer, ForeignKey("transfers.id"), nullable=True
+        Integer, ForeignKey("transfers.id"), nullable=True, index=True
     )  # Optional transfer for this day
 
     # Relationships
@@ -142,14 +166,35 @@ class ItineraryDay(Base):
         "HotelStay", back_populates="itinerary_day", uselist=False
     )
     transfer = relationship("Transfer", back_populates="itinerary_days")
-    activities = relationship(
-        "Activity", secondary=itinerary_activity, back_populates="itinerary_days"
+    activity_links = relationship(
+        "ItineraryDayActivity",
+        order_by="ItineraryDayActivity.position",
+        collection_class=ordering_list("position"),
+        cascade="all, delete-orphan",
+    )
+    # The day's activities in order; appending sets the link's position
+    activities = association_proxy(
+        "activity_links",
+        "activity",
+        creator=lambda activity: ItineraryDayActivity(activity=activity),
     )
 
     def __repr__(self):
         return f"<ItineraryDay {self.day_number} of Itinerary {self.itinerary_id}>"
 
 
+class ItineraryDayActivity(Base):
+    __table__ = itinerary_activity
+
+    activity = relationship("Activity")
+
+    def __repr__(self):
+        return (
+            f"<ItineraryDayActivity {self.activity_id} at {self.position} "
+            f"of Day {self.itinerary_day_id}>"
+        )
+
+
 class HotelStay(Base):
     __tablename__ = "hotel_stays"
 
@@ -157,7 +202,7 @@ class HotelStay(Base):
     itinerary_day_id = Column(
         Integer, ForeignKey("itinerary_days.id"), nullable=False, unique=True
     )
-    hotel_id = Column(Integer, ForeignKey("hotels.id"), nullable=False)
+    hotel_id = Column(Integer, ForeignKey("hotels.id"), nullable=False, index=True)
 
     # Relationships
     itinerary_day = relationship("ItineraryDay", back_populates="hotel_stay")
@@ -165,3 +210,142 @@ class HotelStay(Base):
 
     def __repr__(self):
         return f"<HotelStay at {self.hotel_id} for Day {self.itinerary_day.day_number}>"
+
+
+class ChangeLog(Base):
+    """
+    Append-only log of committed writes, one row per changed entity. Written in
+    the same transaction as the change, polled by every worker to invalidate
+    its in-process caches, and served to downstream consumers as a change
+    feed (`/changes`).
+    """
+
+    __tablename__ = "change_log"
+
+    seq = Column(Integer, primary_key=True, autoincrement=True)
+    entity = Column(String, nullable=False)  # e.g. itinerary, hotel
+    entity_id = Column(Integer, nullable=False)
+    origin = Column(String, nullable=False)  # Process that made the change
+    operation = Column(String)  # create or update; null in entries before 0007
+    changed_at = Column(DateTime, nullable=False, server_default=func.now())
+
+    def __repr__(self):
+        return f"<ChangeLog {self.seq}: {self.entity} {self.entity_id}>"
+
+
+class IdempotencyKey(Base):
+    """
+    Maps a client idempotency key (or the content hash of a create request) to
+    the itinerary it created, until `expires_at`. Keys are stored as SHA-256
+    digests so every entry has a fixed, small size.
+    """
+
+    __tablename__ = "idempotency_keys"
+
+    key = Column(LargeBinary(32), primary_key=True)
+    request_hash = Column(LargeBinary(32), nullable=False)
+    itinerary_id = Column(Integer, ForeignKey("itineraries.id"), nullable=False)
+    expires_at = Column(Integer, nullable=False, index=True)  # Unix time
+
+    def __repr__(self):
+        return f"<IdempotencyKey {self.key.hex()[:12]} -> {self.itinerary_id}>"
+
+
+class HotelInventory(Base):
+    """
+    Rooms available and the nightly rate of a hotel on one date. Dates are
+    stored as proleptic Gregorian ordinals (`date.toordinal()`), so a stay is a
+    contiguous range of the primary key: a hotel's nights over any period are
+    read with one index range scan, clustered on disk (WITHOUT ROWID on
+    SQLite). Dates without a row are not bookable.
+    """
+
+    __tablename__ = "hotel_inventory"
+
+    hotel_id = Column(Integer, ForeignKey("hotels.id"), primary_key=True)
+    day = Column(Integer, primary_key=True)  # date.toordinal()
+    rooms_available = Column(Integer, nullable=False)
+    price = Column(Float, nullable=False)  # Per room per night
+
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    def __repr__(self):
+        return f"<HotelInventory {self.hotel_id} on {self.day}>"
+
+
+class ActivityInventory(Base):
+    """
+    Places available and the price per person of an activity on one date,
+    laid out like HotelInventory.
+    """
+
+    __tablename__ = "activity_inventory"
+
+    activity_id = Column(Integer, ForeignKey("activities.id"), primary_key=True)
+    day = Column(Integer, primary_key=True)  # date.toordinal()
+    places_available = Column(Integer, nullable=False)
+    price = Column(Float, nullable=False)  # Per person
+
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    def __repr__(self):
+        return f"<ActivityInventory {self.activity_id} on {self.day}>"
+
+
+class ItineraryStats(Base):
+    """
+    Usage counters of an itinerary, accumulated in each worker and added here
+    by the ranking job.
+    """
+
+    __tablename__ = "itinerary_stats"
+
+    itinerary_id = Column(Integer, ForeignKey("itineraries.id"), primary_key=True)
+    read_count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ItineraryStats {self.itinerary_id}: {self.read_count} reads>"
+
+
+class ItineraryRanking(Base):
+    """
+    Precomputed recommendation ranking, rebuilt periodically by the ranking
+    job. `rank` is the position among all itineraries (1 is best). The
+    (region, rank) index serves "top N in a region" with one range scan in
+    rank order, filtering the duration on the way, with no sort.
+    """
+
+    __tablename__ = "itinerary_rankings"
+
+    itinerary_id = Column(Integer, ForeignKey("itineraries.id"), primary_key=True)
+    rank = Column(Integer, nullable=False, unique=True)
+    region = Column(String, nullable=False)
+    duration_nights = Column(Integer, nullable=False)
+    score = Column(Float, nullable=False)
+    # Components of the score, each between 0 and 1
+    popularity = Column(Float, nullable=False)
+    value = Column(Float, nullable=False)
+    diversity = Column(Float, nullable=False)
+    price_per_night = Column(Float, nullable=False)
+    computed_at = Column(DateTime, nullable=False, server_default=func.now())
+
+    __table_args__ = (Index("ix_itinerary_rankings_region_rank", "region", "rank"),)
+
+    def __repr__(self):
+        return f"<ItineraryRanking {self.rank}: {self.itinerary_id}>"
+
+
+class JobLease(Base):
+    """
+    Lease on a periodic job shared by the workers: the worker that claims it
+    runs the job, and no other does until `expires_at`.
+    """
+
+    __tablename__ = "job_leases"
+
+    name = Column(String, primary_key=True)
+    holder = Column(String, nullable=False)  # Worker process (sync.ORIGIN)
+    expires_at = Column(Float, nullable=False)  # Unix time
+
+    def __repr__(self):
+        return f"<JobLease {self.name}: {self.holder} until {self.expires_at}>"
@@ -1,4 +1,5 @@
-from pydantic import BaseModel
+import datetime
+from pydantic import BaseModel, Field
 from typing import List, Optional
 from enum import Enum
 
@@ -12,6 +13,37 @@ class TransferTypeEnum(str, Enum):
     AIRPLANE = "airplane"
 
 
+# Enums for sorting itinerary listings
+class ItinerarySortField(str, Enum):
+    ID = "id"
+    NAME = "name"
+    REGION = "region"
+    DURATION_NIGHTS = "duration_nights"
+
+
+class SortOrder(str, Enum):
+    ASC = "asc"
+    DESC = "desc"
+
+
+# Enums for response encoding
+class ResponseFormat(str, Enum):
+    JSON = "json"
+    MSGPACK = "msgpack"
+
+
+class ResponseShape(str, Enum):
+    NESTED = "nested"  # Related entities inlined on every day
+    NORMALIZED = "normalized"  # Related entities returned once in side tables
+
+
+# Enum for the status of queued writes
+class WriteStatus(str, Enum):
+    PENDING = "pending"
+    DONE = "done"
+    FAILED = "failed"
+
+
 # Location Schemas
 class LocationBase(BaseModel):
     name: str
@@ -23,6 +55,11 @@ class LocationCreate(LocationBase):
     pass
 
 
+# Batch upsert item: updates the row with `id` if it exists, creates it otherwise
+class LocationUpsert(LocationCreate):
+    id: Optional[int] = None
+
+
 class Location(LocationBase):
     id: int
 
@@ -42,6 +79,11 @@ class HotelCreate(HotelBase):
     pass
 
 
+# Batch upsert item: updates the row with `id` if it exists, creates it otherwise
+class HotelUpsert(HotelCreate):
+    id: Optional[int] = None
+
+
 class Hotel(HotelBase):
     id: int
 
@@ -61,6 +103,11 @@ class TransferCreate(TransferBase):
     pass
 
 
+# Batch upsert item: updates the row with `id` if it exists, creates it otherwise
+class TransferUpsert(TransferCreate):
+    id: Optional[int] = None
+
+
 class Transfer(TransferBase):
     id: int
 
@@ -80,6 +127,11 @@ class ActivityCreate(ActivityBase):
     pass
 
 
+# Batch upsert item: updates the row with `id` if it exists, creates it otherwise
+class ActivityUpsert(ActivityCreate):
+    id: Optional[int] = None
+
+
 class Activity(ActivityBase):
     id: int
 
@@ -132,6 +184,8 @@ class ItineraryBase(BaseModel):
 
 class ItineraryCreate(ItineraryBase):
     days: List[ItineraryDayCreate]
+    # Retries with the same key return the itinerary created by the first call
+    idempotency_key: Optional[str] = Field(None, max_length=255)
 
 
 class Itinerary(ItineraryBase):
@@ -144,3 +198,89 @@ class Itinerary(ItineraryBase):
 # Schema for detailed itinerary response with expanded relationships
 class ItineraryDetailed(Itinerary):
     pass
+
+
+# One result of a batch lookup by ID; `itinerary` is null when not found
+class ItineraryBatchItem(BaseModel):
+    id: int
+    found: bool
+    itinerary: Optional[ItineraryDetailed] = None
+
+
+# Itinerary in the precomputed recommendation ranking, with its score
+# components (each between 0 and 1)
+class RankedItinerary(BaseModel):
+    rank: int
+    score: float
+    popularity: float
+    value: float
+    diversity: float
+    price_per_night: float
+    itinerary: ItineraryDetailed
+
+
+# Status of a queued itinerary create (write-behind mode)
+class ItineraryWriteTicket(BaseModel):
+    ticket_id: str
+    status: WriteStatus
+    itinerary_id: Optional[int] = None
+    detail: Optional[str] = None
+
+
+# Dated inventory: the rooms of a hotel or the places of an activity available
+# on each date, and their price (per room per night, or per person)
+class InventoryUpdate(BaseModel):
+    start_date: datetime.date
+    end_date: datetime.date  # Inclusive
+    available: int = Field(..., ge=0)
+    price: float = Field(..., ge=0)
+
+
+class InventoryDay(BaseModel):
+    date: datetime.date
+    available: int
+    price: float
+
+
+# Price of an itinerary for a party on given dates
+class PriceBreakdown(BaseModel):
+    hotels: float
+    activities: float
+    transfers: float
+    total: float
+
+
+# A hotel night or activity without enough rooms or places
+class UnavailableItem(BaseModel):
+    date: datetime.date
+    hotel_id: Optional[int] = None
+    activity_id: Optional[int] = None
+
+
+# Availability and price of an itinerary starting on a date
+class ItineraryAvailability(BaseModel):
+    itinerary_id: int
+    name: str
+    region: str
+    duration_nights: int
+    start_date: datetime.date
+    end_date: datetime.date
+    available: bool
+    price: Optional[PriceBreakdown] = None
+    unavailable: List[UnavailableItem] = []
+
+
+# Change feed: one committed change of an entity, in sequence order
+class ChangeEntry(BaseModel):
+    seq: int
+    entity: str
+    entity_id: int
+    operation: Optional[str] = None
+    changed_at: datetime.datetime
+
+
+class ChangePage(BaseModel):
+    changes: List[ChangeEntry]
+    # Pass as `since` to read the following changes
+    next_since: int
+    has_more: bool
@@ -0,0 +1,465 @@
+import datetime
+import heapq
+import math
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.config import AVAILABILITY_MAX_DAYS
+from app.database.connection import Base
+from app.models.models import (
+    Activity,
+    ActivityInventory,
+    Hotel,
+    HotelInventory,
+    Itinerary,
+)
+from app.schemas.schemas import InventoryUpdate
+from app.services import events
+from app.services.reference_cache import ReferenceSnapshot
+from app.services.serialization import ItineraryRows
+from app.services.sync import record_changes
+
+# Guests sharing a room when a search doesn't give the number of rooms
+GUESTS_PER_ROOM = 2
+
+# Candidate itineraries loaded and priced at once by an availability search
+AVAILABILITY_CHUNK_SIZE = 500
+
+
+class InventoryTable(NamedTuple):
+    entity_model: type
+    model: type
+    key: Any  # Column of the entity ID
+    available: Any  # Column of the rooms or places available
+    change_entity: str  # Entity name in the change log
+
+
+INVENTORY_TABLES: Dict[str, InventoryTable] = {
+    events.HOTEL: InventoryTable(
+        Hotel,
+        HotelInventory,
+        HotelInventory.hotel_id,
+        HotelInventory.rooms_available,
+        events.HOTEL_INVENTORY,
+    ),
+    events.ACTIVITY: InventoryTable(
+        Activity,
+        ActivityInventory,
+        ActivityInventory.activity_id,
+        ActivityInventory.places_available,
+        events.ACTIVITY_INVENTORY,
+    ),
+}
+
+# (entity ID, date ordinal) -> price
+Rates = Dict[Tuple[int, int], float]
+
+
+def check_date_range(start: datetime.date, end: datetime.date) -> None:
+    """
+    Raises:
+        ValueError: If the range is empty or longer than AVAILABILITY_MAX_DAYS
+    """
+    if end < start:
+        raise ValueError("The end date must not be before the start date")
+    if (end - start).days + 1 > AVAILABILITY_MAX_DAYS:
+        raise ValueError(f"Date ranges are limited to {AVAILABILITY_MAX_DAYS} days")
+
+
+def load_rates(
+    db: Session,
+    table: InventoryTable,
+    entity_ids: Iterable[int],
+    first_day: int,
+    last_day: int,
+    minimum: int,
+) -> Rates:
+    """
+    Load the prices of every date in [first_day, last_day] on which the
+    entities have at least `minimum` rooms or places, with one query. The
+    primary key is (entity, day), so this is one index range scan per entity
+    whatever the length of the range.
+    """
+    entity_ids = list(entity_ids)
+    if not entity_ids:
+        return {}
+
+    return {
+        (entity_id, day): price
+        for entity_id, day, price in db.execute(
+            select(table.key, table.model.day, table.model.price).where(
+                table.key.in_(entity_ids),
+                table.model.day.between(first_day, last_day),
+                table.available >= minimum,
+            )
+        )
+    }
+
+
+class RateWindow:
+    """
+    Rates of a set of hotels or activities from `first_day` on, shared by the
+    chunks of a search. Each entity's dates are read with one index range
+    scan (see load_rates) when a chunk first references it, and only
+    extended if a later chunk needs later dates. It holds one rate per entity
+    and date of the trip, so it is bounded by the reference data rather than
+    the number of itineraries.
+    """
+
+    def __init__(
+        self, db: Session, table: InventoryTable, first_day: int, minimum: int
+    ):
+        self.db = db
+        self.table = table
+        self.first_day = first_day
+        self.minimum = minimum
+        self.rates: Rates = {}
+        # Entity ID -> last day loaded
+        self._loaded: Dict[int, int] = {}
+
+    def load(self, entity_ids: Iterable[int], last_day: int) -> Rates:
+        """
+        Load the rates of the entities up to `last_day`, reading only the
+        dates not loaded yet. Returns all the rates loaded so far.
+        """
+        # Entities grouped by the first day they are missing
+        missing: Dict[int, List[int]] = {}
+        for entity_id in entity_ids:
+            loaded = self._loaded.get(entity_id, self.first_day - 1)
+            if loaded < last_day:
+                missing.setdefault(loaded + 1, []).append(entity_id)
+                self._loaded[entity_id] = last_day
+        for from_day, ids in missing.items():
+            self.rates.update(
+                load_rates(self.db, self.table, ids, from_day, last_day, self.minimum)
+            )
+        return self.rates
+
+
+def quote(
+    itinerary: Any,
+    rows: ItineraryRows,
+    snapshot: ReferenceSnapshot,
+    start_day: int,
+    party_size: int,
+    rooms: int,
+    hotel_rates: Rates,
+    activity_rates: Rates,
+) -> Dict[str, Any]:
+    """
+    Availability and price of an itinerary starting on `start_day`. Day N of
+    the itinerary is `start_day + N - 1`: its hotel stay is that night, and
+    its activities take place that day. Transfers are charged once at their
+    listed price.
+    """
+    hotels = activities = transfers = 0.0
+    unavailable = []
+    for day_id, _, day_number, transfer_id in rows.days[itinerary.id]:
+        day = start_day + day_number - 1
+        stay = rows.stays.get(day_id)
+        if stay is not None:
+            rate = hotel_rates.get((stay[2], day))
+            if rate is None:
+                unavailable.append(
+                    {"date": datetime.date.fromordinal(day), "hotel_id": stay[2]}
+                )
+            else:
+                hotels += rate * rooms
+        for activity_id in rows.activity_ids.get(day_id, []):
+            rate = activity_rates.get((activity_id, day))
+            if rate is None:
+                unavailable.append(
+                    {"date": datetime.date.fromordinal(day), "activity_id": activity_id}
+                )
+            else:
+                activities += rate * party_size
+        # A transfer that doesn't exist is not charged
+        transfer = snapshot.transfers.get(transfer_id) if transfer_id else None
+        if transfer is not None:
+            transfers += transfer.price or 0.0
+
+    available = not unavailable
+    return {
+        "itinerary_id": itinerary.id,
+        "name": itinerary.name,
+        "region": itinerary.region,
+        "duration_nights": itinerary.duration_nights,
+        "start_date": datetime.date.fromordinal(start_day),
+        "end_date": datetime.date.fromordinal(start_day + itinerary.duration_nights),
+        "available": available,
+        "price": (
+            {
+                "hotels": round(hotels, 2),
+                "activities": round(activities, 2),
+                "transfers": round(transfers, 2),
+                "total": round(hotels + activities + transfers, 2),
+            }
+            if available
+            else None
+        ),
+        "unavailable": unavailable,
+    }
+
+
+class AvailabilityService:
+    """
+    Dated inventory of hotels and activities, and the availability and price
+    of itineraries on given dates.
+
+    Itineraries are evaluated in bulk: their days, stays and activity links
+    are read with one query each (as for serialization), the inventory of all
+    referenced hotels and activities over the whole period with one query per
+    table, an index range scan per entity, and every itinerary and start date
+    is then priced in memory.
+    """
+
+    @staticmethod
+    def get_inventory(
+        db: Session,
+        entity: str,
+        entity_id: int,
+        start: datetime.date,
+        end: datetime.date,
+    ) -> List[Dict[str, Any]]:
+        """
+        Retrieve the inventory of a hotel or activity between two dates
+        (inclusive). Dates without inventory are omitted.
+
+        Raises:
+            ValueError: If the date range is invalid
+        """
+        check_date_range(start, end)
+        table = INVENTORY_TABLES[entity]
+        return [
+            {
+                "date": datetime.date.fromordinal(day),
+                "available": available,
+                "price": price,
+            }
+            for day, available, price in db.execute(
+                select(table.model.day, table.available, table.model.price)
+                .where(
+                    table.key == entity_id,
+                    table.model.day.between(start.toordinal(), end.toordinal()),
+                )
+                .order_by(table.model.day)
+            )
+        ]
+
+    @staticmethod
+    def set_inventory(
+        db: Session, entity: str, entity_id: int, update: InventoryUpdate
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Set the rooms or places available and the price of a hotel or activity
+        on every date of a range, in one transaction recorded in the change
+        log. Returns the inventory of the range, or None if the hotel or
+        activity does not exist.
+
+        Raises:
+            ValueError: If the date range is invalid
+        """
+        check_date_range(update.start_date, update.end_date)
+        table = INVENTORY_TABLES[entity]
+        if db.get(table.entity_model, entity_id) is None:
+            return None
+
+        first_day = update.start_date.toordinal()
+        last_day = update.end_date.toordinal()
+        try:
+            existing: Dict[int, Base] = {
+                row.day: row
+                for row in db.query(table.model).filter(
+                    table.key == entity_id,
+                    table.model.day.between(first_day, last_day),
+                )
+            }
+            for day in range(first_day, last_day + 1):
+                row = existing.get(day)
+                if row is None:
+                    row = table.model(day=day)
+                    setattr(row, table.key.key, entity_id)
+                    db.add(row)
+                setattr(row, table.available.key, update.available)
+                row.price = update.price
+            record_changes(db, table.change_entity, [entity_id], events.UPDATE)
+            db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            raise SQLAlchemyError(f"Database error: {str(e)}")
+
+        events.publish(table.change_entity, [entity_id])
+
+        return AvailabilityService.get_inventory(
+            db, entity, entity_id, update.start_date, update.end_date
+        )
+
+    @staticmethod
+    def find_available_itineraries(
+        db: Session,
+        start_date: datetime.date,
+        party_size: int,
+        rooms: Optional[int] = None,
+        region: Optional[str] = None,
+        min_nights: Optional[int] = None,
+        max_nights: Optional[int] = None,
+        recommended: Optional[bool] = None,
+        skip: int = 0,
+        limit: int = 100,
+    ) -> List[Dict[str, Any]]:
+        """
+        Find the itineraries that can start on a date for a party: every hotel
+        night has enough rooms and every activity enough places. Returns them
+        with their price, cheapest first.
+
+        `rooms` defaults to one room per GUESTS_PER_ROOM guests.
+
+        Candidates matching the filters are read by keyset and priced
+        AVAILABILITY_CHUNK_SIZE at a time, keeping only the `skip + limit`
+        cheapest available ones, so memory doesn't grow with the catalog. The
+        inventory of each hotel and activity is read once for the whole
+        search, with one index range scan over the trip's dates (see
+        RateWindow), rather than looked up day by day.
+        """
+        if rooms is None:
+            rooms = math.ceil(party_size / GUESTS_PER_ROOM)
+        start_day = start_date.toordinal()
+        windows = (
+            RateWindow(db, INVENTORY_TABLES[events.HOTEL], start_day, rooms),
+            RateWindow(db, INVENTORY_TABLES[events.ACTIVITY], start_day, party_size),
+        )
+
+        query = (
+            select(
+                Itinerary.id,
+                Itinerary.name,
+                Itinerary.region,
+                Itinerary.duration_nights,
+            )
+            .order_by(Itinerary.id)
+            .limit(AVAILABILITY_CHUNK_SIZE)
+        )
+        if region:
+            query = query.where(Itinerary.region == region)
+        if min_nights:
+            query = query.where(Itinerary.duration_nights >= min_nights)
+        if max_nights:
+            query = query.where(Itinerary.duration_nights <= max_nights)
+        if recommended is not None:
+            query = query.where(Itinerary.is_recommended == (1 if recommended else 0))
+
+        def price_order(q: Dict[str, Any]) -> Tuple[float, int]:
+            return (q["price"]["total"], q["itinerary_id"])
+
+        cheapest: List[Dict[str, Any]] = []
+        last_id = 0
+        while True:
+            chunk = db.execute(query.where(Itinerary.id > last_id)).all()
+            quotes = AvailabilityService._quote_all(
+                db, chunk, [start_day], party_size, rooms, windows
+            )
+            cheapest = heapq.nsmallest(
+                skip + limit,
+                cheapest + [q for q in quotes if q["available"]],
+                key=price_order,
+            )
+            if len(chunk) < AVAILABILITY_CHUNK_SIZE:
+                break
+            last_id = chunk[-1].id
+        return cheapest[skip : skip + limit]
+
+    @staticmethod
+    def get_itinerary_availability(
+        db: Session,
+        itinerary_id: int,
+        start: datetime.date,
+        end: datetime.date,
+        party_size: int,
+        rooms: Optional[int] = None,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Availability calendar of an itinerary: its availability and price for
+        every start date between two dates (inclusive). Returns None if the
+        itinerary does not exist.
+
+        Raises:
+            ValueError: If the date range is invalid
+        """
+        check_date_range(start, end)
+        itinerary = db.execute(
+            select(
+                Itinerary.id,
+                Itinerary.name,
+                Itinerary.region,
+                Itinerary.duration_nights,
+            ).where(Itinerary.id == itinerary_id)
+        ).first()
+        if itinerary is None:
+            return None
+
+        return AvailabilityService._quote_all(
+            db,
+            [itinerary],
+            range(start.toordinal(), end.toordinal() + 1),
+            party_size,
+            rooms,
+        )
+
+    @staticmethod
+    def _quote_all(
+        db: Session,
+        itineraries: List[Any],
+        start_days: Iterable[int],
+        party_size: int,
+        rooms: Optional[int],
+        windows: Optional[Tuple[RateWindow, RateWindow]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Quote every itinerary on every start date. `windows` are the hotel
+        and activity rates of a search spanning several calls, starting on its
+        first start date; new ones by default.
+        """
+        start_days = list(start_days)
+        if not itineraries or not start_days:
+            return []
+        if rooms is None:
+            rooms = math.ceil(party_size / GUESTS_PER_ROOM)
+
+        rows = ItineraryRows(db, [i.id for i in itineraries])
+        snapshot = rows.snapshot(db)
+        last_offset = max(
+            (day[2] - 1 for days in rows.days.values() for day in days), default=0
+        )
+        first_day, last_day = start_days[0], start_days[-1] + last_offset
+
+        if windows is None:
+            windows = (
+                RateWindow(db, INVENTORY_TABLES[events.HOTEL], first_day, rooms),
+                RateWindow(
+                    db, INVENTORY_TABLES[events.ACTIVITY], first_day, party_size
+                ),
+            )
+        hotel_window, activity_window = windows
+        hotel_rates = hotel_window.load(
+            {stay[2] for stay in rows.stays.values()}, last_day
+        )
+        activity_rates = activity_window.load(
+            {a for ids in rows.activity_ids.values() for a in ids}, last_day
+        )
+        return [
+            quote(
+                itinerary,
+                rows,
+                snapshot,
+                start_day,
+                party_size,
+                rooms,
+                hotel_rates,
+                activity_rates,
+            )
+            for itinerary in itineraries
+            for start_day in start_days
+        ]
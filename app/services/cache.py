@@ -0,0 +1,191 @@
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Hashable, Iterable, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.config import ITINERARY_CACHE_SIZE, LISTING_CACHE_SIZE
+from app.services import events
+from app.services.sync import replica_is_current
+
+Tag = Tuple[str, object]
+
+
+class CacheStats:
+    """
+    Cache lookups made while serving one request.
+    """
+
+    __slots__ = ("hits", "misses")
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def status(self) -> str:
+        """
+        `HIT` when the request was served entirely from the caches, `MISS`
+        otherwise (including when no cache was consulted).
+        """
+        return "HIT" if self.hits and not self.misses else "MISS"
+
+
+_request_stats: ContextVar[Optional[CacheStats]] = ContextVar(
+    "cache_stats", default=None
+)
+
+
+@contextmanager
+def track_cache_lookups():
+    """
+    Count the cache hits and misses of the current context.
+
+    Usage:
+        with track_cache_lookups() as stats:
+            ...
+        response.headers["X-Cache"] = stats.status
+    """
+    stats = CacheStats()
+    token = _request_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _request_stats.reset(token)
+
+
+class DependencyCache:
+    """
+    Bounded LRU cache where every entry records the entities it was built
+    from. A reverse index maps each dependency tag to the keys depending on
+    it, so a change invalidates exactly the affected entries instead of
+    flushing the whole cache.
+
+    An invalidation can happen while a value is being built from the
+    database. To not cache the value read before the change, callers take a
+    `token()` before reading and pass it to `set`, which drops the value if
+    any of its tags was invalidated in between.
+    """
+
+    def __init__(self, max_size: int, max_versions: int = 100000):
+        self.max_size = max_size
+        self.max_versions = max_versions
+        self._entries: "OrderedDict[Hashable, Tuple[Any, Set[Tag]]]" = OrderedDict()
+        self._dependents: Dict[Tag, Set[Hashable]] = {}
+        # Invalidation counter, and its value at the last invalidation of each
+        # tag. Versions at or below _floor have been forgotten.
+        self._generation = 0
+        self._versions: Dict[Tag, int] = {}
+        self._floor = 0
+        self._lock = threading.Lock()
+
+    def token(self) -> int:
+        """
+        Version of the cache before reading a value to `set`.
+        """
+        return self._generation
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        stats = _request_stats.get()
+        if stats is not None:
+            if entry is None:
+                stats.misses += 1
+            else:
+                stats.hits += 1
+        return entry[0] if entry is not None else None
+
+    def read_token(self, db: Session) -> Optional[int]:
+        """
+        Token to cache a value about to be read with `db`, or None if the
+        session reads from a replica that hasn't caught up with the changes
+        already invalidated, whose values must not be cached.
+        """
+        token = self.token()
+        return token if replica_is_current(db) else None
+
+    def set(
+        self, key: Hashable, value: Any, tags: Iterable[Tag], token: Optional[int]
+    ) -> bool:
+        """
+        Cache a value read after `token` was taken. Returns False, without
+        caching it, if any of its tags has been invalidated since, or if the
+        token is None.
+        """
+        tags = set(tags)
+        with self._lock:
+            if (
+                token is None
+                or token < self._floor
+                or any(self._versions.get(tag, 0) > token for tag in tags)
+            ):
+                return False
+            self._remove(key)
+            self._entries[key] = (value, tags)
+            for tag in tags:
+                self._dependents.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+        return True
+
+    def invalidate(self, tags: Iterable[Tag]) -> int:
+        """
+        Drop every entry depending on any of the tags. Returns the number of
+        entries removed.
+        """
+        removed = 0
+        with self._lock:
+            self._generation += 1
+            if len(self._versions) >= self.max_versions:
+                # Values read before now can no longer be checked tag by tag
+                self._versions.clear()
+                self._floor = self._generation
+            for tag in tags:
+                self._versions[tag] = self._generation
+                for key in self._dependents.pop(tag, ()):
+                    removed += self._remove(key)
+        return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._floor = self._generation
+            self._versions.clear()
+            self._entries.clear()
+            self._dependents.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: Hashable) -> int:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return 0
+        for tag in entry[1]:
+            keys = self._dependents.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._dependents[tag]
+        return 1
+
+
+# Serialized itineraries (nested shape), keyed by itinerary ID
+itinerary_cache = DependencyCache(ITINERARY_CACHE_SIZE)
+# Listing pages (matching itinerary IDs and their nested row counts), keyed by
+# the normalized filters
+listing_cache = DependencyCache(LISTING_CACHE_SIZE)
+
+
+def _invalidate_on_change(event: events.ChangeEvent) -> None:
+    tags = event.tags()
+    itinerary_cache.invalidate(tags)
+    listing_cache.invalidate(tags)
+
+
+events.subscribe(_invalidate_on_change)
@@ -0,0 +1,123 @@
+import asyncio
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.models.models import ChangeLog
+from app.services import events
+from app.services.sync import GAP_SCAN_LIMIT, readable_head
+
+
+class ChangeFeedService:
+    """
+    Serves the change log to downstream consumers (search indexes, analytics,
+    replicas), so they can sync incrementally: each read returns the entries
+    after a sequence number, at a cost proportional to the number of changes
+    rather than the size of the catalog.
+
+    Sequence numbers are assigned at insert, so on databases with concurrent
+    writers a lower one may commit after a higher one is visible. Reads stop
+    before such a gap until it fills or CHANGE_GAP_GRACE has passed (then it
+    was a rolled back transaction), so a cursor never moves past a change
+    that has yet to commit.
+    """
+
+    @staticmethod
+    def latest_seq(db: Session) -> int:
+        """
+        Sequence number of the last change, or 0 if nothing changed yet.
+        """
+        return db.execute(select(func.max(ChangeLog.seq))).scalar() or 0
+
+    @staticmethod
+    def get_changes(
+        db: Session,
+        since: int = 0,
+        limit: int = 100,
+        entities: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Retrieve up to `limit` changes after sequence number `since`, oldest
+        first, optionally only those of the given entity types.
+
+        Returns the changes, `next_since` to pass to the next read, and
+        whether more changes are already available. When filtering by entity,
+        `next_since` moves past the changes of other entities, so they are not
+        scanned again.
+        """
+        latest = ChangeFeedService.latest_seq(db)
+        head = readable_head(db, since, latest)
+        query = (
+            select(
+                ChangeLog.seq,
+                ChangeLog.entity,
+                ChangeLog.entity_id,
+                ChangeLog.operation,
+                ChangeLog.changed_at,
+            )
+            .where(ChangeLog.seq > since, ChangeLog.seq <= head)
+            .order_by(ChangeLog.seq)
+            .limit(limit + 1)
+        )
+        if entities:
+            query = query.where(ChangeLog.entity.in_(entities))
+
+        rows = db.execute(query).all()
+        has_more = len(rows) > limit
+        changes = [
+            {
+                "seq": seq,
+                "entity": entity,
+                "entity_id": entity_id,
+                "operation": operation,
+                "changed_at": changed_at,
+            }
+            for seq, entity, entity_id, operation, changed_at in rows[:limit]
+        ]
+        if has_more:
+            next_since = changes[-1]["seq"]
+        else:
+            next_since = max(since, head)
+            # The gap scan stopped at its limit, not at a gap
+            has_more = head < latest and head == since + GAP_SCAN_LIMIT
+        return {"changes": changes, "next_since": next_since, "has_more": has_more}
+
+
+class ChangeNotifier:
+    """
+    Wakes up change streams when a change is published, whether written by
+    this process or replayed from other workers by the ChangeLogPoller.
+    Events are published from worker threads, so waiters are woken on their
+    own event loop.
+    """
+
+    def __init__(self):
+        self._waiters: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self) -> asyncio.Event:
+        """
+        Register an asyncio.Event, set on every change until unsubscribed.
+        Must be called from the event loop that waits on it.
+        """
+        waiter = asyncio.Event()
+        with self._lock:
+            self._waiters.add((asyncio.get_running_loop(), waiter))
+        return waiter
+
+    def unsubscribe(self, waiter: asyncio.Event) -> None:
+        with self._lock:
+            self._waiters = {w for w in self._waiters if w[1] is not waiter}
+
+    def notify(self, event: Optional[events.ChangeEvent] = None) -> None:
+        with self._lock:
+            waiters = list(self._waiters)
+        for loop, waiter in waiters:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(waiter.set)
+
+
+change_notifier = ChangeNotifier()
+events.subscribe(change_notifier.notify)
@@ -0,0 +1,60 @@
+from typing import Callable, Iterable, List, Tuple
+
+# Entity names used in change events and cache dependency tags
+LOCATION = "location"
+HOTEL = "hotel"
+TRANSFER = "transfer"
+ACTIVITY = "activity"
+ITINERARY = "itinerary"
+# Dated inventory, by hotel or activity ID (change feed only)
+HOTEL_INVENTORY = "hotel_inventory"
+ACTIVITY_INVENTORY = "activity_inventory"
+
+# Kinds of change recorded in the change log
+CREATE = "create"
+UPDATE = "update"
+
+# Dependency on any entity of a type, e.g. listings filtered by hotel rating
+ANY = "*"
+
+
+class ChangeEvent:
+    """
+    Emitted after a committed write that created or updated entities.
+    """
+
+    __slots__ = ("entity", "ids")
+
+    def __init__(self, entity: str, ids: Iterable[int]):
+        self.entity = entity
+        self.ids = tuple(ids)
+
+    def tags(self) -> List[Tuple[str, object]]:
+        """
+        Dependency tags affected by this change: each changed entity, plus the
+        wildcard tag for the entity type.
+        """
+        return [(self.entity, i) for i in self.ids] + [(self.entity, ANY)]
+
+    def __repr__(self):
+        return f"<ChangeEvent {self.entity} {list(self.ids)}>"
+
+
+_subscribers: List[Callable[[ChangeEvent], None]] = []
+
+
+def subscribe(handler: Callable[[ChangeEvent], None]) -> None:
+    """
+    Register a handler called synchronously for every published change.
+    """
+    _subscribers.append(handler)
+
+
+def publish(entity: str, ids: Iterable[int]) -> ChangeEvent:
+    """
+    Notify all subscribers that entities of the given type changed.
+    """
+    event = ChangeEvent(entity, ids)
+    for handler in _subscribers:
+        handler(event)
+    return event
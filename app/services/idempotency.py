@@ -0,0 +1,97 @@
+import hashlib
+import json
+import time
+from typing import Optional
+
+from sqlalchemy import delete
+from sqlalchemy.orm import Session
+
+from app.config import IDEMPOTENCY_KEY_TTL, ITINERARY_DEDUP_WINDOW
+from app.models.models import IdempotencyKey
+from app.schemas.schemas import ItineraryCreate
+
+
+class IdempotencyKeyConflict(Exception):
+    """
+    An idempotency key was reused with a different request payload.
+    """
+
+
+class CreateRequestKeys:
+    """
+    The idempotency store keys of an itinerary create request: the client's
+    idempotency key if given, otherwise the content hash of the payload when
+    duplicate detection is enabled.
+    """
+
+    __slots__ = ("request_hash", "client_key", "content_key")
+
+    def __init__(self, itinerary: ItineraryCreate, idempotency_key: Optional[str]):
+        payload = itinerary.model_dump(mode="json", exclude={"idempotency_key"})
+        self.request_hash = _digest(
+            json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()
+        )
+        self.client_key = (
+            _digest(b"key:" + idempotency_key.encode()) if idempotency_key else None
+        )
+        # Two creates with different client keys are distinct on purpose, so
+        # content deduplication only applies to requests without a key
+        self.content_key = (
+            _digest(b"content:" + self.request_hash)
+            if idempotency_key is None and ITINERARY_DEDUP_WINDOW > 0
+            else None
+        )
+
+    def __bool__(self) -> bool:
+        return self.client_key is not None or self.content_key is not None
+
+
+def _digest(data: bytes) -> bytes:
+    return hashlib.sha256(data).digest()
+
+
+def find_itinerary_id(db: Session, keys: CreateRequestKeys) -> Optional[int]:
+    """
+    Return the ID of the itinerary created by an earlier request with the same
+    keys, if it hasn't expired. A primary key lookup.
+
+    Raises:
+        IdempotencyKeyConflict: If the client key was used with a different
+            payload
+    """
+    key = keys.client_key or keys.content_key
+    if key is None:
+        return None
+
+    entry = db.get(IdempotencyKey, key)
+    if entry is None or entry.expires_at <= time.time():
+        return None
+    if entry.request_hash != keys.request_hash:
+        raise IdempotencyKeyConflict(
+            "Idempotency key was already used with a different request"
+        )
+    return entry.itinerary_id
+
+
+def remember_itinerary_id(
+    db: Session, keys: CreateRequestKeys, itinerary_id: int
+) -> None:
+    """
+    Store the keys of a create request in the current transaction, and drop
+    expired entries. Concurrent requests with the same key fail to commit with
+    an IntegrityError.
+    """
+    now = int(time.time())
+    db.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at <= now))
+    if keys.client_key is not None:
+        key, ttl = keys.client_key, IDEMPOTENCY_KEY_TTL
+    else:
+        key, ttl = keys.content_key, ITINERARY_DEDUP_WINDOW
+    db.add(
+        IdempotencyKey(
+            key=key,
+            request_hash=keys.request_hash,
+            itinerary_id=itinerary_id,
+            expires_at=now + ttl,
+        )
+    )
@@ -1,10 +1,47 @@
-from typing import Optional
+from typing import List, NamedTuple, Optional, Tuple
 
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import func, or_, select
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy.orm import Session
 
-from app.models.models import Activity, HotelStay, Itinerary, ItineraryDay
-from app.schemas.schemas import ItineraryCreate
+from app.models.models import (
+    Activity,
+    Hotel,
+    HotelStay,
+    Itinerary,
+    ItineraryDay,
+    Transfer,
+    TransferType,
+    itinerary_activity,
+)
+from app.schemas.schemas import (
+    ItineraryCreate,
+    ItinerarySortField,
+    ResponseShape,
+    SortOrder,
+    TransferTypeEnum,
+)
+from app.services import events
+from app.services.cache import listing_cache
+from app.services.idempotency import (
+    CreateRequestKeys,
+    find_itinerary_id,
+    remember_itinerary_id,
+)
+from app.services.projection import ItineraryProjection
+from app.services.reference_service import MissingReferences, check_references
+from app.services.sync import record_changes
+
+
+class ListingPage(NamedTuple):
+    """
+    Itinerary IDs matching a listing query, with the number of days and
+    activity links they hold, used to estimate the size of the response.
+    """
+
+    ids: List[int]
+    days: int
+    activity_links: int
 
 
 class ItineraryService:
@@ -17,15 +54,257 @@ class ItineraryService:
         min_nights: Optional[int] = None,
         max_nights: Optional[int] = None,
         recommended: Optional[bool] = None,
+        regions: Optional[List[str]] = None,
+        location_id: Optional[int] = None,
+        hotel_id: Optional[int] = None,
+        min_hotel_rating: Optional[float] = None,
+        activity_id: Optional[int] = None,
+        transfer_type: Optional[TransferTypeEnum] = None,
+        sort_by: ItinerarySortField = ItinerarySortField.ID,
+        sort_order: SortOrder = SortOrder.ASC,
+        projection: Optional[ItineraryProjection] = None,
     ):
         """
         Retrieve a list of itineraries with optional filtering parameters.
+
+        When a projection is given, only the columns and relationships it
+        selects are loaded. Otherwise only the itinerary rows are loaded, and
+        the serializers read days, stays and activity links in bulk.
+        """
+        page = ItineraryService.get_listing_page(
+            db,
+            skip=skip,
+            limit=limit,
+            region=region,
+            min_nights=min_nights,
+            max_nights=max_nights,
+            recommended=recommended,
+            regions=regions,
+            location_id=location_id,
+            hotel_id=hotel_id,
+            min_hotel_rating=min_hotel_rating,
+            activity_id=activity_id,
+            transfer_type=transfer_type,
+            sort_by=sort_by,
+            sort_order=sort_order,
+        )
+        return ItineraryService.load_itineraries(db, page.ids, projection)
+
+    @staticmethod
+    def get_listing_page(
+        db: Session,
+        skip: int = 0,
+        limit: int = 100,
+        region: Optional[str] = None,
+        min_nights: Optional[int] = None,
+        max_nights: Optional[int] = None,
+        recommended: Optional[bool] = None,
+        regions: Optional[List[str]] = None,
+        location_id: Optional[int] = None,
+        hotel_id: Optional[int] = None,
+        min_hotel_rating: Optional[float] = None,
+        activity_id: Optional[int] = None,
+        transfer_type: Optional[TransferTypeEnum] = None,
+        sort_by: ItinerarySortField = ItinerarySortField.ID,
+        sort_order: SortOrder = SortOrder.ASC,
+    ) -> ListingPage:
+        """
+        Find the IDs of the itineraries matching a listing query, in order,
+        and count the nested rows they hold.
+
+        Pages are cached per set of filters, and invalidated only by changes
+        to the entity types the filters depend on.
+        """
+        cache_key = ItineraryService.listing_key(
+            skip=skip,
+            limit=limit,
+            region=region,
+            min_nights=min_nights,
+            max_nights=max_nights,
+            recommended=recommended,
+            regions=regions,
+            location_id=location_id,
+            hotel_id=hotel_id,
+            min_hotel_rating=min_hotel_rating,
+            activity_id=activity_id,
+            transfer_type=transfer_type,
+            sort_by=sort_by,
+            sort_order=sort_order,
+        )
+        page = listing_cache.get(cache_key)
+        if page is not None:
+            return page
+        token = listing_cache.read_token(db)
+
+        query = db.query(Itinerary.id)
+        tags = [(events.ITINERARY, events.ANY)]
+        if location_id is not None or min_hotel_rating is not None:
+            tags.append((events.HOTEL, events.ANY))
+        if location_id is not None:
+            tags.append((events.ACTIVITY, events.ANY))
+        if transfer_type is not None:
+            tags.append((events.TRANSFER, events.ANY))
+
+        query = ItineraryService._apply_filters(
+            query,
+            region=region,
+            regions=regions,
+            min_nights=min_nights,
+            max_nights=max_nights,
+            recommended=recommended,
+            location_id=location_id,
+            hotel_id=hotel_id,
+            min_hotel_rating=min_hotel_rating,
+            activity_id=activity_id,
+            transfer_type=transfer_type,
+        )
+        sort_column = getattr(Itinerary, sort_by.value)
+        if sort_order == SortOrder.DESC:
+            query = query.order_by(sort_column.desc(), Itinerary.id.desc())
+        else:
+            query = query.order_by(sort_column.asc(), Itinerary.id.asc())
+
+        itinerary_ids = [row[0] for row in query.offset(skip).limit(limit)]
+        page = ListingPage(
+            itinerary_ids, *ItineraryService.count_nested_rows(db, itinerary_ids)
+        )
+        listing_cache.set(cache_key, page, tags, token)
+        return page
+
+    @staticmethod
+    def load_itineraries(
+        db: Session,
+        itinerary_ids: List[int],
+        projection: Optional[ItineraryProjection] = None,
+    ) -> List[Itinerary]:
         """
+        Load itineraries by ID, in the order of the IDs.
+        """
+        if not itinerary_ids:
+            return []
+
         query = db.query(Itinerary)
+        if projection is not None:
+            query = query.options(*projection.loader_options())
+        by_id = {i.id: i for i in query.filter(Itinerary.id.in_(itinerary_ids))}
+        return [by_id[i] for i in itinerary_ids if i in by_id]
+
+    @staticmethod
+    def count_nested_rows(db: Session, itinerary_ids: List[int]) -> Tuple[int, int]:
+        """
+        Count the days and activity links of a set of itineraries with one
+        query. Returns (days, activity links).
+        """
+        if not itinerary_ids:
+            return 0, 0
+
+        days = (
+            select(func.count())
+            .select_from(ItineraryDay)
+            .where(ItineraryDay.itinerary_id.in_(itinerary_ids))
+            .scalar_subquery()
+        )
+        links = (
+            select(func.count())
+            .select_from(itinerary_activity)
+            .join(
+                ItineraryDay, ItineraryDay.id == itinerary_activity.c.itinerary_day_id
+            )
+            .where(ItineraryDay.itinerary_id.in_(itinerary_ids))
+            .scalar_subquery()
+        )
+        return tuple(db.execute(select(days, links)).one())
+
+    @staticmethod
+    def estimate_response_rows(
+        page: ListingPage,
+        projection: Optional[ItineraryProjection] = None,
+        shape: ResponseShape = ResponseShape.NESTED,
+    ) -> int:
+        """
+        Estimate the number of rows (itineraries, days and the objects nested
+        in them) a listing response holds. Each day counts its transfer and
+        hotel stay, when returned, whether or not it has one.
+        """
+        rows = len(page.ids)
+        if projection is None or shape == ResponseShape.NORMALIZED:
+            return rows + page.days * 3 + page.activity_links
+        if not projection.include_days:
+            return rows
+
+        per_day = 1 + sum(
+            name in projection.relations for name in ("transfer", "hotel_stay")
+        )
+        rows += page.days * per_day
+        if "activities" in projection.relations:
+            rows += page.activity_links
+        return rows
+
+    @staticmethod
+    def listing_key(
+        skip: int = 0,
+        limit: int = 100,
+        region: Optional[str] = None,
+        min_nights: Optional[int] = None,
+        max_nights: Optional[int] = None,
+        recommended: Optional[bool] = None,
+        regions: Optional[List[str]] = None,
+        location_id: Optional[int] = None,
+        hotel_id: Optional[int] = None,
+        min_hotel_rating: Optional[float] = None,
+        activity_id: Optional[int] = None,
+        transfer_type: Optional[TransferTypeEnum] = None,
+        sort_by: ItinerarySortField = ItinerarySortField.ID,
+        sort_order: SortOrder = SortOrder.ASC,
+    ) -> tuple:
+        """
+        Normalized, hashable key of a set of listing parameters. Equivalent
+        requests, e.g. with `regions` in a different order, share a key.
+        """
+        return (
+            skip,
+            limit,
+            region,
+            tuple(sorted(set(regions))) if regions else None,
+            min_nights,
+            max_nights,
+            recommended,
+            location_id,
+            hotel_id,
+            min_hotel_rating,
+            activity_id,
+            transfer_type,
+            sort_by,
+            sort_order,
+        )
 
+    @staticmethod
+    def _apply_filters(
+        query,
+        region: Optional[str] = None,
+        regions: Optional[List[str]] = None,
+        min_nights: Optional[int] = None,
+        max_nights: Optional[int] = None,
+        recommended: Optional[bool] = None,
+        location_id: Optional[int] = None,
+        hotel_id: Optional[int] = None,
+        min_hotel_rating: Optional[float] = None,
+        activity_id: Optional[int] = None,
+        transfer_type: Optional[TransferTypeEnum] = None,
+    ):
+        """
+        Apply listing filters to an itinerary query.
+
+        Filters on nested entities (hotels, activities, transfers, locations)
+        are compiled into correlated EXISTS subqueries over the indexed
+        foreign keys, so non-matching itineraries are discarded by the
+        database before any rows are loaded.
+        """
         # Apply filters if provided
         if region:
             query = query.filter(Itinerary.region == region)
+        if regions:
+            query = query.filter(Itinerary.region.in_(regions))
         if min_nights:
             query = query.filter(Itinerary.duration_nights >= min_nights)
         if max_nights:
@@ -33,22 +312,209 @@ class ItineraryService:
         if recommended is not None:
             query = query.filter(Itinerary.is_recommended == (1 if recommended else 0))
 
-        itineraries = query.offset(skip).limit(limit).all()
-        return itineraries
+        # Itinerary stays at or visits an activity in the location
+        if location_id is not None:
+            query = query.filter(
+                or_(
+                    Itinerary.days.any(
+                        ItineraryDay.hotel_stay.has(
+                            HotelStay.hotel.has(Hotel.location_id == location_id)
+                        )
+                    ),
+                    Itinerary.days.any(
+                        ItineraryDay.activities.any(Activity.location_id == location_id)
+                    ),
+                )
+            )
+        if hotel_id is not None:
+            query = query.filter(
+                Itinerary.days.any(
+                    ItineraryDay.hotel_stay.has(HotelStay.hotel_id == hotel_id)
+                )
+            )
+        # Every hotel stay of the itinerary must meet the minimum rating
+        if min_hotel_rating is not None:
+            query = query.filter(
+                ~Itinerary.days.any(
+                    ItineraryDay.hotel_stay.has(
+                        HotelStay.hotel.has(
+                            or_(Hotel.rating.is_(None), Hotel.rating < min_hotel_rating)
+                        )
+                    )
+                )
+            )
+        if activity_id is not None:
+            query = query.filter(
+                Itinerary.days.any(
+                    ItineraryDay.activities.any(Activity.id == activity_id)
+                )
+            )
+        if transfer_type is not None:
+            query = query.filter(
+                Itinerary.days.any(
+                    ItineraryDay.transfer.has(
+                        Transfer.transfer_type == TransferType(transfer_type.value)
+                    )
+                )
+            )
+
+        return query
 
     @staticmethod
-    def get_itinerary_by_id(db: Session, itinerary_id: int):
+    def get_itinerary_by_id(
+        db: Session,
+        itinerary_id: int,
+        projection: Optional[ItineraryProjection] = None,
+    ):
         """
         Retrieve detailed information for a specific itinerary by its ID.
+
+        When a projection is given, only the columns and relationships it
+        selects are loaded. Otherwise only the itinerary rows are loaded, and
+        the serializers read days, stays and activity links in bulk.
         """
-        return db.query(Itinerary).filter(Itinerary.id == itinerary_id).first()
+        query = db.query(Itinerary)
+        if projection is not None:
+            query = query.options(*projection.loader_options())
+        return query.filter(Itinerary.id == itinerary_id).first()
 
     @staticmethod
-    def create_itinerary(db: Session, itinerary: ItineraryCreate):
+    def create_itinerary(
+        db: Session,
+        itinerary: ItineraryCreate,
+        idempotency_key: Optional[str] = None,
+        keys: Optional[CreateRequestKeys] = None,
+    ) -> Tuple[Itinerary, bool]:
         """
         Create a new itinerary with associated days, hotel stays, and activities.
+
+        All rows are written in a single transaction. When the request carries
+        an idempotency key (or duplicate detection is enabled) and an earlier
+        request with the same key already created an itinerary, that itinerary
+        is returned instead of inserting a new one.
+
+        Parameters:
+            idempotency_key: Overrides the `idempotency_key` field
+            keys: Precomputed idempotency keys of the request
+
+        Returns:
+            The itinerary, and whether it was created by this call
+
+        Raises:
+            IdempotencyKeyConflict: If the key was used with a different payload
+            MissingReferences: If a hotel, transfer or activity doesn't exist;
+                nothing is stored, not even the idempotency key
+        """
+        if keys is None:
+            keys = CreateRequestKeys(
+                itinerary, idempotency_key or itinerary.idempotency_key
+            )
+        existing_id = find_itinerary_id(db, keys)
+        if existing_id is not None:
+            return db.get(Itinerary, existing_id), False
+
+        try:
+            (db_itinerary,) = ItineraryService._add_itineraries(db, [(itinerary, keys)])
+            db.commit()
+
+        except IntegrityError as e:
+            db.rollback()
+            # A concurrent request with the same key committed first
+            existing_id = find_itinerary_id(db, keys) if keys else None
+            if existing_id is None:
+                raise SQLAlchemyError(f"Database error: {str(e)}")
+            return db.get(Itinerary, existing_id), False
+        except SQLAlchemyError as e:
+            db.rollback()
+            raise SQLAlchemyError(f"Database error: {str(e)}")
+        except MissingReferences:
+            db.rollback()
+            raise
+        except Exception as e:
+            db.rollback()
+            raise Exception(f"Error creating itinerary: {str(e)}")
+
+        events.publish(events.ITINERARY, [db_itinerary.id])
+        return db_itinerary, True
+
+    @staticmethod
+    def create_itineraries(
+        db: Session, requests: List[Tuple[ItineraryCreate, CreateRequestKeys]]
+    ) -> List[Itinerary]:
+        """
+        Create a batch of itineraries in a single transaction (group commit),
+        storing the idempotency keys of each request.
+
+        If any itinerary fails, e.g. because a concurrent request with the same
+        idempotency key committed first, the whole batch is rolled back and the
+        error is raised; callers can then retry the requests one by one.
         """
         try:
+            db_itineraries = ItineraryService._add_itineraries(db, requests)
+            db.commit()
+        except SQLAlchemyError:
+            db.rollback()
+            raise
+
+        events.publish(events.ITINERARY, [i.id for i in db_itineraries])
+        return db_itineraries
+
+    @staticmethod
+    def check_references(db: Session, itineraries: List[ItineraryCreate]) -> None:
+        """
+        Check that every hotel, transfer and activity the itineraries reference
+        exists, with a single query.
+
+        Raises:
+            MissingReferences: Listing the IDs that don't exist
+        """
+        check_references(
+            db,
+            {
+                events.HOTEL: (
+                    day.hotel_id for itinerary in itineraries for day in itinerary.days
+                ),
+                events.TRANSFER: (
+                    day.transfer_id
+                    for itinerary in itineraries
+                    for day in itinerary.days
+                ),
+                events.ACTIVITY: (
+                    a
+                    for itinerary in itineraries
+                    for day in itinerary.days
+                    for a in day.activity_ids
+                ),
+            },
+        )
+
+    @staticmethod
+    def _add_itineraries(
+        db: Session, requests: List[Tuple[ItineraryCreate, CreateRequestKeys]]
+    ) -> List[Itinerary]:
+        """
+        Add itineraries with their days, hotel stays, activities, idempotency
+        keys and change log entries to the session, without committing.
+
+        Raises:
+            MissingReferences: If a referenced entity doesn't exist, before
+                anything is added
+        """
+        ItineraryService.check_references(db, [itinerary for itinerary, _ in requests])
+        activity_ids = {
+            a
+            for itinerary, _ in requests
+            for day in itinerary.days
+            for a in day.activity_ids
+        }
+        activities = (
+            {a.id: a for a in db.query(Activity).filter(Activity.id.in_(activity_ids))}
+            if activity_ids
+            else {}
+        )
+
+        db_itineraries = []
+        for itinerary, _ in requests:
             # Create the itinerary
             db_itinerary = Itinerary(
                 name=itinerary.name,
@@ -58,41 +524,27 @@ class ItineraryService:
                 is_recommended=itinerary.is_recommended,
             )
             db.add(db_itinerary)
-            db.commit()
-            db.refresh(db_itinerary)
 
-            # Add itinerary days
+            # Add itinerary days, hotel stays and activities
             for day in itinerary.days:
                 db_day = ItineraryDay(
-                    itinerary_id=db_itinerary.id,
+                    itinerary=db_itinerary,
                     day_number=day.day_number,
                     transfer_id=day.transfer_id,
                 )
+                db_day.hotel_stay = HotelStay(hotel_id=day.hotel_id)
+                # Repeated activities are linked once, at their first position
+                db_day.activities = [
+                    activities[a] for a in dict.fromkeys(day.activity_ids)
+                ]
                 db.add(db_day)
-                db.commit()
-                db.refresh(db_day)
-
-                # Add hotel stay
-                hotel_stay = HotelStay(
-                    itinerary_day_id=db_day.id, hotel_id=day.hotel_id
-                )
-                db.add(hotel_stay)
-                db.commit()
-
-                # Add activities
-                if day.activity_ids:
-                    for activity_id in day.activity_ids:
-                        activity = db.query(Activity).get(activity_id)
-                        if activity:
-                            db_day.activities.append(activity)
-
-                    db.commit()
+            db_itineraries.append(db_itinerary)
 
-            return db_itinerary
-
-        except SQLAlchemyError as e:
-            db.rollback()
-            raise SQLAlchemyError(f"Database error: {str(e)}")
-        except Exception as e:
-            db.rollback()
-            raise Exception(f"Error creating itinerary: {str(e)}")
+        db.flush()
+        for db_itinerary, (_, keys) in zip(db_itineraries, requests):
+            if keys:
+                remember_itinerary_id(db, keys, db_itinerary.id)
+        record_changes(
+            db, events.ITINERARY, [i.id for i in db_itineraries], events.CREATE
+        )
+        return db_itineraries
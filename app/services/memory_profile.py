@@ -0,0 +1,300 @@
+import json
+import os
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+JSON_DIR = os.path.dirname(os.path.abspath(json.__file__))
+
+# Call sites are attributed to the first library whose path contains the
+# fragment; anything else is "other"
+LIBRARIES = (
+    ("app", APP_DIR + os.sep),
+    ("sqlalchemy", f"{os.sep}sqlalchemy{os.sep}"),
+    ("pydantic", f"{os.sep}pydantic"),
+    ("json", JSON_DIR + os.sep),
+    ("msgpack", f"{os.sep}msgpack{os.sep}"),
+    # Response bodies are encoded in the framework's response classes
+    ("starlette", f"{os.sep}starlette{os.sep}"),
+    ("fastapi", f"{os.sep}fastapi{os.sep}"),
+)
+
+# Call sites kept per operation and stage between reports
+MAX_CALL_SITES = 200
+
+# Allocations made by the profiler itself are not reported
+_IGNORED = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+CallSite = Tuple[str, int]
+
+
+def library_of(filename: str) -> str:
+    for library, fragment in LIBRARIES:
+        if fragment in filename:
+            return library
+    return "other"
+
+
+def _snapshot() -> tracemalloc.Snapshot:
+    return tracemalloc.take_snapshot().filter_traces(_IGNORED)
+
+
+class StageStats:
+    """
+    Allocations of one named stage (e.g. `hydrate`) of an operation: its
+    peak, the memory it still held when it finished, and the call sites of
+    the memory it allocated.
+    """
+
+    __slots__ = ("calls", "peak_max", "retained_total", "call_sites")
+
+    def __init__(self):
+        self.calls = 0
+        self.peak_max = 0
+        self.retained_total = 0
+        # (filename, line) -> [bytes, blocks]
+        self.call_sites: Dict[CallSite, List[int]] = {}
+
+    def add(self, peak: int, retained: int, call_sites: Dict[CallSite, List[int]]):
+        self.calls += 1
+        self.peak_max = max(self.peak_max, peak)
+        self.retained_total += retained
+        for key, (size, count) in call_sites.items():
+            site = self.call_sites.setdefault(key, [0, 0])
+            site[0] += size
+            site[1] += count
+
+    def merge(self, other: "StageStats") -> None:
+        self.calls += other.calls
+        self.peak_max = max(self.peak_max, other.peak_max)
+        self.retained_total += other.retained_total
+        for key, (size, count) in other.call_sites.items():
+            site = self.call_sites.setdefault(key, [0, 0])
+            site[0] += size
+            site[1] += count
+        if len(self.call_sites) > MAX_CALL_SITES:
+            self.call_sites = dict(
+                sorted(self.call_sites.items(), key=lambda i: -i[1][0])[:MAX_CALL_SITES]
+            )
+
+    def report(self, top: int) -> Dict[str, Any]:
+        libraries: Dict[str, int] = {}
+        for (filename, _), (size, _) in self.call_sites.items():
+            library = library_of(filename)
+            libraries[library] = libraries.get(library, 0) + size
+        sites = sorted(self.call_sites.items(), key=lambda i: -i[1][0])[:top]
+        return {
+            "calls": self.calls,
+            "peak_bytes_max": self.peak_max,
+            "retained_bytes_mean": self.retained_total // max(self.calls, 1),
+            "allocated_bytes_by_library": dict(
+                sorted(libraries.items(), key=lambda i: -i[1])
+            ),
+            "top_call_sites": [
+                {
+                    "location": f"{filename}:{lineno}",
+                    "library": library_of(filename),
+                    "bytes": size,
+                    "blocks": count,
+                }
+                for (filename, lineno), (size, count) in sites
+            ],
+        }
+
+
+class RequestProfile:
+    """
+    Memory used while serving one request: its overall peak above the memory
+    in use when it started, and the stages marked with `profile_stage`.
+    """
+
+    def __init__(self, operation: str):
+        self.operation = operation
+        self.stages: Dict[str, StageStats] = {}
+        self.base = tracemalloc.get_traced_memory()[0]
+        self.peak = 0
+        tracemalloc.reset_peak()
+
+    def checkpoint(self) -> None:
+        """
+        Fold the peak since the last reset into the request's peak, and reset
+        it so the next stage measures its own.
+        """
+        self.peak = max(self.peak, tracemalloc.get_traced_memory()[1] - self.base)
+        tracemalloc.reset_peak()
+
+
+class StageProfile:
+    """
+    A stage being profiled. At each step, and when the stage ends, a snapshot
+    is compared to the one taken when it started: per call site, the most
+    memory it held at any of these points is attributed to the stage. Steps
+    catch temporary allocations, e.g. an encoded body before it is copied,
+    that are freed before the stage ends.
+    """
+
+    def __init__(self, profile: RequestProfile):
+        profile.checkpoint()
+        self.profile = profile
+        self.before = _snapshot()
+        self.start = tracemalloc.get_traced_memory()[0]
+        self.peak = 0
+        # (filename, line) -> [bytes, blocks]
+        self.call_sites: Dict[CallSite, List[int]] = {}
+        # Taking the snapshot doesn't count toward the stage's peak
+        tracemalloc.reset_peak()
+
+    def step(self) -> int:
+        """
+        Record the stage's peak so far and the call sites of the memory it
+        holds. Returns the memory it holds.
+        """
+        current, peak = tracemalloc.get_traced_memory()
+        self.peak = max(self.peak, peak - self.start)
+        self.profile.checkpoint()
+        for stat in _snapshot().compare_to(self.before, "lineno"):
+            if stat.size_diff <= 0:
+                continue
+            frame = stat.traceback[0]
+            site = self.call_sites.setdefault((frame.filename, frame.lineno), [0, 0])
+            if stat.size_diff > site[0]:
+                site[0], site[1] = stat.size_diff, stat.count_diff
+        tracemalloc.reset_peak()
+        return current - self.start
+
+
+class OperationStats:
+    __slots__ = ("requests", "peak_max", "peak_total", "last_peak", "stages")
+
+    def __init__(self):
+        self.requests = 0
+        self.peak_max = 0
+        self.peak_total = 0
+        self.last_peak = 0
+        self.stages: Dict[str, StageStats] = {}
+
+
+class MemoryProfiler:
+    """
+    Aggregates request profiles per operation. Profiling is enabled when
+    tracemalloc is tracing (see MEMORY_PROFILING).
+    """
+
+    def __init__(self):
+        self._operations: Dict[str, OperationStats] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def record(self, profile: RequestProfile) -> None:
+        with self._lock:
+            stats = self._operations.setdefault(profile.operation, OperationStats())
+            stats.requests += 1
+            stats.peak_max = max(stats.peak_max, profile.peak)
+            stats.peak_total += profile.peak
+            stats.last_peak = profile.peak
+            for name, stage in profile.stages.items():
+                stats.stages.setdefault(name, StageStats()).merge(stage)
+
+    def report(self, top: int = 10) -> Dict[str, Any]:
+        """
+        Peak memory per operation, and per stage its peak, the memory it
+        retained when it finished and its top `top` allocating call sites.
+        """
+        with self._lock:
+            return {
+                "traced_bytes": tracemalloc.get_traced_memory()[0],
+                "operations": {
+                    operation: {
+                        "requests": stats.requests,
+                        "peak_bytes_max": stats.peak_max,
+                        "peak_bytes_mean": stats.peak_total // stats.requests,
+                        "peak_bytes_last": stats.last_peak,
+                        "stages": {
+                            name: stage.report(top)
+                            for name, stage in stats.stages.items()
+                        },
+                    }
+                    for operation, stats in sorted(self._operations.items())
+                },
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._operations.clear()
+
+
+memory_profiler = MemoryProfiler()
+
+_current_profile: ContextVar[Optional[RequestProfile]] = ContextVar(
+    "memory_profile", default=None
+)
+_current_stage: ContextVar[Optional[StageProfile]] = ContextVar(
+    "memory_profile_stage", default=None
+)
+
+
+@contextmanager
+def profile_request(operation: str):
+    """
+    Profile the request served within the block, and record it under its
+    operation.
+    """
+    profile = RequestProfile(operation)
+    token = _current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+        profile.checkpoint()
+        memory_profiler.record(profile)
+
+
+@contextmanager
+def profile_stage(name: str):
+    """
+    Mark a stage of the request being profiled, e.g. loading or serializing
+    itineraries. Does nothing when the request isn't profiled.
+
+    Usage:
+        with profile_stage("hydrate"):
+            itineraries = ItineraryService.load_itineraries(db, ids)
+    """
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+
+    stage = StageProfile(profile)
+    token = _current_stage.set(stage)
+    try:
+        yield
+    finally:
+        _current_stage.reset(token)
+        retained = stage.step()
+        profile.stages.setdefault(name, StageStats()).add(
+            stage.peak, retained, stage.call_sites
+        )
+        profile.checkpoint()
+
+
+def profile_step() -> None:
+    """
+    Attribute the memory the current stage holds at this point to its call
+    sites, so temporary allocations freed before the stage ends are reported
+    too. Call it where a large temporary object is alive. Does nothing when
+    the request isn't profiled.
+    """
+    stage = _current_stage.get()
+    if stage is not None:
+        stage.step()
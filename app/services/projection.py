@@ -0,0 +1,194 @@
+from typing import Any, Dict, List, Optional, Set
+
+from sqlalchemy.orm import joinedload, load_only, noload, selectinload
+
+from app.models.models import (
+    Activity,
+    HotelStay,
+    Itinerary,
+    ItineraryDay,
+    ItineraryDayActivity,
+    Transfer,
+)
+from app.schemas.schemas import Activity as ActivitySchema
+from app.schemas.schemas import HotelStay as HotelStaySchema
+from app.schemas.schemas import ItineraryBase
+from app.schemas.schemas import Transfer as TransferSchema
+
+# Columns that can be selected on each level of the itinerary response.
+# `id` is always returned so the client can correlate results.
+ITINERARY_FIELDS = ("id",) + tuple(ItineraryBase.model_fields)
+DAY_FIELDS = ("id", "day_number")
+RELATION_FIELDS = {
+    "transfer": tuple(TransferSchema.model_fields),
+    "hotel_stay": tuple(HotelStaySchema.model_fields),
+    "activities": tuple(ActivitySchema.model_fields),
+}
+RELATION_MODELS = {
+    "transfer": Transfer,
+    "hotel_stay": HotelStay,
+    "activities": Activity,
+}
+EXPANDABLE = ("days",) + tuple(RELATION_FIELDS)
+
+
+class ItineraryProjection:
+    """
+    Describes which columns and nested relationships of an itinerary should be
+    loaded from the database and returned to the client.
+
+    Built from the `fields` and `expand` request parameters:
+        - `fields` selects columns, e.g. `name` or `activities.name`
+        - `expand` selects relationships: `days`, `transfer`, `hotel_stay`,
+          `activities` (the last three are nested under `days`)
+    """
+
+    def __init__(
+        self,
+        itinerary_fields: Optional[Set[str]],
+        relations: Dict[str, Optional[Set[str]]],
+        include_days: bool,
+    ):
+        # None means "all columns"
+        self.itinerary_fields = itinerary_fields
+        self.relations = relations
+        self.include_days = include_days
+
+    @classmethod
+    def from_params(
+        cls, fields: Optional[List[str]] = None, expand: Optional[List[str]] = None
+    ) -> Optional["ItineraryProjection"]:
+        """
+        Parse `fields` and `expand` parameters. Returns None when neither is given,
+        meaning the full itinerary should be returned.
+
+        Raises:
+            ValueError: If an unknown field or relationship is requested
+        """
+        if not fields and not expand:
+            return None
+
+        itinerary_fields: Optional[Set[str]] = None
+        relations: Dict[str, Optional[Set[str]]] = {}
+        include_days = False
+
+        for name in expand or []:
+            if name not in EXPANDABLE:
+                raise ValueError(
+                    f"Unknown expand value '{name}'. "
+                    f"Allowed values: {', '.join(EXPANDABLE)}"
+                )
+            include_days = True
+            if name != "days":
+                relations.setdefault(name, None)
+
+        if fields:
+            itinerary_fields = {"id"}
+            for field in fields:
+                relation, _, column = field.rpartition(".")
+                if not relation:
+                    if column not in ITINERARY_FIELDS:
+                        raise ValueError(f"Unknown field '{field}'")
+                    itinerary_fields.add(column)
+                    continue
+
+                if relation not in RELATION_FIELDS or (
+                    column not in RELATION_FIELDS[relation]
+                ):
+                    raise ValueError(f"Unknown field '{field}'")
+                include_days = True
+                selected = relations.get(relation)
+                if selected is None:
+                    # Expanded relationship without explicit columns is narrowed
+                    # to the requested ones, plus the primary key
+                    selected = {"id"} if "id" in RELATION_FIELDS[relation] else set()
+                    relations[relation] = selected
+                selected.add(column)
+
+        return cls(itinerary_fields, relations, include_days)
+
+    def key(self) -> tuple:
+        """
+        Hashable, order-independent description of the projection.
+        """
+        return (
+            tuple(sorted(self.itinerary_fields)) if self.itinerary_fields else None,
+            tuple(
+                (name, tuple(sorted(columns)) if columns is not None else None)
+                for name, columns in sorted(self.relations.items())
+            ),
+            self.include_days,
+        )
+
+    def loader_options(self) -> list:
+        """
+        SQLAlchemy loader options that fetch only the requested columns and
+        relationships. Relationships that were not requested are never loaded.
+        """
+        options = []
+        if self.itinerary_fields is not None:
+            options.append(
+                load_only(*(getattr(Itinerary, f) for f in self.itinerary_fields))
+            )
+
+        if not self.include_days:
+            options.append(noload(Itinerary.days))
+            return options
+
+        days = selectinload(Itinerary.days)
+        day_options = []
+        for name, attr in (
+            ("transfer", ItineraryDay.transfer),
+            ("hotel_stay", ItineraryDay.hotel_stay),
+            ("activities", ItineraryDay.activity_links),
+        ):
+            if name not in self.relations:
+                day_options.append(noload(attr))
+                continue
+
+            if name == "activities":
+                # Activities are reached through the ordered link rows
+                loader = selectinload(attr).joinedload(ItineraryDayActivity.activity)
+            else:
+                loader = joinedload(attr)
+            columns = self.relations[name]
+            if columns is not None:
+                model = RELATION_MODELS[name]
+                loader = loader.load_only(*(getattr(model, c) for c in columns))
+            day_options.append(loader)
+
+        options.append(days.options(*day_options))
+        return options
+
+    def dump(self, itinerary: Itinerary) -> Dict[str, Any]:
+        """
+        Serialize an itinerary loaded with `loader_options()` into a dict holding
+        only the requested columns and relationships.
+        """
+        fields = self.itinerary_fields or ITINERARY_FIELDS
+        data = {f: getattr(itinerary, f) for f in ITINERARY_FIELDS if f in fields}
+        if self.include_days:
+            data["days"] = [self._dump_day(day) for day in itinerary.days]
+        return data
+
+    def _dump_day(self, day: ItineraryDay) -> Dict[str, Any]:
+        data = {f: getattr(day, f) for f in DAY_FIELDS}
+        for name, selected in self.relations.items():
+            columns = [
+                c for c in RELATION_FIELDS[name] if not selected or c in selected
+            ]
+            value = getattr(day, name)
+            if name == "activities":
+                data[name] = [_dump_columns(a, columns) for a in value]
+            else:
+                data[name] = _dump_columns(value, columns) if value else None
+        return data
+
+
+def _dump_columns(obj: Any, columns: List[str]) -> Dict[str, Any]:
+    data = {}
+    for column in columns:
+        value = getattr(obj, column)
+        # Enum columns are returned as their plain value
+        data[column] = getattr(value, "value", value)
+    return data
@@ -0,0 +1,329 @@
+import math
+import sys
+import threading
+import traceback
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.config import RANKING_INTERVAL
+from app.database.connection import SessionLocal
+from app.models.models import Itinerary, ItineraryRanking, ItineraryStats
+from app.services.reference_cache import ReferenceSnapshot
+from app.services.serialization import ItineraryRows
+from app.services.sync import claim_lease
+
+# Weight of each component in the score. `editorial` is the hand-set
+# is_recommended flag.
+RANKING_WEIGHTS = {
+    "popularity": 0.4,
+    "value": 0.3,
+    "diversity": 0.2,
+    "editorial": 0.1,
+}
+
+# Itineraries whose rows are loaded at once while computing the ranking
+RANKING_CHUNK_SIZE = 500
+
+# Name of the job lease electing the worker that rebuilds the ranking
+RANKING_LEASE = "ranking"
+
+
+class ReadCounter:
+    """
+    Counts itinerary reads in memory; the ranking job adds them to the
+    itinerary_stats table, so reads cost no writes.
+    """
+
+    def __init__(self):
+        self._counts: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def add(self, itinerary_ids: Iterable[int]) -> None:
+        with self._lock:
+            self._counts.update(itinerary_ids)
+
+    def take(self) -> Dict[int, int]:
+        """
+        Remove and return the counts since the last call.
+        """
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+        return dict(counts)
+
+    def restore(self, counts: Dict[int, int]) -> None:
+        """
+        Put back counts that could not be saved.
+        """
+        with self._lock:
+            self._counts.update(counts)
+
+
+read_counter = ReadCounter()
+
+
+def _rollup(itinerary, rows: ItineraryRows, snapshot: ReferenceSnapshot) -> tuple:
+    """
+    Price per night and distinct activities per night of an itinerary.
+    Hotels, transfers and activities that no longer exist are left out.
+    """
+    nights = max(itinerary.duration_nights, 1)
+    price = 0.0
+    activity_ids = set()
+    for day_id, _, _, transfer_id in rows.days.get(itinerary.id, []):
+        stay = rows.stays.get(day_id)
+        hotel = snapshot.hotels.get(stay[2]) if stay is not None else None
+        if hotel is not None:
+            price += hotel.price_per_night or 0.0
+        transfer = snapshot.transfers.get(transfer_id) if transfer_id else None
+        if transfer is not None:
+            price += transfer.price or 0.0
+        for activity_id in rows.activity_ids.get(day_id, []):
+            activity = snapshot.activities.get(activity_id)
+            if activity is not None:
+                price += activity.price or 0.0
+                activity_ids.add(activity_id)
+    return price / nights, len(activity_ids) / nights
+
+
+class RankingService:
+    """
+    Scored recommendation ranking of itineraries, precomputed into the
+    itinerary_rankings table so that reading the top itineraries is an index
+    range scan.
+
+    Each itinerary is scored from:
+        - popularity: its read count, on a log scale, relative to the most
+          read itinerary
+        - value: the cheapest price per night in its region divided by its
+          own (hotels, activities and transfers at their listed prices)
+        - diversity: its distinct activities per night, relative to the most
+          varied itinerary
+        - editorial: the hand-set is_recommended flag
+    combined with RANKING_WEIGHTS.
+    """
+
+    @staticmethod
+    def flush_read_counts(db: Session) -> int:
+        """
+        Add the reads counted by this process to itinerary_stats. Returns the
+        number of reads saved.
+        """
+        counts = read_counter.take()
+        if not counts:
+            return 0
+
+        try:
+            existing = {
+                s.itinerary_id: s
+                for s in db.query(ItineraryStats).filter(
+                    ItineraryStats.itinerary_id.in_(list(counts))
+                )
+            }
+            known = set(
+                db.execute(
+                    select(Itinerary.id).where(Itinerary.id.in_(list(counts)))
+                ).scalars()
+            )
+            for itinerary_id, count in counts.items():
+                stats = existing.get(itinerary_id)
+                if stats is not None:
+                    stats.read_count = ItineraryStats.read_count + count
+                elif itinerary_id in known:
+                    db.add(ItineraryStats(itinerary_id=itinerary_id, read_count=count))
+            db.commit()
+        except SQLAlchemyError:
+            db.rollback()
+            read_counter.restore(counts)
+            raise
+        return sum(counts.values())
+
+    @staticmethod
+    def rebuild_rankings(db: Session) -> int:
+        """
+        Score every itinerary and replace the ranking in one transaction.
+        An itinerary that can't be scored is logged and left out. Returns the
+        number of ranked itineraries.
+        """
+        itineraries = db.execute(
+            select(
+                Itinerary.id,
+                Itinerary.region,
+                Itinerary.duration_nights,
+                Itinerary.is_recommended,
+            ).order_by(Itinerary.id)
+        ).all()
+        reads = dict(
+            db.execute(
+                select(ItineraryStats.itinerary_id, ItineraryStats.read_count)
+            ).all()
+        )
+
+        # Price per night and distinct activities per night of each itinerary
+        rollups: Dict[int, tuple] = {}
+        for start in range(0, len(itineraries), RANKING_CHUNK_SIZE):
+            chunk = itineraries[start : start + RANKING_CHUNK_SIZE]
+            rows = ItineraryRows(db, [i.id for i in chunk])
+            snapshot = rows.snapshot(db)
+            for itinerary in chunk:
+                try:
+                    rollups[itinerary.id] = _rollup(itinerary, rows, snapshot)
+                except Exception:
+                    # Left out of this ranking rather than failing all of it
+                    print(f"Could not rank itinerary {itinerary.id}", file=sys.stderr)
+                    traceback.print_exc()
+        itineraries = [i for i in itineraries if i.id in rollups]
+
+        max_reads = max(reads.values(), default=0)
+        max_diversity = max((r[1] for r in rollups.values()), default=0)
+        cheapest: Dict[str, float] = {}
+        for itinerary in itineraries:
+            price_per_night = rollups[itinerary.id][0]
+            if price_per_night > 0:
+                cheapest[itinerary.region] = min(
+                    cheapest.get(itinerary.region, price_per_night), price_per_night
+                )
+
+        scored: List[Dict[str, Any]] = []
+        for itinerary in itineraries:
+            price_per_night, diversity = rollups[itinerary.id]
+            components = {
+                "popularity": (
+                    math.log1p(reads.get(itinerary.id, 0)) / math.log1p(max_reads)
+                    if max_reads
+                    else 0.0
+                ),
+                "value": (
+                    cheapest[itinerary.region] / price_per_night
+                    if price_per_night > 0
+                    else 1.0
+                ),
+                "diversity": diversity / max_diversity if max_diversity else 0.0,
+                "editorial": 1.0 if itinerary.is_recommended else 0.0,
+            }
+            scored.append(
+                {
+                    "itinerary_id": itinerary.id,
+                    "region": itinerary.region,
+                    "duration_nights": itinerary.duration_nights,
+                    "score": sum(
+                        RANKING_WEIGHTS[name] * value
+                        for name, value in components.items()
+                    ),
+                    "popularity": components["popularity"],
+                    "value": components["value"],
+                    "diversity": components["diversity"],
+                    "price_per_night": round(price_per_night, 2),
+                }
+            )
+        scored.sort(key=lambda s: (-s["score"], s["itinerary_id"]))
+        for rank, entry in enumerate(scored, start=1):
+            entry["rank"] = rank
+
+        try:
+            db.query(ItineraryRanking).delete()
+            db.bulk_insert_mappings(ItineraryRanking, scored)
+            db.commit()
+        except SQLAlchemyError:
+            db.rollback()
+            raise
+        return len(scored)
+
+    @staticmethod
+    def get_top_ranked(
+        db: Session,
+        region: Optional[str] = None,
+        min_nights: Optional[int] = None,
+        max_nights: Optional[int] = None,
+        skip: int = 0,
+        limit: int = 10,
+    ) -> List[ItineraryRanking]:
+        """
+        Retrieve the best ranked itineraries, optionally in a region and for a
+        range of durations, in rank order.
+
+        Reads the (region, rank) index, or the rank index without a region,
+        in order and stops after `skip + limit` matches. Itineraries created
+        since the last rebuild are not ranked yet.
+        """
+        query = db.query(ItineraryRanking)
+        if region:
+            query = query.filter(ItineraryRanking.region == region)
+        if min_nights:
+            query = query.filter(ItineraryRanking.duration_nights >= min_nights)
+        if max_nights:
+            query = query.filter(ItineraryRanking.duration_nights <= max_nights)
+        return query.order_by(ItineraryRanking.rank).offset(skip).limit(limit).all()
+
+
+class RankingJob:
+    """
+    Background thread that saves the read counts of this process and rebuilds
+    the ranking every RANKING_INTERVAL seconds, starting right away. Every
+    worker saves its counts, but only the one holding the ranking lease
+    rebuilds, so the ranking is rebuilt once per interval however many
+    workers run.
+    """
+
+    def __init__(self, interval: float = RANKING_INTERVAL):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self.interval <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="ranking-job", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop the job, saving the read counts not saved yet.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._safely(RankingService.flush_read_counts)
+
+    def run_once(self) -> None:
+        self._safely(RankingService.flush_read_counts)
+        self._safely(self._rebuild_if_elected)
+
+    def _rebuild_if_elected(self, db: Session) -> None:
+        # Slightly shorter than the interval, so the holder's next run isn't
+        # refused by its own lease
+        if claim_lease(db, RANKING_LEASE, self.interval * 0.9):
+            RankingService.rebuild_rankings(db)
+
+    def _run(self) -> None:
+        self.run_once()
+        while not self._stop.wait(self.interval):
+            self.run_once()
+
+    @staticmethod
+    def _safely(task) -> None:
+        # A failed run is retried at the next interval
+        db = SessionLocal(primary=True)
+        try:
+            task(db)
+        except Exception:
+            traceback.print_exc()
+        finally:
+            db.close()
+
+
+if __name__ == "__main__":
+    # Rebuild the ranking once, e.g. from a scheduled task when the
+    # background job is disabled
+    db = SessionLocal(primary=True)
+    try:
+        print(f"Ranked {RankingService.rebuild_rankings(db)} itineraries")
+    finally:
+        db.close()
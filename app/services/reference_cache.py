@@ -0,0 +1,249 @@
+import threading
+from typing import Any, Dict, Iterable, Optional, Set
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.models import Activity, Hotel, Location, Transfer
+from app.services import events
+from app.services.sync import replica_is_current
+
+REFERENCE_ENTITIES = (events.LOCATION, events.HOTEL, events.TRANSFER, events.ACTIVITY)
+
+
+class LocationRef:
+    __slots__ = ("id", "name", "region", "description")
+
+    def __init__(self, id, name, region, description):
+        self.id = id
+        self.name = name
+        self.region = region
+        self.description = description
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "region": self.region,
+            "description": self.description,
+            "id": self.id,
+        }
+
+
+class HotelRef:
+    __slots__ = (
+        "id",
+        "name",
+        "location_id",
+        "description",
+        "rating",
+        "price_per_night",
+    )
+
+    def __init__(self, id, name, location_id, description, rating, price_per_night):
+        self.id = id
+        self.name = name
+        self.location_id = location_id
+        self.description = description
+        self.rating = rating
+        self.price_per_night = price_per_night
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "location_id": self.location_id,
+            "description": self.description,
+            "rating": self.rating,
+            "price_per_night": self.price_per_night,
+            "id": self.id,
+        }
+
+
+class TransferRef:
+    __slots__ = (
+        "id",
+        "origin_location_id",
+        "destination_location_id",
+        "transfer_type",
+        "duration_minutes",
+        "price",
+    )
+
+    def __init__(
+        self,
+        id,
+        origin_location_id,
+        destination_location_id,
+        transfer_type,
+        duration_minutes,
+        price,
+    ):
+        self.id = id
+        self.origin_location_id = origin_location_id
+        self.destination_location_id = destination_location_id
+        # Stored as the plain enum value, e.g. "ferry"
+        self.transfer_type = getattr(transfer_type, "value", transfer_type)
+        self.duration_minutes = duration_minutes
+        self.price = price
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "origin_location_id": self.origin_location_id,
+            "destination_location_id": self.destination_location_id,
+            "transfer_type": self.transfer_type,
+            "duration_minutes": self.duration_minutes,
+            "price": self.price,
+            "id": self.id,
+        }
+
+
+class ActivityRef:
+    __slots__ = (
+        "id",
+        "name",
+        "location_id",
+        "description",
+        "duration_minutes",
+        "price",
+    )
+
+    def __init__(self, id, name, location_id, description, duration_minutes, price):
+        self.id = id
+        self.name = name
+        self.location_id = location_id
+        self.description = description
+        self.duration_minutes = duration_minutes
+        self.price = price
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "location_id": self.location_id,
+            "description": self.description,
+            "duration_minutes": self.duration_minutes,
+            "price": self.price,
+            "id": self.id,
+        }
+
+
+class ReferenceSnapshot:
+    """
+    Immutable, process-wide view of the near-static reference data (locations,
+    hotels, transfers and activities), keyed by ID for O(1) lookups.
+
+    A snapshot is never modified after it is built. When reference data
+    changes the version is bumped and a new snapshot replaces the old one in a
+    single assignment, so readers always see a consistent view.
+    """
+
+    __slots__ = ("version", "locations", "hotels", "transfers", "activities")
+
+    def __init__(
+        self,
+        version: int,
+        locations: Dict[int, LocationRef],
+        hotels: Dict[int, HotelRef],
+        transfers: Dict[int, TransferRef],
+        activities: Dict[int, ActivityRef],
+    ):
+        self.version = version
+        self.locations = locations
+        self.hotels = hotels
+        self.transfers = transfers
+        self.activities = activities
+
+    @classmethod
+    def load(cls, db: Session, version: int) -> "ReferenceSnapshot":
+        """
+        Build a snapshot with one query per reference table.
+        """
+        return cls(
+            version,
+            _load(db, Location, LocationRef),
+            _load(db, Hotel, HotelRef),
+            _load(db, Transfer, TransferRef),
+            _load(db, Activity, ActivityRef),
+        )
+
+    def missing(
+        self,
+        hotel_ids: Iterable[int] = (),
+        transfer_ids: Iterable[int] = (),
+        activity_ids: Iterable[int] = (),
+    ) -> Dict[Any, Set[int]]:
+        """
+        The given IDs that are not in the snapshot, by model. Models with
+        nothing missing are left out.
+        """
+        missing = {
+            Hotel: {i for i in hotel_ids if i not in self.hotels},
+            Transfer: {i for i in transfer_ids if i not in self.transfers},
+            Activity: {i for i in activity_ids if i not in self.activities},
+        }
+        return {model: ids for model, ids in missing.items() if ids}
+
+    def covers(
+        self,
+        hotel_ids: Iterable[int] = (),
+        transfer_ids: Iterable[int] = (),
+        activity_ids: Iterable[int] = (),
+    ) -> bool:
+        """
+        Whether every given ID is present in the snapshot.
+        """
+        return not self.missing(hotel_ids, transfer_ids, activity_ids)
+
+
+def _load(db: Session, model, ref_class) -> Dict[int, Any]:
+    columns = [getattr(model, name) for name in ref_class.__slots__]
+    return {row[0]: ref_class(*row) for row in db.execute(select(*columns))}
+
+
+_version = 0
+_snapshot: Optional[ReferenceSnapshot] = None
+_lock = threading.Lock()
+
+
+def bump_reference_version() -> int:
+    """
+    Mark the current snapshot as stale. The next read rebuilds it.
+    """
+    global _version
+    with _lock:
+        _version += 1
+        return _version
+
+
+def get_reference_snapshot(db: Session) -> ReferenceSnapshot:
+    """
+    Return the current reference snapshot, rebuilding it if the version has
+    been bumped since it was built.
+    """
+    global _snapshot
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == _version:
+        return snapshot
+
+    with _lock:
+        if _snapshot is None or _snapshot.version != _version:
+            if not replica_is_current(db):
+                # Not kept: nothing would replace it once the replica catches up
+                return ReferenceSnapshot.load(db, _version)
+            _snapshot = ReferenceSnapshot.load(db, _version)
+        return _snapshot
+
+
+def refresh_reference_snapshot(db: Session) -> ReferenceSnapshot:
+    """
+    Force a rebuild, e.g. when an itinerary references an entity created after
+    the current snapshot was built.
+    """
+    bump_reference_version()
+    return get_reference_snapshot(db)
+
+
+def _bump_on_change(event: events.ChangeEvent) -> None:
+    if event.entity in REFERENCE_ENTITIES:
+        bump_reference_version()
+
+
+events.subscribe(_bump_on_change)
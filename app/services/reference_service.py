@@ -0,0 +1,214 @@
+from typing import Dict, Iterable, List, Optional, Set, Type
+
+from pydantic import BaseModel
+from sqlalchemy import literal, select, union_all
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.database.connection import Base
+from app.models.models import Activity, Hotel, Location, Transfer
+from app.services import events
+from app.services.sync import record_changes
+
+# Reference entity name -> model
+REFERENCE_MODELS: Dict[str, Type[Base]] = {
+    events.LOCATION: Location,
+    events.HOTEL: Hotel,
+    events.TRANSFER: Transfer,
+    events.ACTIVITY: Activity,
+}
+
+# Reference entity name -> {field: referenced entity}. SQLite doesn't enforce
+# the foreign keys, so writes check them with `check_references`.
+REFERENCE_FIELDS: Dict[str, Dict[str, str]] = {
+    events.LOCATION: {},
+    events.HOTEL: {"location_id": events.LOCATION},
+    events.TRANSFER: {
+        "origin_location_id": events.LOCATION,
+        "destination_location_id": events.LOCATION,
+    },
+    events.ACTIVITY: {"location_id": events.LOCATION},
+}
+
+
+class MissingReferences(ValueError):
+    """
+    A write references entities that don't exist.
+    """
+
+    def __init__(self, missing: Dict[str, List[int]]):
+        self.missing = missing
+        super().__init__(
+            "; ".join(
+                f"Unknown {entity} IDs: {', '.join(map(str, ids))}"
+                for entity, ids in missing.items()
+            )
+        )
+
+
+def check_references(db: Session, references: Dict[str, Iterable[int]]) -> None:
+    """
+    Check that every referenced entity exists, with a single query.
+
+    Parameters:
+        references: Entity name -> referenced IDs; None IDs are ignored
+
+    Raises:
+        MissingReferences: If any referenced entity doesn't exist
+    """
+    wanted: Dict[str, Set[int]] = {}
+    for entity, ids in references.items():
+        ids = {i for i in ids if i is not None}
+        if ids:
+            wanted.setdefault(entity, set()).update(ids)
+    if not wanted:
+        return
+
+    found = set(
+        db.execute(
+            union_all(
+                *(
+                    select(literal(entity), REFERENCE_MODELS[entity].id).where(
+                        REFERENCE_MODELS[entity].id.in_(ids)
+                    )
+                    for entity, ids in wanted.items()
+                )
+            )
+        ).all()
+    )
+    missing = {
+        entity: sorted(i for i in ids if (entity, i) not in found)
+        for entity, ids in wanted.items()
+    }
+    missing = {entity: ids for entity, ids in missing.items() if ids}
+    if missing:
+        raise MissingReferences(missing)
+
+
+def _check_item_references(db: Session, entity: str, items: List[BaseModel]):
+    references: Dict[str, List[int]] = {}
+    for field, referenced in REFERENCE_FIELDS[entity].items():
+        references.setdefault(referenced, []).extend(
+            getattr(item, field) for item in items
+        )
+    check_references(db, references)
+
+
+class ReferenceService:
+    """
+    Create, update and list the reference entities (locations, hotels,
+    transfers and activities) that itineraries are built from.
+
+    Every write is recorded in the change log within its transaction, and
+    once committed publishes a change event, which refreshes the reference
+    snapshot and invalidates the cached itineraries and listings depending on
+    the changed entities.
+    """
+
+    @staticmethod
+    def list_entities(db: Session, entity: str, skip: int = 0, limit: int = 100):
+        """
+        Retrieve a page of reference entities ordered by ID.
+        """
+        model = REFERENCE_MODELS[entity]
+        return db.query(model).order_by(model.id).offset(skip).limit(limit).all()
+
+    @staticmethod
+    def create_entity(db: Session, entity: str, data: BaseModel):
+        """
+        Create a reference entity.
+
+        Raises:
+            MissingReferences: If it references an entity that doesn't exist
+        """
+        model = REFERENCE_MODELS[entity]
+        _check_item_references(db, entity, [data])
+        try:
+            db_entity = model(**data.model_dump())
+            db.add(db_entity)
+            db.flush()
+            record_changes(db, entity, [db_entity.id], events.CREATE)
+            db.commit()
+            db.refresh(db_entity)
+        except SQLAlchemyError as e:
+            db.rollback()
+            raise SQLAlchemyError(f"Database error: {str(e)}")
+
+        events.publish(entity, [db_entity.id])
+        return db_entity
+
+    @staticmethod
+    def update_entity(db: Session, entity: str, entity_id: int, data: BaseModel):
+        """
+        Replace the fields of a reference entity. Returns None if it does not
+        exist.
+
+        Raises:
+            MissingReferences: If it references an entity that doesn't exist
+        """
+        model = REFERENCE_MODELS[entity]
+        db_entity = db.get(model, entity_id)
+        if db_entity is None:
+            return None
+        _check_item_references(db, entity, [data])
+
+        try:
+            for field, value in data.model_dump().items():
+                setattr(db_entity, field, value)
+            record_changes(db, entity, [entity_id], events.UPDATE)
+            db.commit()
+            db.refresh(db_entity)
+        except SQLAlchemyError as e:
+            db.rollback()
+            raise SQLAlchemyError(f"Database error: {str(e)}")
+
+        events.publish(entity, [entity_id])
+        return db_entity
+
+    @staticmethod
+    def upsert_entities(db: Session, entity: str, items: List[BaseModel]):
+        """
+        Create or update a batch of reference entities in a single transaction.
+
+        Items with an `id` of an existing entity update it, all others are
+        created. Existing entities are looked up with one query, and a single
+        change event is published for the whole batch.
+
+        Raises:
+            MissingReferences: If any item references an entity that doesn't
+                exist; nothing is written
+        """
+        model = REFERENCE_MODELS[entity]
+        _check_item_references(db, entity, items)
+        ids = [item.id for item in items if item.id is not None]
+        existing = {}
+        if ids:
+            existing = {e.id: e for e in db.query(model).filter(model.id.in_(ids))}
+
+        db_entities = []
+        created, updated = [], []
+        try:
+            for item in items:
+                values = item.model_dump(exclude={"id"})
+                db_entity: Optional[Base] = existing.get(item.id)
+                if db_entity is None:
+                    db_entity = model(id=item.id, **values)
+                    db.add(db_entity)
+                    created.append(db_entity)
+                else:
+                    for field, value in values.items():
+                        setattr(db_entity, field, value)
+                    updated.append(db_entity)
+                db_entities.append(db_entity)
+            db.flush()
+            record_changes(db, entity, [e.id for e in created], events.CREATE)
+            record_changes(db, entity, [e.id for e in updated], events.UPDATE)
+            db.commit()
+            for db_entity in db_entities:
+                db.refresh(db_entity)
+        except SQLAlchemyError as e:
+            db.rollback()
+            raise SQLAlchemyError(f"Database error: {str(e)}")
+
+        events.publish(entity, [e.id for e in db_entities])
+        return db_entities
@@ -0,0 +1,244 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.models import HotelStay, Itinerary, ItineraryDay, itinerary_activity
+from app.services import events
+from app.services.cache import itinerary_cache
+from app.services.reference_cache import (
+    ReferenceSnapshot,
+    get_reference_snapshot,
+    refresh_reference_snapshot,
+)
+
+# (id, itinerary_id, day_number, transfer_id)
+DayRow = Tuple[int, int, int, Optional[int]]
+# (id, itinerary_day_id, hotel_id)
+StayRow = Tuple[int, int, int]
+
+
+class ItineraryRows:
+    """
+    The per-request rows of a set of itineraries: days, hotel stays and
+    day -> activity links, each read with a single query. Everything else is
+    resolved from the reference snapshot.
+    """
+
+    def __init__(self, db: Session, itinerary_ids: List[int]):
+        self.days: Dict[int, List[DayRow]] = {i: [] for i in itinerary_ids}
+        self.stays: Dict[int, StayRow] = {}
+        self.activity_ids: Dict[int, List[int]] = {}
+        if not itinerary_ids:
+            return
+
+        for row in db.execute(
+            select(
+                ItineraryDay.id,
+                ItineraryDay.itinerary_id,
+                ItineraryDay.day_number,
+                ItineraryDay.transfer_id,
+            )
+            .where(ItineraryDay.itinerary_id.in_(itinerary_ids))
+            .order_by(ItineraryDay.itinerary_id, ItineraryDay.day_number)
+        ):
+            self.days[row[1]].append(tuple(row))
+
+        for row in db.execute(
+            select(HotelStay.id, HotelStay.itinerary_day_id, HotelStay.hotel_id)
+            .join(ItineraryDay, ItineraryDay.id == HotelStay.itinerary_day_id)
+            .where(ItineraryDay.itinerary_id.in_(itinerary_ids))
+        ):
+            self.stays[row[1]] = tuple(row)
+
+        self.activity_ids = load_activity_links(db, itinerary_ids)
+
+    def snapshot(self, db: Session) -> ReferenceSnapshot:
+        """
+        The reference snapshot, rebuilt once if these rows reference an entity
+        created after it was built.
+
+        References to rows that don't exist at all are left dangling: they
+        don't trigger a rebuild and readers skip them.
+        """
+        snapshot = get_reference_snapshot(db)
+        missing = snapshot.missing(
+            hotel_ids=(stay[2] for stay in self.stays.values()),
+            transfer_ids=(
+                day[3] for days in self.days.values() for day in days if day[3]
+            ),
+            activity_ids=(a for ids in self.activity_ids.values() for a in ids),
+        )
+        if any(
+            db.execute(select(model.id).where(model.id.in_(ids)).limit(1)).first()
+            for model, ids in missing.items()
+        ):
+            snapshot = refresh_reference_snapshot(db)
+        return snapshot
+
+
+def load_activity_links(db: Session, itinerary_ids: List[int]) -> Dict[int, List[int]]:
+    """
+    Load the day -> activity links of a set of itineraries with one query,
+    as a flat mapping of day ID to activity IDs in position order.
+
+    Only the link table's primary key index is read, no activity rows.
+    """
+    links: Dict[int, List[int]] = {}
+    for day_id, activity_id in db.execute(
+        select(itinerary_activity.c.itinerary_day_id, itinerary_activity.c.activity_id)
+        .join(ItineraryDay, ItineraryDay.id == itinerary_activity.c.itinerary_day_id)
+        .where(ItineraryDay.itinerary_id.in_(itinerary_ids))
+        .order_by(itinerary_activity.c.itinerary_day_id, itinerary_activity.c.position)
+    ):
+        links.setdefault(day_id, []).append(activity_id)
+    return links
+
+
+def _ref_dict(refs: Dict[int, Any], ref_id: Optional[int]):
+    ref = refs.get(ref_id) if ref_id else None
+    return ref.to_dict() if ref is not None else None
+
+
+def _itinerary_dict(itinerary: Itinerary, days: List[Dict[str, Any]]):
+    return {
+        "name": itinerary.name,
+        "description": itinerary.description,
+        "region": itinerary.region,
+        "duration_nights": itinerary.duration_nights,
+        "is_recommended": itinerary.is_recommended,
+        "id": itinerary.id,
+        "days": days,
+    }
+
+
+def serialize_itineraries(
+    db: Session, itineraries: List[Itinerary]
+) -> List[Dict[str, Any]]:
+    """
+    Serialize itineraries into JSON-compatible dicts in the nested shape of
+    `ItineraryDetailed`, resolving transfers and activities from the reference
+    snapshot.
+
+    Serialized itineraries are cached with the transfers and activities they
+    embed as dependencies. Cached dicts are shared and must not be mutated.
+    """
+    result: Dict[int, Dict[str, Any]] = {}
+    missing = []
+    for itinerary in itineraries:
+        cached = itinerary_cache.get(itinerary.id)
+        if cached is None:
+            missing.append(itinerary)
+        else:
+            result[itinerary.id] = cached
+
+    if missing:
+        token = itinerary_cache.read_token(db)
+        rows = ItineraryRows(db, [itinerary.id for itinerary in missing])
+        snapshot = rows.snapshot(db)
+
+        for itinerary in missing:
+            days = []
+            tags = {(events.ITINERARY, itinerary.id)}
+            for day_id, itinerary_id, day_number, transfer_id in rows.days[
+                itinerary.id
+            ]:
+                stay = rows.stays.get(day_id)
+                activity_ids = rows.activity_ids.get(day_id, ())
+                if transfer_id:
+                    tags.add((events.TRANSFER, transfer_id))
+                tags.update((events.ACTIVITY, a) for a in activity_ids)
+                days.append(
+                    {
+                        "id": day_id,
+                        "day_number": day_number,
+                        "transfer": _ref_dict(snapshot.transfers, transfer_id),
+                        "hotel_stay": (
+                            {
+                                "hotel_id": stay[2],
+                                "id": stay[0],
+                                "itinerary_day_id": day_id,
+                            }
+                            if stay
+                            else None
+                        ),
+                        "activities": [
+                            snapshot.activities[a].to_dict()
+                            for a in activity_ids
+                            if a in snapshot.activities
+                        ],
+                    }
+                )
+            data = _itinerary_dict(itinerary, days)
+            itinerary_cache.set(itinerary.id, data, tags, token)
+            result[itinerary.id] = data
+
+    return [result[itinerary.id] for itinerary in itineraries]
+
+
+def side_tables() -> Dict[str, Dict[str, Any]]:
+    """
+    Empty side tables of the normalized shape.
+    """
+    return {"hotels": {}, "transfers": {}, "activities": {}}
+
+
+def normalize_itineraries(
+    db: Session,
+    itineraries: List[Itinerary],
+    tables: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> Dict[str, Any]:
+    """
+    Serialize itineraries in the normalized shape.
+
+    Days reference their hotel, transfer and activities by ID, and every
+    referenced entity is returned once in the `hotels`, `transfers` and
+    `activities` side tables, keyed by ID.
+
+    Parameters:
+        tables: Side tables to add the referenced entities to, e.g. shared
+            by the chunks of a streamed response. New tables by default.
+    """
+    rows = ItineraryRows(db, [itinerary.id for itinerary in itineraries])
+    snapshot = rows.snapshot(db)
+
+    if tables is None:
+        tables = side_tables()
+    hotels = tables["hotels"]
+    transfers = tables["transfers"]
+    activities = tables["activities"]
+    result: List[Dict[str, Any]] = []
+
+    for itinerary in itineraries:
+        days = []
+        for day_id, itinerary_id, day_number, transfer_id in rows.days[itinerary.id]:
+            stay = rows.stays.get(day_id)
+            hotel_id = stay[2] if stay else None
+            activity_ids = rows.activity_ids.get(day_id, [])
+
+            # Dangling references keep their ID but have no side table entry
+            if str(hotel_id) not in hotels and hotel_id in snapshot.hotels:
+                hotels[str(hotel_id)] = snapshot.hotels[hotel_id].to_dict()
+            if str(transfer_id) not in transfers and transfer_id in snapshot.transfers:
+                transfers[str(transfer_id)] = snapshot.transfers[transfer_id].to_dict()
+            for activity_id in activity_ids:
+                if (
+                    str(activity_id) not in activities
+                    and activity_id in snapshot.activities
+                ):
+                    activities[str(activity_id)] = snapshot.activities[
+                        activity_id
+                    ].to_dict()
+
+            days.append(
+                {
+                    "id": day_id,
+                    "day_number": day_number,
+                    "hotel_id": hotel_id,
+                    "transfer_id": transfer_id,
+                    "activity_ids": activity_ids,
+                }
+            )
+        result.append(_itinerary_dict(itinerary, days))
+
+    return {"itineraries": result, **tables}
@@ -0,0 +1,66 @@
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable
+
+from app.services import events
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls. The first caller for a key runs the
+    computation; callers arriving while it is in flight wait for it and share
+    its result (or exception) instead of repeating the work.
+
+    Results are shared between requests, so they must not be mutated.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                if self._calls.get(key) is future:
+                    del self._calls[key]
+
+    def forget(self) -> None:
+        """
+        Detach all in-flight calls. Callers already waiting still get their
+        result, but later callers start a fresh computation.
+        """
+        with self._lock:
+            self._calls.clear()
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+
+itinerary_reads = SingleFlight()
+
+
+def _forget_on_change(event: events.ChangeEvent) -> None:
+    # A read that started before the write may return pre-write data, so
+    # requests arriving after it must not join it
+    itinerary_reads.forget()
+
+
+events.subscribe(_forget_on_change)
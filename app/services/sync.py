@@ -0,0 +1,269 @@
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import event, func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import CHANGE_GAP_GRACE, CHANGE_POLL_INTERVAL
+from app.database.connection import RoutingSession, engine
+from app.models.models import ChangeLog, JobLease
+from app.services import events
+
+# Identifies this worker process in the change log, so it can skip its own
+# changes (already applied locally when they were published)
+ORIGIN = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+
+def record_changes(
+    db: Session, entity: str, ids: Iterable[int], operation: str
+) -> None:
+    """
+    Append the changed entities to the change log, with the kind of change
+    (events.CREATE or events.UPDATE). Must be called before the write is
+    committed, so the log rows are part of the same transaction.
+    """
+    db.add_all(
+        ChangeLog(entity=entity, entity_id=i, origin=ORIGIN, operation=operation)
+        for i in ids
+    )
+
+
+def claim_lease(db: Session, name: str, duration: float) -> bool:
+    """
+    Claim the lease on a job shared by the workers, for `duration` seconds.
+    Returns whether this process got it: the claim is a single conditional
+    UPDATE (or the first INSERT), so only one worker gets an expired lease.
+    """
+    now = time.time()
+    try:
+        claimed = db.execute(
+            update(JobLease)
+            .where(JobLease.name == name, JobLease.expires_at <= now)
+            .values(holder=ORIGIN, expires_at=now + duration)
+        ).rowcount
+        if not claimed and db.get(JobLease, name) is None:
+            db.add(JobLease(name=name, holder=ORIGIN, expires_at=now + duration))
+            # Fails if another worker inserted it first
+            db.flush()
+            claimed = 1
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return False
+    return bool(claimed)
+
+
+class SeqGaps:
+    """
+    Gaps in change log sequence numbers seen by this process, and since when.
+
+    A gap is either a transaction that has not committed yet or one that
+    rolled back. Readers of the log stop before a gap until it fills or is
+    older than the grace period, so a late commit is not skipped.
+    """
+
+    def __init__(self, grace: float = CHANGE_GAP_GRACE):
+        self.grace = grace
+        self._first_seen: Dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    def settled(self, missing_seq: int) -> bool:
+        """
+        Whether the gap starting at `missing_seq` has been open for longer
+        than the grace period. The first call starts its clock.
+        """
+        now = time.monotonic()
+        with self._lock:
+            first_seen = self._first_seen.setdefault(missing_seq, now)
+            if len(self._first_seen) > 1000:
+                # Settled long ago: skipped by every reader by now
+                self._first_seen = {
+                    seq: seen
+                    for seq, seen in self._first_seen.items()
+                    if now - seen <= 10 * self.grace
+                }
+        return now - first_seen > self.grace
+
+
+seq_gaps = SeqGaps()
+
+# Sequence numbers checked for gaps by one readable_head call
+GAP_SCAN_LIMIT = 10000
+
+
+def readable_head(db, since: int, head: int) -> int:
+    """
+    Highest sequence number, at most `head`, up to which the change log after
+    `since` can be read without skipping a change that may still commit: the
+    last one before the first unsettled gap. Checks at most GAP_SCAN_LIMIT
+    sequence numbers.
+
+    Parameters:
+        db: Session or connection
+        since (int): Last sequence number already read
+        head (int): Highest sequence number in the log
+    """
+    if head <= since:
+        return head
+    bound = min(head, since + GAP_SCAN_LIMIT)
+    in_range = (ChangeLog.seq > since, ChangeLog.seq <= bound)
+    count = db.execute(select(func.count()).where(*in_range)).scalar()
+    if count == bound - since:
+        # No gap (the common case, and always on SQLite)
+        return bound
+
+    expected = since + 1
+    for seq in db.execute(
+        select(ChangeLog.seq).where(*in_range).order_by(ChangeLog.seq)
+    ).scalars():
+        if seq != expected and not seq_gaps.settled(expected):
+            return expected - 1
+        expected = seq + 1
+    if expected <= bound and not seq_gaps.settled(expected):
+        # A gap running past the scanned range
+        return expected - 1
+    return bound
+
+
+# Highest change log seq whose change events this process has published (and
+# so whose cache invalidations it has applied)
+_applied_seq = 0
+_applied_lock = threading.Lock()
+
+
+def note_applied_seq(seq: int) -> None:
+    """
+    Record that the changes up to `seq` are about to be published. Must be
+    called before publishing them.
+    """
+    global _applied_seq
+    with _applied_lock:
+        _applied_seq = max(_applied_seq, seq)
+
+
+def replica_is_current(db: Session) -> bool:
+    """
+    Whether the session reads data at least as recent as every change this
+    process has invalidated its caches for. Always true unless the session
+    reads from a replica; otherwise the replica's change log is checked (one
+    indexed query).
+
+    Values read from a replica that is behind must not be cached: the
+    invalidation of the changes it has yet to apply has already happened, so
+    nothing would remove them.
+    """
+    if not getattr(db, "reads_from_replica", False) or not _applied_seq:
+        return True
+    required = _applied_seq
+    return (db.execute(select(func.max(ChangeLog.seq))).scalar() or 0) >= required
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _remember_change_seq(session, flush_context):
+    seqs = [o.seq for o in session.new if isinstance(o, ChangeLog)]
+    if seqs:
+        session.info["change_seq"] = max(seqs + [session.info.get("change_seq", 0)])
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _apply_change_seq(session):
+    # Writers publish their change events after committing
+    seq = session.info.pop("change_seq", None)
+    if seq is not None:
+        note_applied_seq(seq)
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _forget_change_seq(session):
+    session.info.pop("change_seq", None)
+
+
+class ChangeLogPoller:
+    """
+    Background thread that replays changes committed by other worker
+    processes as local change events, keeping every worker's caches
+    consistent.
+
+    On SQLite the poller first checks `PRAGMA data_version`, which only
+    changes when another connection commits, so an idle poll costs no table
+    access. On other databases the change log is queried on every poll.
+    """
+
+    def __init__(self, interval: float = CHANGE_POLL_INTERVAL):
+        self.interval = interval
+        self.last_seq = 0
+        # Whether the last poll read every visible entry (not held at a gap)
+        self.caught_up = True
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        with engine.connect() as connection:
+            latest = connection.execute(select(func.max(ChangeLog.seq))).scalar() or 0
+            # Changes behind a recent gap may still commit: start before it
+            self.last_seq = readable_head(
+                connection, max(latest - GAP_SCAN_LIMIT, 0), latest
+            )
+        # Caches start empty, but must not be filled from a replica that is
+        # behind the changes made before this process started
+        note_applied_seq(self.last_seq)
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="change-log-poller", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        is_sqlite = engine.dialect.name == "sqlite"
+        data_version = None
+        # A dedicated connection: data_version is tracked per connection
+        with engine.connect() as connection:
+            while not self._stop.wait(self.interval):
+                if is_sqlite:
+                    current = connection.exec_driver_sql("PRAGMA data_version").scalar()
+                    if current == data_version and self.caught_up:
+                        continue
+                    data_version = current
+                self.poll(connection)
+                # End the read transaction so the next poll sees new commits
+                connection.rollback()
+
+    def poll(self, connection) -> int:
+        """
+        Publish change events for log entries written by other processes since
+        the last poll. Returns the number of entries read.
+
+        Stops before a gap in the sequence numbers until it fills or is older
+        than CHANGE_GAP_GRACE (see readable_head), so a change committed late
+        by a concurrent transaction is not skipped.
+        """
+        latest = connection.execute(select(func.max(ChangeLog.seq))).scalar() or 0
+        head = readable_head(connection, self.last_seq, latest)
+        self.caught_up = head >= latest
+        rows = connection.execute(
+            select(
+                ChangeLog.seq, ChangeLog.entity, ChangeLog.entity_id, ChangeLog.origin
+            )
+            .where(ChangeLog.seq > self.last_seq, ChangeLog.seq <= head)
+            .order_by(ChangeLog.seq)
+        ).all()
+        changed = defaultdict(set)
+        for seq, entity, entity_id, origin in rows:
+            if origin != ORIGIN:
+                changed[entity].add(entity_id)
+        self.last_seq = max(self.last_seq, head)
+        note_applied_seq(self.last_seq)
+        for entity, ids in changed.items():
+            events.publish(entity, ids)
+        return len(rows)
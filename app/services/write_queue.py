@@ -0,0 +1,198 @@
+import math
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import List, Optional
+
+from app.config import WRITE_BATCH_SIZE, WRITE_QUEUE_SIZE, WRITE_TICKET_LIMIT
+from app.database.connection import SessionLocal
+from app.schemas.schemas import ItineraryCreate, WriteStatus
+from app.services.idempotency import CreateRequestKeys
+from app.services.itinerary_service import ItineraryService
+
+
+class WriteQueueFull(Exception):
+    """
+    The write queue is at capacity. `retry_after` estimates, in seconds, when
+    it will have drained enough to accept the request.
+    """
+
+    def __init__(self, retry_after: int):
+        super().__init__("Write queue is full")
+        self.retry_after = retry_after
+
+
+class WriteTicket:
+    """
+    A queued itinerary create. `future` resolves to the ID of the created
+    itinerary, or to the exception that made the create fail.
+    """
+
+    __slots__ = ("id", "itinerary", "keys", "future")
+
+    def __init__(self, itinerary: ItineraryCreate, keys: CreateRequestKeys):
+        self.id = uuid.uuid4().hex
+        self.itinerary = itinerary
+        self.keys = keys
+        self.future: Future = Future()
+
+    @property
+    def status(self) -> WriteStatus:
+        if not self.future.done():
+            return WriteStatus.PENDING
+        if self.future.exception() is not None:
+            return WriteStatus.FAILED
+        return WriteStatus.DONE
+
+    def to_dict(self) -> dict:
+        status = self.status
+        return {
+            "ticket_id": self.id,
+            "status": status,
+            "itinerary_id": (
+                self.future.result() if status == WriteStatus.DONE else None
+            ),
+            "detail": (
+                str(self.future.exception()) if status == WriteStatus.FAILED else None
+            ),
+        }
+
+
+class ItineraryWriteQueue:
+    """
+    Bounded in-process queue of itinerary creates (write-behind).
+
+    Requests are validated and enqueued, and a single writer thread drains the
+    queue, writing up to `batch_size` itineraries per transaction. Grouping
+    commits means one SQLite writer lock acquisition and one fsync per batch
+    instead of per request. When a batch fails, its requests are retried one
+    by one so a single bad request doesn't fail the others.
+
+    Tickets of recent writes are kept in memory, so their status is only known
+    to the worker process that accepted them.
+    """
+
+    def __init__(
+        self,
+        max_size: int = WRITE_QUEUE_SIZE,
+        batch_size: int = WRITE_BATCH_SIZE,
+        ticket_limit: int = WRITE_TICKET_LIMIT,
+    ):
+        self.batch_size = batch_size
+        self.ticket_limit = ticket_limit
+        self._queue: "queue.Queue[Optional[WriteTicket]]" = queue.Queue(max_size)
+        self._tickets: "OrderedDict[str, WriteTicket]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        # Recent drain rate in itineraries per second, for Retry-After
+        self._rate = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._run, name="itinerary-writer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop the writer after it has written every queued request.
+        """
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def submit(
+        self, itinerary: ItineraryCreate, keys: CreateRequestKeys
+    ) -> WriteTicket:
+        """
+        Enqueue a create request.
+
+        Raises:
+            WriteQueueFull: If the queue is at capacity
+        """
+        ticket = WriteTicket(itinerary, keys)
+        try:
+            self._queue.put_nowait(ticket)
+        except queue.Full:
+            raise WriteQueueFull(self._retry_after())
+
+        with self._lock:
+            self._tickets[ticket.id] = ticket
+            while len(self._tickets) > self.ticket_limit:
+                self._tickets.popitem(last=False)
+        return ticket
+
+    def get_ticket(self, ticket_id: str) -> Optional[WriteTicket]:
+        with self._lock:
+            return self._tickets.get(ticket_id)
+
+    def __len__(self) -> int:
+        return self._queue.qsize()
+
+    def _retry_after(self) -> int:
+        if self._rate <= 0:
+            return 1
+        return max(1, math.ceil(self._queue.qsize() / self._rate))
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch: List[WriteTicket] = []
+            ticket = self._queue.get()
+            # Take whatever else is already queued, up to the batch size
+            while ticket is not None:
+                batch.append(ticket)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    ticket = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            stopping = ticket is None
+
+            if batch:
+                started = time.perf_counter()
+                self._write(batch)
+                rate = len(batch) / max(time.perf_counter() - started, 1e-6)
+                self._rate = rate if self._rate <= 0 else 0.8 * self._rate + 0.2 * rate
+
+    def _write(self, batch: List[WriteTicket]) -> None:
+        db = SessionLocal(primary=True)
+        try:
+            try:
+                db_itineraries = ItineraryService.create_itineraries(
+                    db, [(ticket.itinerary, ticket.keys) for ticket in batch]
+                )
+            except Exception:
+                db_itineraries = None
+
+            if db_itineraries is not None:
+                for ticket, db_itinerary in zip(batch, db_itineraries):
+                    ticket.future.set_result(db_itinerary.id)
+                return
+
+            # Isolate the failing requests; idempotent replays resolve to the
+            # itinerary created by the original request
+            for ticket in batch:
+                try:
+                    db_itinerary, _ = ItineraryService.create_itinerary(
+                        db, ticket.itinerary, keys=ticket.keys
+                    )
+                    ticket.future.set_result(db_itinerary.id)
+                except Exception as e:
+                    ticket.future.set_exception(e)
+        finally:
+            db.close()
+
+
+# Started by the application lifespan when WRITE_BEHIND is enabled
+itinerary_write_queue = ItineraryWriteQueue()
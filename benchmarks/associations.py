@@ -0,0 +1,223 @@
+"""
+Itinerary activity link storage benchmark.
+
+Builds a synthetic dataset of day -> activity links (one million by default)
+in two SQLite databases: the previous layout (rowid table without a key and
+one index per column) and the current one (composite primary key WITHOUT
+ROWID, a position column and a reverse index). Reports the storage used by
+the link table and its indexes, and the time to load every link of a batch of
+itineraries:
+
+    - orm:  the previous read path, loading full activity rows through the
+            association table as the many-to-many relationship did
+    - flat: the current read path, one query returning (day, activity) pairs
+            in position order, run against both layouts
+
+Usage:
+    python benchmarks/associations.py [--links 1000000] [--batch 100]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+DAYS_PER_ITINERARY = 5
+ACTIVITIES = 2000
+
+SCHEMA = """
+CREATE TABLE activities (
+    id INTEGER PRIMARY KEY, name TEXT, location_id INTEGER, description TEXT,
+    duration_minutes INTEGER, price FLOAT
+);
+CREATE TABLE itinerary_days (id INTEGER PRIMARY KEY, itinerary_id INTEGER);
+CREATE INDEX ix_itinerary_days_itinerary_id ON itinerary_days (itinerary_id);
+"""
+
+PREVIOUS_LAYOUT = """
+CREATE TABLE itinerary_activity (itinerary_day_id INTEGER, activity_id INTEGER);
+CREATE INDEX ix_itinerary_activity_itinerary_day_id
+    ON itinerary_activity (itinerary_day_id);
+CREATE INDEX ix_itinerary_activity_activity_id ON itinerary_activity (activity_id);
+"""
+
+CURRENT_LAYOUT = """
+CREATE TABLE itinerary_activity (
+    itinerary_day_id INTEGER NOT NULL,
+    activity_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (itinerary_day_id, activity_id)
+) WITHOUT ROWID;
+CREATE INDEX ix_itinerary_activity_activity_day
+    ON itinerary_activity (activity_id, itinerary_day_id);
+"""
+
+ORM_QUERY = """
+SELECT itinerary_activity.itinerary_day_id, activities.id, activities.name,
+    activities.location_id, activities.description, activities.duration_minutes,
+    activities.price
+FROM activities JOIN itinerary_activity
+    ON activities.id = itinerary_activity.activity_id
+WHERE itinerary_activity.itinerary_day_id IN ({days})
+"""
+
+FLAT_QUERY = """
+SELECT itinerary_activity.itinerary_day_id, itinerary_activity.activity_id
+FROM itinerary_activity JOIN itinerary_days
+    ON itinerary_days.id = itinerary_activity.itinerary_day_id
+WHERE itinerary_days.itinerary_id IN ({itineraries})
+ORDER BY itinerary_activity.itinerary_day_id{position}
+"""
+
+
+def synthetic_links(links: int, seed: int = 0):
+    """
+    Yield (day_id, activity_id, position) for `links` links, 4 per day on
+    average, with distinct activities within a day.
+    """
+    rng = random.Random(seed)
+    day_id = 0
+    produced = 0
+    while produced < links:
+        day_id += 1
+        count = min(rng.randint(2, 6), links - produced)
+        for position, activity_id in enumerate(rng.sample(range(1, ACTIVITIES), count)):
+            yield day_id, activity_id, position
+        produced += count
+
+
+def build(path: str, layout: str, links: int) -> int:
+    """
+    Create and fill a database. Returns the number of days.
+    """
+    connection = sqlite3.connect(path)
+    connection.executescript(SCHEMA + layout)
+    connection.executemany(
+        "INSERT INTO activities VALUES (?, ?, ?, ?, ?, ?)",
+        (
+            (i, f"Activity {i}", i % 50, "A synthetic activity " * 4, 120, 35.0)
+            for i in range(1, ACTIVITIES)
+        ),
+    )
+    if "position" in layout:
+        connection.executemany(
+            "INSERT INTO itinerary_activity VALUES (?, ?, ?)", synthetic_links(links)
+        )
+    else:
+        connection.executemany(
+            "INSERT INTO itinerary_activity VALUES (?, ?)",
+            ((day, activity) for day, activity, _ in synthetic_links(links)),
+        )
+    days = connection.execute(
+        "SELECT MAX(itinerary_day_id) FROM itinerary_activity"
+    ).fetchone()[0]
+    connection.executemany(
+        "INSERT INTO itinerary_days VALUES (?, ?)",
+        ((day, (day - 1) // DAYS_PER_ITINERARY + 1) for day in range(1, days + 1)),
+    )
+    connection.commit()
+    connection.execute("VACUUM")
+    connection.execute("ANALYZE")
+    connection.close()
+    return days
+
+
+def link_storage(path: str) -> int:
+    """
+    Bytes used by the link table and its indexes.
+    """
+    connection = sqlite3.connect(path)
+    page_size = connection.execute("PRAGMA page_size").fetchone()[0]
+    try:
+        pages = connection.execute(
+            "SELECT COUNT(*) FROM dbstat WHERE name = 'itinerary_activity'"
+            " OR name LIKE 'ix_itinerary_activity%'"
+            " OR name LIKE 'sqlite_autoindex_itinerary_activity%'"
+        ).fetchone()[0]
+    except sqlite3.OperationalError:
+        # SQLite built without dbstat: fall back to the whole file
+        pages = os.path.getsize(path) // page_size
+    finally:
+        connection.close()
+    return pages * page_size
+
+
+def time_loads(
+    path: str, mode: str, ordered: bool, itineraries: int, batch: int, runs: int
+) -> float:
+    connection = sqlite3.connect(path)
+    rng = random.Random(1)
+    timings = []
+    for _ in range(runs):
+        ids = rng.sample(range(1, itineraries + 1), batch)
+        started = time.perf_counter()
+        links = {}
+        if mode == "orm":
+            # The relationship loader first reads the days, then their
+            # activities through the association table
+            days = [
+                row[0]
+                for row in connection.execute(
+                    "SELECT id FROM itinerary_days WHERE itinerary_id IN "
+                    f"({','.join('?' * len(ids))})",
+                    ids,
+                )
+            ]
+            query = ORM_QUERY.format(days=",".join("?" * len(days)))
+            for row in connection.execute(query, days):
+                links.setdefault(row[0], []).append(row[1:])
+        else:
+            query = FLAT_QUERY.format(
+                itineraries=",".join("?" * len(ids)),
+                # The previous layout has no position to order by
+                position=", itinerary_activity.position" if ordered else "",
+            )
+            for day_id, activity_id in connection.execute(query, ids):
+                links.setdefault(day_id, []).append(activity_id)
+        timings.append(time.perf_counter() - started)
+    connection.close()
+    return statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--links", type=int, default=1_000_000)
+    parser.add_argument("--batch", type=int, default=100, help="Itineraries per load")
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="associations-bench-") as workdir:
+        previous = os.path.join(workdir, "previous.db")
+        current = os.path.join(workdir, "current.db")
+        days = build(previous, PREVIOUS_LAYOUT, args.links)
+        build(current, CURRENT_LAYOUT, args.links)
+        itineraries = days // DAYS_PER_ITINERARY
+
+        previous_size = link_storage(previous)
+        current_size = link_storage(current)
+        print(f"{args.links:,} links, {days:,} days, {itineraries:,} itineraries")
+        print(f"{'layout':>9} {'storage MB':>11}")
+        print(f"{'previous':>9} {previous_size / 1e6:>11.1f}")
+        print(
+            f"{'current':>9} {current_size / 1e6:>11.1f}"
+            f"  ({1 - current_size / previous_size:.0%} smaller)"
+        )
+
+        print(f"\nload {args.batch} itineraries (median of {args.runs})")
+        print(f"{'layout':>9} {'read path':>10} {'ms':>8}")
+        for layout, path, mode, ordered in (
+            ("previous", previous, "orm", False),
+            ("previous", previous, "flat", False),
+            ("current", current, "flat", True),
+        ):
+            elapsed = time_loads(
+                path, mode, ordered, itineraries, args.batch, args.runs
+            )
+            print(f"{layout:>9} {mode:>10} {elapsed:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
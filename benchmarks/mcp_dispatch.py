@@ -0,0 +1,100 @@
+"""
+MCP tool call latency benchmark.
+
+Calls MCP tools in-process, as the MCP server does for a client's tool call,
+and measures the latency of each call with both dispatch modes (see
+MCP_DISPATCH):
+
+    - http:   the tool call is proxied as an HTTP request to the API
+    - direct: the tool call is validated and run against the services
+
+Each tool is called sequentially, so the numbers are per-call overhead rather
+than throughput. Rate limiting is disabled.
+
+Usage:
+    python benchmarks/mcp_dispatch.py [--calls 500] [--json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+from workers import ROOT_DIR
+
+TOOLS = [
+    ("Get_Itinerary_by_ID", {"itinerary_id": 1}),
+    ("Get_All_Itineraries", {"limit": 10}),
+    ("Get_All_Hotels", {"limit": 10}),
+]
+
+MODES = ("http", "direct")
+
+
+async def run(calls: int) -> dict:
+    # Imported once DATABASE_URL points at the benchmark database
+    from main import app, mcp
+
+    results = {}
+    async with app.router.lifespan_context(app):
+        for tool, arguments in TOOLS:
+            results[tool] = {}
+            for mode in MODES:
+                mcp.dispatch = mode
+                # Warm up caches and connections
+                for _ in range(20):
+                    await mcp.call_tool(tool, arguments)
+                latencies = []
+                for _ in range(calls):
+                    start = time.perf_counter()
+                    await mcp.call_tool(tool, arguments)
+                    latencies.append((time.perf_counter() - start) * 1000)
+                latencies.sort()
+                results[tool][mode] = {
+                    "median_ms": round(statistics.median(latencies), 3),
+                    "p95_ms": round(latencies[int(len(latencies) * 0.95)], 3),
+                }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--json", action="store_true", help="Print JSON results")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="mcp-dispatch-bench-")
+    try:
+        database = os.path.join(workdir, "travel_itinerary.db")
+        shutil.copy(os.path.join(ROOT_DIR, "travel_itinerary.db"), database)
+        os.environ["DATABASE_URL"] = f"sqlite:///{database}"
+        os.environ["RATE_LIMIT_ENABLED"] = "0"
+        sys.path.insert(0, ROOT_DIR)
+
+        results = asyncio.run(run(args.calls))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(results))
+        return
+
+    print(f"{args.calls} sequential calls per tool and mode")
+    print(f"{'tool':>20} {'mode':>7} {'median ms':>10} {'p95 ms':>8}")
+    for tool, modes in results.items():
+        for mode, result in modes.items():
+            print(
+                f"{tool:>20} {mode:>7} {result['median_ms']:>10.3f}"
+                f" {result['p95_ms']:>8.3f}"
+            )
+        speedup = modes["http"]["median_ms"] / modes["direct"]["median_ms"]
+        print(f"{'':>20} {'':>7} {speedup:>9.1f}x faster direct")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,426 @@
+"""
+MCP agent session load test.
+
+Replays agent sessions against the MCP server over its SSE transport
+(mounted at /mcp), with a number of concurrent agents, and reports end-to-end
+session latency, per-tool latency distributions and error rates.
+
+Each session opens its own MCP connection, initializes it and calls a
+scenario's tools in order, as an agent does: e.g. list itineraries, read two
+of them, then create one. Failed calls are retried like an agent would, with
+the server's Retry-After on 429. Agents run sessions back to back, picking
+scenarios at random by weight.
+
+By default the server is started locally with uvicorn on a copy of the
+database, with the environment's settings (rate limiting included). Use
+--url to target a running instance instead.
+
+Scenarios are JSON, e.g. recorded from real sessions:
+
+    [
+        {
+            "name": "plan_and_book",
+            "weight": 1,
+            "steps": [
+                {"tool": "Get_All_Itineraries", "arguments": {"limit": 10}},
+                {
+                    "tool": "Get_Itinerary_by_ID",
+                    "arguments": {"itinerary_id": {"$pick": 0}},
+                    "think_time": 0.5
+                },
+                {
+                    "tool": "Create_Itinerary",
+                    "arguments": {..., "idempotency_key": "$key"}
+                }
+            ]
+        }
+    ]
+
+Argument values can refer to the session:
+    - {"$pick": N}: the `id` of a random item of the result of step N
+    - "$key": a key unique to the session and step, the same for its retries
+
+`think_time` is the pause in seconds before a step, counted in the session
+latency.
+
+Usage:
+    python benchmarks/mcp_sessions.py [--sessions 200] [--concurrency 16]
+        [--scenarios sessions.json] [--url http://127.0.0.1:8000] [--json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+
+from workers import ROOT_DIR, start_server
+
+CREATE_ARGUMENTS = {
+    "name": "Load Test Getaway",
+    "description": "Created by the MCP session load test",
+    "region": "Phuket",
+    "duration_nights": 2,
+    "days": [
+        {"day_number": 1, "hotel_id": 1, "activity_ids": [1]},
+        {"day_number": 2, "hotel_id": 1, "transfer_id": 1, "activity_ids": [2]},
+    ],
+    "idempotency_key": "$key",
+}
+
+DEFAULT_SCENARIOS = [
+    {
+        "name": "browse",
+        "weight": 6,
+        "steps": [
+            {"tool": "Get_All_Itineraries", "arguments": {"limit": 10}},
+            {
+                "tool": "Get_Itinerary_by_ID",
+                "arguments": {"itinerary_id": {"$pick": 0}},
+            },
+            {
+                "tool": "Get_Itinerary_by_ID",
+                "arguments": {"itinerary_id": {"$pick": 0}},
+            },
+        ],
+    },
+    {
+        "name": "plan_and_book",
+        "weight": 3,
+        "steps": [
+            {
+                "tool": "Get_All_Itineraries",
+                "arguments": {"region": "Phuket", "max_nights": 5, "limit": 10},
+            },
+            {
+                "tool": "Get_Itinerary_by_ID",
+                "arguments": {"itinerary_id": {"$pick": 0}},
+            },
+            {
+                "tool": "Get_Itinerary_by_ID",
+                "arguments": {"itinerary_id": {"$pick": 0}},
+            },
+            {"tool": "Create_Itinerary", "arguments": CREATE_ARGUMENTS},
+        ],
+    },
+    {
+        "name": "lookup",
+        "weight": 1,
+        "steps": [
+            {"tool": "Get_Itinerary_by_ID", "arguments": {"itinerary_id": 1}},
+        ],
+    },
+]
+
+# Tool errors carry the API's status code, e.g. "Status code: 429"
+STATUS_PATTERN = re.compile(r"Status code: (\d+)")
+RETRY_AFTER_PATTERN = re.compile(r"retry after ([\d.]+) seconds", re.IGNORECASE)
+
+# Status codes retried by agents; creates are made safe to retry by their
+# idempotency key
+RETRIED_STATUSES = {429, 500, 502, 503, 504}
+
+
+class Stats:
+    def __init__(self):
+        self.sessions = []  # (scenario, seconds, ok)
+        self.calls = defaultdict(list)  # tool -> latencies of attempts (ms)
+        self.errors = defaultdict(lambda: defaultdict(int))  # tool -> kind -> n
+        self.retries = defaultdict(int)
+        self.failed_calls = defaultdict(int)
+
+
+def resolve(value, results: list, key: str, rng: random.Random):
+    if isinstance(value, dict):
+        if set(value) == {"$pick"}:
+            result = results[value["$pick"]]
+            items = result if isinstance(result, list) else [result]
+            return rng.choice(items)["id"]
+        return {k: resolve(v, results, key, rng) for k, v in value.items()}
+    if isinstance(value, list):
+        return [resolve(v, results, key, rng) for v in value]
+    if value == "$key":
+        return key
+    return value
+
+
+async def call_tool(
+    session: ClientSession,
+    tool: str,
+    arguments: dict,
+    retries: int,
+    stats: Stats,
+):
+    """
+    Call a tool, retrying transient failures. Returns the decoded result, or
+    raises RuntimeError once the retries are exhausted.
+    """
+    for attempt in range(retries + 1):
+        start = time.perf_counter()
+        try:
+            result = await session.call_tool(tool, arguments)
+        except Exception as e:
+            kind, status, text = type(e).__name__, None, str(e)
+        else:
+            text = result.content[0].text if result.content else ""
+            if not result.isError:
+                stats.calls[tool].append((time.perf_counter() - start) * 1000)
+                return json.loads(text) if text else None
+            match = STATUS_PATTERN.search(text)
+            status = int(match.group(1)) if match else None
+            kind = str(status or "error")
+        stats.calls[tool].append((time.perf_counter() - start) * 1000)
+        stats.errors[tool][kind] += 1
+
+        retried = status is None or status in RETRIED_STATUSES
+        if not retried or attempt == retries:
+            stats.failed_calls[tool] += 1
+            raise RuntimeError(f"{tool} failed: {text[:200]}")
+        stats.retries[tool] += 1
+        match = RETRY_AFTER_PATTERN.search(text)
+        await asyncio.sleep(float(match.group(1)) if match else 0.1 * 2**attempt)
+
+
+async def run_session(
+    url: str, scenario: dict, retries: int, stats: Stats, rng: random.Random
+) -> None:
+    session_id = uuid.uuid4().hex
+    start = time.perf_counter()
+    ok = True
+    try:
+        async with sse_client(f"{url}/mcp") as (read, write):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                results = []
+                for index, step in enumerate(scenario["steps"]):
+                    if step.get("think_time"):
+                        await asyncio.sleep(step["think_time"])
+                    arguments = resolve(
+                        step.get("arguments", {}),
+                        results,
+                        f"{session_id}-{index}",
+                        rng,
+                    )
+                    try:
+                        result = await call_tool(
+                            session, step["tool"], arguments, retries, stats
+                        )
+                    except RuntimeError:
+                        # Counted with the tool's errors; the agent gives up
+                        ok = False
+                        break
+                    results.append(result)
+    except Exception as e:
+        ok = False
+        stats.errors["(session)"][type(e).__name__] += 1
+    stats.sessions.append((scenario["name"], time.perf_counter() - start, ok))
+
+
+async def run(
+    url: str,
+    scenarios: list,
+    sessions: int,
+    concurrency: int,
+    retries: int,
+    seed: int,
+) -> tuple:
+    stats = Stats()
+    rng = random.Random(seed)
+    weights = [scenario.get("weight", 1) for scenario in scenarios]
+    remaining = sessions
+
+    async def agent():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            scenario = rng.choices(scenarios, weights)[0]
+            await run_session(url, scenario, retries, stats, rng)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(agent() for _ in range(concurrency)))
+    return stats, time.perf_counter() - start
+
+
+def percentiles(values: list) -> dict:
+    values = sorted(values)
+    if not values:
+        return {}
+
+    def at(q: float) -> float:
+        return round(values[min(len(values) - 1, int(len(values) * q))], 3)
+
+    return {
+        "median": round(statistics.median(values), 3),
+        "p95": at(0.95),
+        "p99": at(0.99),
+        "max": round(values[-1], 3),
+    }
+
+
+def summarize(stats: Stats, elapsed: float) -> dict:
+    tools = {}
+    for tool, latencies in stats.calls.items():
+        errors = sum(stats.errors[tool].values())
+        tools[tool] = {
+            "attempts": len(latencies),
+            "errors": dict(stats.errors[tool]),
+            "error_rate": round(errors / len(latencies), 4),
+            "retries": stats.retries[tool],
+            "failed": stats.failed_calls[tool],
+            "latency_ms": percentiles(latencies),
+        }
+
+    scenarios = {}
+    for name in sorted({s[0] for s in stats.sessions}):
+        runs = [s for s in stats.sessions if s[0] == name]
+        scenarios[name] = {
+            "sessions": len(runs),
+            "failed": sum(1 for s in runs if not s[2]),
+            "latency_ms": percentiles([s[1] * 1000 for s in runs]),
+        }
+
+    failed = sum(1 for s in stats.sessions if not s[2])
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "sessions": len(stats.sessions),
+        "failed_sessions": failed,
+        "session_error_rate": round(failed / max(len(stats.sessions), 1), 4),
+        "sessions_per_s": round(len(stats.sessions) / elapsed, 2),
+        "calls_per_s": round(sum(len(v) for v in stats.calls.values()) / elapsed, 2),
+        "session_latency_ms": percentiles([s[1] * 1000 for s in stats.sessions]),
+        "scenarios": scenarios,
+        "tools": tools,
+        "connection_errors": dict(stats.errors.get("(session)", {})),
+    }
+
+
+def report(results: dict) -> None:
+    print(
+        f"{results['sessions']} sessions in {results['elapsed_s']:.1f} s"
+        f" ({results['sessions_per_s']:.1f} sessions/s,"
+        f" {results['calls_per_s']:.1f} calls/s),"
+        f" {results['failed_sessions']} failed"
+        f" ({results['session_error_rate']:.2%})"
+    )
+    if results["connection_errors"]:
+        print(f"connection errors: {results['connection_errors']}")
+
+    header = f"{'median ms':>10} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}"
+
+    def latency(p: dict) -> str:
+        return (
+            f"{p['median']:>10.1f} {p['p95']:>9.1f} {p['p99']:>9.1f} {p['max']:>9.1f}"
+        )
+
+    print()
+    print(f"{'scenario':>28} {'sessions':>8} {'failed':>7} {header}")
+    for name, s in results["scenarios"].items():
+        print(
+            f"{name:>28} {s['sessions']:>8} {s['failed']:>7}"
+            f" {latency(s['latency_ms'])}"
+        )
+
+    print()
+    print(f"{'tool':>28} {'calls':>8} {'errors':>7} {'retries':>7} {header}")
+    for tool, t in results["tools"].items():
+        print(
+            f"{tool:>28} {t['attempts']:>8} {t['error_rate']:>7.2%}"
+            f" {t['retries']:>7} {latency(t['latency_ms'])}"
+        )
+        if t["errors"]:
+            print(f"{'':>28} errors by status: {t['errors']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument(
+        "--concurrency", type=int, default=16, help="Concurrent agent sessions"
+    )
+    parser.add_argument(
+        "--scenarios", help="JSON file of scenarios (default: built-in mix)"
+    )
+    parser.add_argument(
+        "--retries", type=int, default=2, help="Retries of a failed tool call"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--url", help="Running instance to test, e.g. http://127.0.0.1:8000"
+    )
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument(
+        "--workers", type=int, default=1, help="Worker processes of the server"
+    )
+    parser.add_argument("--json", action="store_true", help="Print JSON results")
+    args = parser.parse_args()
+
+    scenarios = DEFAULT_SCENARIOS
+    if args.scenarios:
+        with open(args.scenarios) as f:
+            scenarios = json.load(f)
+
+    workdir = server = None
+    url = args.url
+    try:
+        if url is None:
+            workdir = tempfile.mkdtemp(prefix="mcp-sessions-bench-")
+            database = os.path.join(workdir, "travel_itinerary.db")
+            shutil.copy(os.path.join(ROOT_DIR, "travel_itinerary.db"), database)
+            env = dict(
+                os.environ,
+                DATABASE_URL=f"sqlite:///{database}",
+                AUTO_MIGRATE="0",
+                MCP_TOOLS_CACHE_PATH=os.path.join(workdir, "mcp_tools.json"),
+            )
+            subprocess.check_call(
+                [sys.executable, "-m", "app.database.migrate"],
+                cwd=ROOT_DIR,
+                env=env,
+                stdout=subprocess.DEVNULL,
+            )
+            server = start_server(args.port, args.workers, env)
+            url = f"http://127.0.0.1:{args.port}"
+
+        stats, elapsed = asyncio.run(
+            run(
+                url.rstrip("/"),
+                scenarios,
+                args.sessions,
+                args.concurrency,
+                args.retries,
+                args.seed,
+            )
+        )
+    finally:
+        if server is not None:
+            server.terminate()
+            try:
+                server.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                # Graceful shutdown waits for the MCP SSE streams to close
+                server.kill()
+                server.wait()
+        if workdir is not None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    results = summarize(stats, elapsed)
+    if args.json:
+        print(json.dumps(results))
+    else:
+        report(results)
+
+
+if __name__ == "__main__":
+    main()
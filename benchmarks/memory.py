@@ -0,0 +1,204 @@
+"""
+Itinerary serialization memory benchmark.
+
+Creates a set of itineraries in a copy of the database and measures, with
+tracemalloc, the memory allocated per returned itinerary by each stage of a
+listing response:
+
+    - hydrate:   loading the itinerary rows through SQLAlchemy
+    - serialize: reading days, stays and activity links and building the
+                 nested dicts (the in-process cache is cleared first)
+    - validate:  validating the dicts as `ItineraryDetailed` models
+    - encode:    encoding the dicts as a JSON response body
+
+For each stage it reports the peak allocation above the memory in use when
+the stage started, and the memory still held when it finished, as the median
+over the runs. `total` is the peak of the full response path (hydrate,
+serialize and encode, without validation, as served by the API).
+
+With `--max-bytes-per-itinerary` the script exits with status 1 when the total
+peak per itinerary exceeds the budget, so memory regressions in the schemas or
+the service layer fail CI runs.
+
+Usage:
+    python benchmarks/memory.py [--itineraries 200] [--runs 5]
+        [--max-bytes-per-itinerary N] [--json]
+"""
+
+import argparse
+import gc
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import tracemalloc
+
+from workers import ROOT_DIR
+
+PAYLOAD = {
+    "name": "Benchmark Escape",
+    "description": "Created by benchmarks/memory.py",
+    "region": "Phuket",
+    "duration_nights": 5,
+    "days": [
+        {"day_number": 1, "hotel_id": 1, "transfer_id": 1, "activity_ids": [1, 2]},
+        {"day_number": 2, "hotel_id": 1, "activity_ids": [3]},
+        {"day_number": 3, "hotel_id": 2, "transfer_id": 2, "activity_ids": [4, 5]},
+        {"day_number": 4, "hotel_id": 2, "activity_ids": [1, 3]},
+        {"day_number": 5, "hotel_id": 2, "transfer_id": 1, "activity_ids": [2]},
+    ],
+}
+
+STAGES = ("hydrate", "serialize", "validate", "encode", "total")
+
+
+def measure(fn):
+    """
+    Run fn and return (result, peak bytes, retained bytes), both relative to
+    the memory in use when it started.
+    """
+    gc.collect()
+    tracemalloc.reset_peak()
+    start = tracemalloc.get_traced_memory()[0]
+    result = fn()
+    current, peak = tracemalloc.get_traced_memory()
+    return result, peak - start, current - start
+
+
+def run(itinerary_ids, runs: int) -> dict:
+    # Imported once DATABASE_URL points at the benchmark database
+    from app.api.responses import render
+    from app.database.connection import SessionLocal
+    from app.schemas.schemas import ItineraryDetailed, ResponseFormat
+    from app.services.cache import itinerary_cache
+    from app.services.itinerary_service import ItineraryService
+    from app.services.serialization import serialize_itineraries
+
+    samples = {stage: ([], []) for stage in STAGES}
+
+    def record(stage, peak, retained):
+        samples[stage][0].append(peak / len(itinerary_ids))
+        samples[stage][1].append(retained / len(itinerary_ids))
+
+    # The first run warms up imports, the reference snapshot and statement
+    # caches, and is not recorded
+    for index in range(runs + 1):
+        itinerary_cache.clear()
+        db = SessionLocal()
+        try:
+
+            def response_path():
+                nonlocal itineraries, content, body
+                itineraries, *hydrate = measure(
+                    lambda: ItineraryService.load_itineraries(db, itinerary_ids)
+                )
+                content, *serialize = measure(
+                    lambda: serialize_itineraries(db, itineraries)
+                )
+                body, *encode = measure(
+                    lambda: render(content, ResponseFormat.JSON).body
+                )
+                return hydrate, serialize, encode
+
+            itineraries = content = body = None
+            (hydrate, serialize, encode), *total = measure(response_path)
+            _, *validate = measure(
+                lambda: [ItineraryDetailed.model_validate(item) for item in content]
+            )
+        finally:
+            db.close()
+
+        if index:
+            record("hydrate", *hydrate)
+            record("serialize", *serialize)
+            record("validate", *validate)
+            record("encode", *encode)
+            record("total", *total)
+
+    return {
+        stage: {
+            "peak_bytes_per_itinerary": round(statistics.median(peaks)),
+            "retained_bytes_per_itinerary": round(statistics.median(retained)),
+        }
+        for stage, (peaks, retained) in samples.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--itineraries", type=int, default=200)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--max-bytes-per-itinerary",
+        type=int,
+        default=None,
+        help="Fail when the total peak per itinerary exceeds this",
+    )
+    parser.add_argument("--json", action="store_true", help="Print JSON results")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="memory-bench-")
+    try:
+        database = os.path.join(workdir, "travel_itinerary.db")
+        shutil.copy(os.path.join(ROOT_DIR, "travel_itinerary.db"), database)
+        os.environ["DATABASE_URL"] = f"sqlite:///{database}"
+        sys.path.insert(0, ROOT_DIR)
+
+        from app.database.connection import SessionLocal
+        from app.database.migrate import upgrade_database
+        from app.schemas.schemas import ItineraryCreate
+        from app.services.idempotency import CreateRequestKeys
+        from app.services.itinerary_service import ItineraryService
+
+        upgrade_database()
+        db = SessionLocal(primary=True)
+        try:
+            requests = []
+            for _ in range(args.itineraries):
+                itinerary = ItineraryCreate(**PAYLOAD)
+                requests.append((itinerary, CreateRequestKeys(itinerary, None)))
+            itinerary_ids = [
+                i.id for i in ItineraryService.create_itineraries(db, requests)
+            ]
+        finally:
+            db.close()
+
+        tracemalloc.start()
+        try:
+            results = run(itinerary_ids, args.runs)
+        finally:
+            tracemalloc.stop()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps({"itineraries": len(itinerary_ids), "stages": results}))
+    else:
+        print(
+            f"{len(itinerary_ids)} itineraries, {len(PAYLOAD['days'])} days each "
+            f"(median of {args.runs} runs)"
+        )
+        print(f"{'stage':>10} {'peak B/itinerary':>17} {'retained B/itinerary':>21}")
+        for stage, result in results.items():
+            print(
+                f"{stage:>10} {result['peak_bytes_per_itinerary']:>17,}"
+                f" {result['retained_bytes_per_itinerary']:>21,}"
+            )
+
+    total = results["total"]["peak_bytes_per_itinerary"]
+    if (
+        args.max_bytes_per_itinerary is not None
+        and total > args.max_bytes_per_itinerary
+    ):
+        print(
+            f"Total peak of {total:,} bytes per itinerary exceeds the budget of "
+            f"{args.max_bytes_per_itinerary:,}",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
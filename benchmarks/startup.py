@@ -0,0 +1,122 @@
+"""
+Startup benchmark: measures import-to-ready time of the API.
+
+For each run a fresh server process is started with uvicorn, and the time
+until `GET /` first succeeds is recorded. Import time of `main` and the cost of
+building the MCP tool definitions (cold and from the disk cache) are measured
+separately.
+
+Usage:
+    python benchmarks/startup.py [--runs 5] [--port 8765]
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = """
+import time
+start = time.perf_counter()
+import main
+print(time.perf_counter() - start)
+"""
+
+MCP_TOOLS_SNIPPET = """
+import time
+import main
+start = time.perf_counter()
+main.mcp.tools
+print(time.perf_counter() - start)
+"""
+
+
+def run_python(snippet: str, env: dict) -> float:
+    output = subprocess.check_output(
+        [sys.executable, "-c", snippet], cwd=ROOT_DIR, env=env, text=True
+    )
+    return float(output.strip().splitlines()[-1])
+
+
+def time_to_ready(port: int, env: dict, timeout: float = 30.0) -> float:
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port)],
+        cwd=ROOT_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/", timeout=0.5).is_success:
+                    return time.perf_counter() - start
+            except httpx.TransportError:
+                pass
+            time.sleep(0.005)
+        raise RuntimeError("Server did not become ready in time")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def summarize(name: str, samples: list) -> None:
+    print(
+        f"{name:<28} median {statistics.median(samples) * 1000:8.1f} ms"
+        f"   min {min(samples) * 1000:8.1f} ms   max {max(samples) * 1000:8.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="startup-bench-")
+    try:
+        # Benchmark against a copy of the database so runs don't modify it
+        database = os.path.join(workdir, "travel_itinerary.db")
+        shutil.copy(os.path.join(ROOT_DIR, "travel_itinerary.db"), database)
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{database}",
+            MCP_TOOLS_CACHE_PATH=os.path.join(workdir, "mcp_tools.json"),
+        )
+        # First start applies any pending migrations
+        time_to_ready(args.port, env)
+
+        summarize(
+            "import main", [run_python(IMPORT_SNIPPET, env) for _ in range(args.runs)]
+        )
+        summarize(
+            "import-to-ready",
+            [time_to_ready(args.port, env) for _ in range(args.runs)],
+        )
+        summarize(
+            "MCP tools (cold)",
+            [
+                run_python(MCP_TOOLS_SNIPPET, dict(env, MCP_TOOLS_CACHE_PATH=""))
+                for _ in range(args.runs)
+            ],
+        )
+        run_python(MCP_TOOLS_SNIPPET, env)  # Populate the disk cache
+        summarize(
+            "MCP tools (disk cache)",
+            [run_python(MCP_TOOLS_SNIPPET, env) for _ in range(args.runs)],
+        )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
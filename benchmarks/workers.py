@@ -0,0 +1,159 @@
+"""
+Multi-worker throughput benchmark.
+
+Starts the API with uvicorn at 1, 2, 4 and 8 worker processes and measures
+read throughput (a mix of Get_All_Itineraries and Get_Itinerary_by_ID) with a
+multi-process load generator. Migrations run once up front, as in a
+multi-worker deployment.
+
+Usage:
+    python benchmarks/workers.py [--workers 1 2 4 8] [--duration 10]
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PATHS = ["/itineraries/", "/itineraries/1", "/itineraries/2", "/itineraries/3"]
+
+
+async def _load(port: int, duration: float, concurrency: int) -> tuple:
+    deadline = time.perf_counter() + duration
+    completed = errors = 0
+
+    async with httpx.AsyncClient(
+        base_url=f"http://127.0.0.1:{port}",
+        limits=httpx.Limits(max_connections=concurrency),
+        timeout=10.0,
+        trust_env=False,
+    ) as client:
+
+        async def worker(offset: int):
+            nonlocal completed, errors
+            i = offset
+            while time.perf_counter() < deadline:
+                try:
+                    response = await client.get(PATHS[i % len(PATHS)])
+                    if response.is_success:
+                        completed += 1
+                    else:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                i += 1
+
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return completed, errors
+
+
+def load_process(args: tuple) -> tuple:
+    return asyncio.run(_load(*args))
+
+
+def start_server(port: int, workers: int, env: dict) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "main:app",
+            "--port",
+            str(port),
+            "--workers",
+            str(workers),
+            "--no-access-log",
+        ],
+        cwd=ROOT_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.perf_counter() + 60
+    while time.perf_counter() < deadline:
+        try:
+            response = httpx.get(
+                f"http://127.0.0.1:{port}/", timeout=0.5, trust_env=False
+            )
+            if response.is_success:
+                return process
+        except httpx.TransportError:
+            time.sleep(0.05)
+    process.terminate()
+    raise RuntimeError("Server did not become ready in time")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument(
+        "--clients",
+        type=int,
+        default=max(1, (os.cpu_count() or 2) // 2),
+        help="Load generator processes",
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=32, help="Connections per client"
+    )
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="workers-bench-")
+    try:
+        database = os.path.join(workdir, "travel_itinerary.db")
+        shutil.copy(os.path.join(ROOT_DIR, "travel_itinerary.db"), database)
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{database}",
+            AUTO_MIGRATE="0",
+            MCP_TOOLS_CACHE_PATH=os.path.join(workdir, "mcp_tools.json"),
+            # Every request comes from the same client
+            RATE_LIMIT_ENABLED="0",
+        )
+        subprocess.check_call(
+            [sys.executable, "-m", "app.database.migrate"],
+            cwd=ROOT_DIR,
+            env=env,
+            stdout=subprocess.DEVNULL,
+        )
+
+        print(f"{'workers':>7} {'req/s':>10} {'errors':>7} {'speedup':>8}")
+        baseline = None
+        for workers in args.workers:
+            server = start_server(args.port, workers, env)
+            try:
+                # Warm every worker's caches
+                load_process((args.port, 1.0, args.concurrency))
+                with multiprocessing.Pool(args.clients) as pool:
+                    results = pool.map(
+                        load_process,
+                        [(args.port, args.duration, args.concurrency)] * args.clients,
+                    )
+            finally:
+                server.terminate()
+                server.wait()
+
+            completed = sum(r[0] for r in results)
+            errors = sum(r[1] for r in results)
+            throughput = completed / args.duration
+            baseline = baseline or throughput or 1.0
+            print(
+                f"{workers:>7} {throughput:>10.1f} {errors:>7}"
+                f" {throughput / baseline:>7.2f}x"
+            )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Itinerary creation throughput benchmark.
+
+Starts the API with uvicorn, once with synchronous creates and once in
+write-behind mode, and measures sustained Create_Itinerary requests per second
+from concurrent clients. In write-behind mode every request waits for its
+write, so both modes count durably committed itineraries.
+
+Usage:
+    python benchmarks/writes.py [--duration 10] [--concurrency 32]
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from workers import ROOT_DIR, start_server
+
+PAYLOAD = {
+    "name": "Benchmark Escape",
+    "description": "Created by benchmarks/writes.py",
+    "region": "Phuket",
+    "duration_nights": 3,
+    "days": [
+        {"day_number": 1, "hotel_id": 1, "transfer_id": 1, "activity_ids": [1, 2]},
+        {"day_number": 2, "hotel_id": 1, "activity_ids": [3]},
+        {"day_number": 3, "hotel_id": 2, "transfer_id": 2, "activity_ids": [4]},
+    ],
+}
+
+MODES = [("sync", {"WRITE_BEHIND": "0"}), ("write-behind", {"WRITE_BEHIND": "1"})]
+
+
+async def _load(port: int, duration: float, concurrency: int) -> tuple:
+    deadline = time.perf_counter() + duration
+    created = rejected = errors = 0
+    latencies = []
+
+    async with httpx.AsyncClient(
+        base_url=f"http://127.0.0.1:{port}",
+        limits=httpx.Limits(max_connections=concurrency),
+        timeout=30.0,
+        trust_env=False,
+    ) as client:
+
+        async def worker():
+            nonlocal created, rejected, errors
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = await client.post("/itineraries/", json=PAYLOAD)
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                if response.status_code == 201:
+                    created += 1
+                    latencies.append(time.perf_counter() - started)
+                elif response.status_code == 503:
+                    # Backpressure: honour Retry-After
+                    rejected += 1
+                    await asyncio.sleep(float(response.headers.get("Retry-After", 1)))
+                else:
+                    errors += 1
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    latencies.sort()
+    return created, rejected, errors, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--port", type=int, default=8767)
+    args = parser.parse_args()
+
+    print(
+        f"{'mode':>12} {'creates/s':>10} {'p50 ms':>8} {'p99 ms':>8}"
+        f" {'503s':>6} {'errors':>7}"
+    )
+    for mode, settings in MODES:
+        workdir = tempfile.mkdtemp(prefix="writes-bench-")
+        try:
+            database = os.path.join(workdir, "travel_itinerary.db")
+            shutil.copy(os.path.join(ROOT_DIR, "travel_itinerary.db"), database)
+            env = dict(
+                os.environ,
+                DATABASE_URL=f"sqlite:///{database}",
+                AUTO_MIGRATE="0",
+                MCP_TOOLS_CACHE_PATH="",
+                # Every request comes from the same client
+                RATE_LIMIT_ENABLED="0",
+                **settings,
+            )
+            subprocess.check_call(
+                [sys.executable, "-m", "app.database.migrate"],
+                cwd=ROOT_DIR,
+                env=env,
+                stdout=subprocess.DEVNULL,
+            )
+
+            server = start_server(args.port, 1, env)
+            try:
+                created, rejected, errors, latencies = asyncio.run(
+                    _load(args.port, args.duration, args.concurrency)
+                )
+            finally:
+                server.terminate()
+                server.wait()
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        p50 = latencies[len(latencies) // 2] * 1000 if latencies else 0.0
+        p99 = latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0.0
+        print(
+            f"{mode:>12} {created / args.duration:>10.1f} {p50:>8.1f} {p99:>8.1f}"
+            f" {rejected:>6} {errors:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
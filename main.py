@@ -1,18 +1,77 @@
+import tracemalloc
+
+import httpx
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.api.admin import router as admin_router
+from app.api.availability import router as availability_router
+from app.api.changes import router as changes_router
 from app.api.itineraries import router as itinerary_router
+from app.api.references import (
+    activity_router,
+    hotel_router,
+    location_router,
+    transfer_router,
+)
+from app.config import (
+    AUTO_MIGRATE,
+    MEMORY_PROFILING,
+    WRITE_BEHIND,
+)
 from app.database.seed import init_db
+from app.mcp_server import LazyFastApiMCP
+from app.services.ranking_service import RankingJob
+from app.services.sync import ChangeLogPoller
+from app.services.write_queue import itinerary_write_queue
+from app.middleware.compression import CompressionMiddleware
+from app.middleware.memory_profile import MemoryProfileMiddleware
+from app.middleware.rate_limit import INTERNAL_CLIENT, RateLimitMiddleware
 from contextlib import asynccontextmanager
-from fastapi_mcp import FastApiMCP
+
+
+# Lifespan manager of FastAPI
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    print("Starting up...")
+    # Apply pending migrations and seed data. This is a single query when the
+    # database is already up to date.
+    if AUTO_MIGRATE:
+        init_db()
+    # Invalidate this worker's caches when other workers write
+    poller = ChangeLogPoller()
+    poller.start()
+    # Save read counts and rebuild the recommendation ranking periodically
+    ranking = RankingJob()
+    ranking.start()
+    # Write queued itinerary creates in batches
+    if WRITE_BEHIND:
+        itinerary_write_queue.start()
+    # Trace allocations for /admin/memory-profile
+    if MEMORY_PROFILING:
+        tracemalloc.start()
+    yield
+    print("Shutting Down...")
+    # Drain queued creates before the process exits
+    itinerary_write_queue.stop()
+    poller.stop()
+    ranking.stop()
+    if MEMORY_PROFILING:
+        tracemalloc.stop()
+
 
 # Initialize application
 app = FastAPI(
     title="Travel Itinerary API",
     description="API for managing travel itineraries",
+    lifespan=lifespan,
 )
 
 
+# Rate limit clients. Added first so it runs inside CORS, and 429 responses get
+# CORS headers.
+app.add_middleware(RateLimitMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -22,35 +81,56 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large responses (gzip, and brotli/zstd when installed)
+app.add_middleware(CompressionMiddleware)
+
+# Profile the memory of each request, including compression
+if MEMORY_PROFILING:
+    app.add_middleware(MemoryProfileMiddleware)
+
 # Include routers
 app.include_router(itinerary_router)
+app.include_router(location_router)
+app.include_router(hotel_router)
+app.include_router(transfer_router)
+app.include_router(activity_router)
+app.include_router(availability_router)
+app.include_router(changes_router)
+app.include_router(admin_router)
 
 # Mount the MCP server directly to the FastAPI app
 # Doing this over here to ensure mcp server is created after including routes
-mcp = FastApiMCP(
+# Tool definitions are generated on first use and cached on disk
+mcp = LazyFastApiMCP(
     app,
     name="Travel Itinerary API MCP Server",
     description="MCP server for managing travel itineraries",
     describe_full_response_schema=True,  # Describe the full response JSON-schema
     describe_all_responses=True,  # All possible responses instead of just success (2XX) response
+    # Tool calls are proxied in-process, so skip compressing and decompressing them.
+    # Their requests are rate limited as the calling MCP client.
+    http_client=httpx.AsyncClient(
+        transport=httpx.ASGITransport(
+            app=app, raise_app_exceptions=False, client=INTERNAL_CLIENT
+        ),
+        base_url="http://apiserver",
+        headers={"Accept-Encoding": "identity"},
+        timeout=10.0,
+    ),
 )
 mcp.mount()
 
 
-# Lifespan manager of FastAPI
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    print("Starting up...")
-    # Initialize db tables and seed data
-    init_db()
-    yield
-    print("Shutting Down...")
-
-
 @app.get("/")
 async def root():
     return {
         "message": "Welcome to the Travel Itinerary API",
         "docs": "/docs",
-        "endpoints": {"itineraries": "/itineraries"},
+        "endpoints": {
+            "itineraries": "/itineraries",
+            "locations": "/locations",
+            "hotels": "/hotels",
+            "transfers": "/transfers",
+            "activities": "/activities",
+        },
     }
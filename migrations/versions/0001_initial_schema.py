@@ -0,0 +1,127 @@
+"""Initial schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2025-04-29 00:00:00
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+transfer_type = sa.Enum(
+    "TAXI", "BUS", "FERRY", "PRIVATE_CAR", "AIRPLANE", name="transfertype"
+)
+
+
+def upgrade() -> None:
+    op.create_table(
+        "locations",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("region", sa.String(), nullable=False),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_locations_id", "locations", ["id"])
+
+    op.create_table(
+        "itineraries",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("region", sa.String(), nullable=False),
+        sa.Column("duration_nights", sa.Integer(), nullable=False),
+        sa.Column("is_recommended", sa.Integer(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_itineraries_id", "itineraries", ["id"])
+
+    op.create_table(
+        "hotels",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("location_id", sa.Integer(), nullable=False),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("rating", sa.Float(), nullable=True),
+        sa.Column("price_per_night", sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(["location_id"], ["locations.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_hotels_id", "hotels", ["id"])
+
+    op.create_table(
+        "transfers",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("origin_location_id", sa.Integer(), nullable=False),
+        sa.Column("destination_location_id", sa.Integer(), nullable=False),
+        sa.Column("transfer_type", transfer_type, nullable=False),
+        sa.Column("duration_minutes", sa.Integer(), nullable=True),
+        sa.Column("price", sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(["origin_location_id"], ["locations.id"]),
+        sa.ForeignKeyConstraint(["destination_location_id"], ["locations.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_transfers_id", "transfers", ["id"])
+
+    op.create_table(
+        "activities",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("location_id", sa.Integer(), nullable=False),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("duration_minutes", sa.Integer(), nullable=True),
+        sa.Column("price", sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(["location_id"], ["locations.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_activities_id", "activities", ["id"])
+
+    op.create_table(
+        "itinerary_days",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("itinerary_id", sa.Integer(), nullable=False),
+        sa.Column("day_number", sa.Integer(), nullable=False),
+        sa.Column("transfer_id", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(["itinerary_id"], ["itineraries.id"]),
+        sa.ForeignKeyConstraint(["transfer_id"], ["transfers.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_itinerary_days_id", "itinerary_days", ["id"])
+
+    op.create_table(
+        "itinerary_activity",
+        sa.Column("itinerary_day_id", sa.Integer(), nullable=True),
+        sa.Column("activity_id", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(["itinerary_day_id"], ["itinerary_days.id"]),
+        sa.ForeignKeyConstraint(["activity_id"], ["activities.id"]),
+    )
+
+    op.create_table(
+        "hotel_stays",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("itinerary_day_id", sa.Integer(), nullable=False),
+        sa.Column("hotel_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["itinerary_day_id"], ["itinerary_days.id"]),
+        sa.ForeignKeyConstraint(["hotel_id"], ["hotels.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("itinerary_day_id"),
+    )
+    op.create_index("ix_hotel_stays_id", "hotel_stays", ["id"])
+
+
+def downgrade() -> None:
+    op.drop_table("hotel_stays")
+    op.drop_table("itinerary_activity")
+    op.drop_table("itinerary_days")
+    op.drop_table("activities")
+    op.drop_table("transfers")
+    op.drop_table("hotels")
+    op.drop_table("itineraries")
+    op.drop_table("locations")
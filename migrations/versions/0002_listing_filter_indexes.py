@@ -0,0 +1,42 @@
+"""Indexes for itinerary listing filters
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 00:00:00
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ("ix_itineraries_region_duration", "itineraries", ["region", "duration_nights"]),
+    ("ix_hotels_location_id", "hotels", ["location_id"]),
+    ("ix_hotels_rating", "hotels", ["rating"]),
+    ("ix_transfers_transfer_type", "transfers", ["transfer_type"]),
+    ("ix_activities_location_id", "activities", ["location_id"]),
+    ("ix_itinerary_days_itinerary_id", "itinerary_days", ["itinerary_id"]),
+    ("ix_itinerary_days_transfer_id", "itinerary_days", ["transfer_id"]),
+    (
+        "ix_itinerary_activity_itinerary_day_id",
+        "itinerary_activity",
+        ["itinerary_day_id"],
+    ),
+    ("ix_itinerary_activity_activity_id", "itinerary_activity", ["activity_id"]),
+    ("ix_hotel_stays_hotel_id", "hotel_stays", ["hotel_id"]),
+]
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,36 @@
+"""Idempotency keys for itinerary creation
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 00:00:00
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "idempotency_keys",
+        sa.Column("key", sa.LargeBinary(length=32), nullable=False),
+        sa.Column("request_hash", sa.LargeBinary(length=32), nullable=False),
+        sa.Column("itinerary_id", sa.Integer(), nullable=False),
+        sa.Column("expires_at", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["itinerary_id"], ["itineraries.id"]),
+        sa.PrimaryKeyConstraint("key"),
+    )
+    op.create_index(
+        "ix_idempotency_keys_expires_at", "idempotency_keys", ["expires_at"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_idempotency_keys_expires_at", "idempotency_keys")
+    op.drop_table("idempotency_keys")
@@ -0,0 +1,101 @@
+"""Composite primary key and position for itinerary activities
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 00:00:00
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    connection = op.get_bind()
+    # Existing links in insertion order. Duplicates are dropped, and each day's
+    # remaining links are numbered from 0.
+    order_by = (
+        [sa.text("rowid")]
+        if connection.dialect.name == "sqlite"
+        else [sa.text("itinerary_day_id")]
+    )
+    rows = connection.execute(
+        sa.select(sa.column("itinerary_day_id"), sa.column("activity_id"))
+        .select_from(sa.table("itinerary_activity"))
+        .order_by(*order_by)
+    ).all()
+    links = []
+    seen = set()
+    positions = {}
+    for day_id, activity_id in rows:
+        if day_id is None or activity_id is None or (day_id, activity_id) in seen:
+            continue
+        seen.add((day_id, activity_id))
+        position = positions.get(day_id, 0)
+        positions[day_id] = position + 1
+        links.append(
+            {
+                "itinerary_day_id": day_id,
+                "activity_id": activity_id,
+                "position": position,
+            }
+        )
+
+    op.drop_table("itinerary_activity")
+    itinerary_activity = op.create_table(
+        "itinerary_activity",
+        sa.Column("itinerary_day_id", sa.Integer(), nullable=False),
+        sa.Column("activity_id", sa.Integer(), nullable=False),
+        sa.Column("position", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["activity_id"], ["activities.id"]),
+        sa.ForeignKeyConstraint(["itinerary_day_id"], ["itinerary_days.id"]),
+        sa.PrimaryKeyConstraint("itinerary_day_id", "activity_id"),
+        sqlite_with_rowid=False,
+    )
+    op.create_index(
+        "ix_itinerary_activity_activity_day",
+        "itinerary_activity",
+        ["activity_id", "itinerary_day_id"],
+    )
+    if links:
+        op.bulk_insert(itinerary_activity, links)
+
+
+def downgrade() -> None:
+    connection = op.get_bind()
+    rows = connection.execute(
+        sa.select(sa.column("itinerary_day_id"), sa.column("activity_id"))
+        .select_from(sa.table("itinerary_activity"))
+        .order_by(sa.column("itinerary_day_id"), sa.column("position"))
+    ).all()
+
+    op.drop_table("itinerary_activity")
+    itinerary_activity = op.create_table(
+        "itinerary_activity",
+        sa.Column("itinerary_day_id", sa.Integer(), nullable=True),
+        sa.Column("activity_id", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(["activity_id"], ["activities.id"]),
+        sa.ForeignKeyConstraint(["itinerary_day_id"], ["itinerary_days.id"]),
+    )
+    op.create_index(
+        "ix_itinerary_activity_itinerary_day_id",
+        "itinerary_activity",
+        ["itinerary_day_id"],
+    )
+    op.create_index(
+        "ix_itinerary_activity_activity_id", "itinerary_activity", ["activity_id"]
+    )
+    if rows:
+        op.bulk_insert(
+            itinerary_activity,
+            [
+                {"itinerary_day_id": day, "activity_id": activity}
+                for day, activity in rows
+            ],
+        )
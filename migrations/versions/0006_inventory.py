@@ -0,0 +1,44 @@
+"""Dated hotel and activity inventory
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 00:00:00
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "hotel_inventory",
+        sa.Column("hotel_id", sa.Integer(), nullable=False),
+        sa.Column("day", sa.Integer(), nullable=False),
+        sa.Column("rooms_available", sa.Integer(), nullable=False),
+        sa.Column("price", sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(["hotel_id"], ["hotels.id"]),
+        sa.PrimaryKeyConstraint("hotel_id", "day"),
+        sqlite_with_rowid=False,
+    )
+    op.create_table(
+        "activity_inventory",
+        sa.Column("activity_id", sa.Integer(), nullable=False),
+        sa.Column("day", sa.Integer(), nullable=False),
+        sa.Column("places_available", sa.Integer(), nullable=False),
+        sa.Column("price", sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(["activity_id"], ["activities.id"]),
+        sa.PrimaryKeyConstraint("activity_id", "day"),
+        sqlite_with_rowid=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("activity_inventory")
+    op.drop_table("hotel_inventory")
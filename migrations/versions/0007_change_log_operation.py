@@ -0,0 +1,25 @@
+"""Kind of change in the change log
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 00:00:00
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0007"
+down_revision: Union[str, None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("change_log", sa.Column("operation", sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("change_log") as batch_op:
+        batch_op.drop_column("operation")
@@ -0,0 +1,58 @@
+"""Itinerary read counts and recommendation rankings
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 00:00:00
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0008"
+down_revision: Union[str, None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "itinerary_stats",
+        sa.Column("itinerary_id", sa.Integer(), nullable=False),
+        sa.Column("read_count", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["itinerary_id"], ["itineraries.id"]),
+        sa.PrimaryKeyConstraint("itinerary_id"),
+    )
+    op.create_table(
+        "itinerary_rankings",
+        sa.Column("itinerary_id", sa.Integer(), nullable=False),
+        sa.Column("rank", sa.Integer(), nullable=False),
+        sa.Column("region", sa.String(), nullable=False),
+        sa.Column("duration_nights", sa.Integer(), nullable=False),
+        sa.Column("score", sa.Float(), nullable=False),
+        sa.Column("popularity", sa.Float(), nullable=False),
+        sa.Column("value", sa.Float(), nullable=False),
+        sa.Column("diversity", sa.Float(), nullable=False),
+        sa.Column("price_per_night", sa.Float(), nullable=False),
+        sa.Column(
+            "computed_at",
+            sa.DateTime(),
+            server_default=sa.text("(CURRENT_TIMESTAMP)"),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(["itinerary_id"], ["itineraries.id"]),
+        sa.PrimaryKeyConstraint("itinerary_id"),
+        sa.UniqueConstraint("rank"),
+    )
+    op.create_index(
+        "ix_itinerary_rankings_region_rank",
+        "itinerary_rankings",
+        ["region", "rank"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_itinerary_rankings_region_rank", "itinerary_rankings")
+    op.drop_table("itinerary_rankings")
+    op.drop_table("itinerary_stats")
@@ -0,0 +1,183 @@
+import os
+import shutil
+import tempfile
+import uuid
+
+import pytest
+
+# The app reads its configuration at import: point it at a fresh database,
+# migrated and seeded on startup, before anything imports it
+_data_dir = tempfile.mkdtemp(prefix="itinerary-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_data_dir}/travel_itinerary.db"
+os.environ.setdefault("MCP_TOOLS_CACHE_PATH", "")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+os.environ.setdefault("RANKING_INTERVAL", "0")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from main import app  # noqa: E402
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(_data_dir, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def db(client):
+    from app.database.connection import SessionLocal
+
+    session = SessionLocal(primary=True)
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def catalog(client):
+    """
+    Reference data of a region of its own, so tests don't see each other's
+    itineraries: two locations, a 3 and a 5 star hotel, an activity in each
+    location and a ferry between them.
+    """
+    region = f"Test-{uuid.uuid4().hex[:8]}"
+
+    def create(path, **data):
+        response = client.post(path, json=data)
+        assert response.status_code == 201, response.text
+        return response.json()["id"]
+
+    town = create("/locations/", name="Town", region=region)
+    beach = create("/locations/", name="Beach", region=region)
+    return {
+        "region": region,
+        "town": town,
+        "beach": beach,
+        "budget_hotel": create(
+            "/hotels/", name="Budget", location_id=town, rating=3.0, price_per_night=40
+        ),
+        "resort": create(
+            "/hotels/",
+            name="Resort",
+            location_id=beach,
+            rating=5.0,
+            price_per_night=200,
+        ),
+        "walk": create("/activities/", name="Walk", location_id=town, price=5),
+        "dive": create("/activities/", name="Dive", location_id=beach, price=90),
+        "ferry": create(
+            "/transfers/",
+            origin_location_id=town,
+            destination_location_id=beach,
+            transfer_type="ferry",
+            price=15,
+        ),
+    }
+
+
+@pytest.fixture
+def create_itinerary(client, catalog):
+    """
+    Create an itinerary in the catalog's region from (hotel, activities,
+    transfer) tuples, one per day. Returns its ID.
+    """
+
+    def create(name, days, **fields):
+        body = {
+            "name": name,
+            "region": catalog["region"],
+            "duration_nights": len(days),
+            "days": [
+                {
+                    "day_number": number,
+                    "hotel_id": hotel_id,
+                    "activity_ids": activity_ids,
+                    "transfer_id": transfer_id,
+                }
+                for number, (hotel_id, activity_ids, transfer_id) in enumerate(
+                    days, start=1
+                )
+            ],
+            **fields,
+        }
+        response = client.post("/itineraries/", json=body)
+        assert response.status_code == 201, response.text
+        return response.json()["id"]
+
+    return create
+
+
+@pytest.fixture
+def itinerary_body(catalog):
+    return {
+        "name": "Island Hopper",
+        "region": catalog["region"],
+        "duration_nights": 2,
+        "days": [
+            {
+                "day_number": 1,
+                "hotel_id": catalog["budget_hotel"],
+                "activity_ids": [catalog["walk"]],
+            },
+            {
+                "day_number": 2,
+                "hotel_id": catalog["resort"],
+                "activity_ids": [catalog["dive"]],
+                "transfer_id": catalog["ferry"],
+            },
+        ],
+    }
+
+
+# An ID no reference row has
+MISSING_ID = 10**9
+
+
+@pytest.fixture
+def dangling_itinerary(db, catalog):
+    """
+    An itinerary written straight to the database, bypassing the API's
+    checks: day 1 is valid, day 2 stays at a hotel, takes a transfer and does
+    an activity that don't exist, next to an activity that does.
+    """
+    from app.models.models import HotelStay, Itinerary, ItineraryDay
+    from app.models.models import itinerary_activity
+
+    itinerary = Itinerary(name="Dangling", region=catalog["region"], duration_nights=2)
+    db.add(itinerary)
+    db.flush()
+    valid = ItineraryDay(itinerary_id=itinerary.id, day_number=1)
+    broken = ItineraryDay(
+        itinerary_id=itinerary.id, day_number=2, transfer_id=MISSING_ID
+    )
+    db.add_all([valid, broken])
+    db.flush()
+    db.add_all(
+        [
+            HotelStay(itinerary_day_id=valid.id, hotel_id=catalog["budget_hotel"]),
+            HotelStay(itinerary_day_id=broken.id, hotel_id=MISSING_ID),
+        ]
+    )
+    db.execute(
+        itinerary_activity.insert(),
+        [
+            {
+                "itinerary_day_id": day.id,
+                "activity_id": activity_id,
+                "position": position,
+            }
+            for day, activity_id, position in [
+                (valid, catalog["walk"], 0),
+                (broken, MISSING_ID, 0),
+                (broken, catalog["dive"], 1),
+            ]
+        ],
+    )
+    db.commit()
+    return itinerary.id
@@ -0,0 +1,155 @@
+import datetime
+
+import pytest
+
+from conftest import MISSING_ID
+
+from app.config import AVAILABILITY_MAX_SKIP
+from app.services import availability_service
+
+START = datetime.date(2027, 3, 10)
+
+
+def set_inventory(client, plural, entity_id, available, price, start, end=None):
+    response = client.put(
+        f"/availability/{plural}/{entity_id}",
+        json={
+            "start_date": str(start),
+            "end_date": str(end or start),
+            "available": available,
+            "price": price,
+        },
+    )
+    assert response.status_code == 200, response.text
+
+
+@pytest.fixture
+def trips(client, catalog, create_itinerary, dangling_itinerary):
+    c = catalog
+    first, last = datetime.date(2027, 3, 1), datetime.date(2027, 3, 31)
+    set_inventory(client, "hotels", c["budget_hotel"], 5, 100, first, last)
+    set_inventory(client, "hotels", c["resort"], 5, 200, first, last)
+    set_inventory(client, "activities", c["walk"], 10, 5, first, last)
+    set_inventory(client, "activities", c["dive"], 10, 90, first, last)
+    return {
+        "short": create_itinerary("Short", [(c["budget_hotel"], [c["walk"]], None)]),
+        "combo": create_itinerary(
+            "Combo",
+            [
+                (c["budget_hotel"], [c["walk"]], None),
+                (c["resort"], [c["dive"]], c["ferry"]),
+            ],
+        ),
+        "dangling": dangling_itinerary,
+    }
+
+
+def search(client, catalog, start=START, **params):
+    response = client.get(
+        "/availability/itineraries",
+        params={"start_date": str(start), "region": catalog["region"], **params},
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_available_itineraries_are_priced_cheapest_first(client, catalog, trips):
+    short, combo = search(client, catalog, party_size=2)
+    assert short["itinerary_id"] == trips["short"]
+    assert short["price"] == {
+        "hotels": 100.0,
+        "activities": 10.0,
+        "transfers": 0.0,
+        "total": 110.0,
+    }
+    assert combo["itinerary_id"] == trips["combo"]
+    # Two nights, two guests in one room, and the ferry
+    assert combo["price"] == {
+        "hotels": 300.0,
+        "activities": 190.0,
+        "transfers": 15.0,
+        "total": 505.0,
+    }
+    assert combo["end_date"] == "2027-03-12"
+
+
+def test_rooms_default_to_one_per_two_guests(client, catalog, trips):
+    (short,) = search(client, catalog, party_size=3, max_nights=1)
+    assert short["price"]["hotels"] == 200.0
+    (short,) = search(client, catalog, party_size=3, rooms=1, max_nights=1)
+    assert short["price"]["hotels"] == 100.0
+
+
+def test_sold_out_nights_and_activities_exclude_itineraries(client, catalog, trips):
+    c = catalog
+    set_inventory(client, "hotels", c["resort"], 0, 200, START + datetime.timedelta(1))
+    assert [q["itinerary_id"] for q in search(client, catalog)] == [trips["short"]]
+
+    # Not enough places for the party
+    set_inventory(client, "activities", c["walk"], 3, 5, START)
+    assert search(client, catalog, party_size=4) == []
+
+
+def test_calendar_lists_what_is_sold_out(client, catalog, trips):
+    c = catalog
+    sold_out = START + datetime.timedelta(1)
+    set_inventory(client, "hotels", c["resort"], 0, 200, sold_out)
+
+    response = client.get(
+        f"/availability/itineraries/{trips['combo']}",
+        params={"from_date": "2027-03-09", "to_date": "2027-03-11"},
+    )
+    assert response.status_code == 200
+    before, on, after = response.json()
+    # Only the trip starting the day before needs the sold-out night
+    assert before["available"] is True
+    assert on["available"] is False
+    assert on["unavailable"] == [
+        {"date": str(sold_out), "hotel_id": c["resort"], "activity_id": None}
+    ]
+    assert after["available"] is True
+
+
+def test_itineraries_with_dangling_references_are_unavailable(client, catalog, trips):
+    assert trips["dangling"] not in {q["itinerary_id"] for q in search(client, catalog)}
+
+    response = client.get(
+        f"/availability/itineraries/{trips['dangling']}",
+        params={"from_date": str(START), "to_date": str(START)},
+    )
+    assert response.status_code == 200
+    (entry,) = response.json()
+    assert entry["available"] is False
+    second_day = str(START + datetime.timedelta(1))
+    assert {"date": second_day, "hotel_id": MISSING_ID, "activity_id": None} in entry[
+        "unavailable"
+    ]
+
+
+def test_skip_and_limit(client, catalog, trips):
+    assert [q["itinerary_id"] for q in search(client, catalog, skip=1, limit=1)] == [
+        trips["combo"]
+    ]
+    response = client.get(
+        "/availability/itineraries",
+        params={"start_date": str(START), "skip": AVAILABILITY_MAX_SKIP + 1},
+    )
+    assert response.status_code == 422
+
+
+def test_each_entity_is_read_once_per_search(client, catalog, trips, monkeypatch):
+    scanned = []
+    load_rates = availability_service.load_rates
+
+    def recording(db, table, entity_ids, first_day, last_day, minimum):
+        entity_ids = list(entity_ids)
+        scanned.extend((table.change_entity, i) for i in entity_ids)
+        return load_rates(db, table, entity_ids, first_day, last_day, minimum)
+
+    monkeypatch.setattr(availability_service, "load_rates", recording)
+    # One itinerary per chunk: each chunk references hotels seen before
+    monkeypatch.setattr(availability_service, "AVAILABILITY_CHUNK_SIZE", 1)
+
+    results = search(client, catalog)
+    assert [q["itinerary_id"] for q in results] == [trips["short"], trips["combo"]]
+    assert len(scanned) == len(set(scanned))
@@ -0,0 +1,117 @@
+from collections import OrderedDict
+
+import pytest
+
+from app.middleware import rate_limit
+from app.middleware.rate_limit import rate_limiter
+from app.models.models import ChangeLog
+from app.services import sync
+from app.services.change_feed import ChangeFeedService
+
+
+def changes(client, since, **params):
+    response = client.get("/changes/", params={"since": since, **params})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_cursor_follows_writes(client, db, catalog):
+    start = ChangeFeedService.latest_seq(db)
+    location = client.post(
+        "/locations/", json={"name": "Pier", "region": catalog["region"]}
+    ).json()["id"]
+
+    page = changes(client, start)
+    assert [(c["entity"], c["entity_id"], c["operation"]) for c in page["changes"]] == [
+        ("location", location, "create")
+    ]
+    assert page["next_since"] == page["changes"][-1]["seq"]
+    assert not page["has_more"]
+
+    # Nothing new: the cursor stays put
+    again = changes(client, page["next_since"])
+    assert again == {"changes": [], "next_since": page["next_since"], "has_more": False}
+
+
+def test_pages_resume_where_the_last_ended(client, db, catalog):
+    start = ChangeFeedService.latest_seq(db)
+    for name in ("A", "B", "C"):
+        client.post("/locations/", json={"name": name, "region": catalog["region"]})
+
+    first = changes(client, start, limit=2)
+    assert len(first["changes"]) == 2 and first["has_more"]
+    second = changes(client, first["next_since"], limit=2)
+    assert len(second["changes"]) == 1 and not second["has_more"]
+    seqs = [c["seq"] for c in first["changes"] + second["changes"]]
+    assert seqs == sorted(seqs) and len(set(seqs)) == 3
+
+
+def test_entity_filter_moves_past_other_entities(client, db, catalog):
+    start = ChangeFeedService.latest_seq(db)
+    client.post("/locations/", json={"name": "Cove", "region": catalog["region"]})
+
+    page = changes(client, start, entity="itinerary")
+    assert page["changes"] == []
+    assert page["next_since"] > start
+
+
+@pytest.fixture
+def fresh_gaps(monkeypatch):
+    gaps = sync.SeqGaps(grace=60)
+    monkeypatch.setattr(sync, "seq_gaps", gaps)
+    return gaps
+
+
+def add_change(db, seq):
+    db.add(
+        ChangeLog(
+            seq=seq, entity="hotel", entity_id=1, origin="test", operation="update"
+        )
+    )
+    db.commit()
+
+
+def test_cursor_stops_before_a_gap_until_it_fills(db, fresh_gaps):
+    head = ChangeFeedService.latest_seq(db)
+    # head + 2 is taken by a transaction that hasn't committed yet
+    add_change(db, head + 1)
+    add_change(db, head + 3)
+
+    page = ChangeFeedService.get_changes(db, since=head)
+    assert [c["seq"] for c in page["changes"]] == [head + 1]
+    assert page["next_since"] == head + 1
+
+    add_change(db, head + 2)
+    page = ChangeFeedService.get_changes(db, since=page["next_since"])
+    assert [c["seq"] for c in page["changes"]] == [head + 2, head + 3]
+    assert page["next_since"] == head + 3
+
+
+def test_cursor_skips_a_gap_after_the_grace_period(db, fresh_gaps):
+    head = ChangeFeedService.latest_seq(db)
+    # head + 1 rolled back
+    add_change(db, head + 2)
+    assert ChangeFeedService.get_changes(db, since=head)["next_since"] == head
+
+    fresh_gaps.grace = -1
+    page = ChangeFeedService.get_changes(db, since=head)
+    assert [c["seq"] for c in page["changes"]] == [head + 2]
+    assert page["next_since"] == head + 2
+
+
+def test_open_streams_are_capped_per_client(client, monkeypatch):
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(rate_limit, "OPERATION_CONCURRENCY", {"Stream_Changes": 1})
+    monkeypatch.setattr(rate_limiter, "_buckets", OrderedDict())
+    monkeypatch.setattr(rate_limiter, "_in_flight", {})
+    # A stream the test client already has open
+    assert rate_limiter.acquire("ip:testclient", "Stream_Changes") is None
+
+    response = client.get("/changes/stream")
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+
+    # Closing it frees the slot; other clients were never limited
+    assert rate_limiter.acquire("ip:other", "Stream_Changes") is None
+    rate_limiter.release("ip:testclient", "Stream_Changes")
+    assert rate_limiter.acquire("ip:testclient", "Stream_Changes") is None
@@ -0,0 +1,86 @@
+import uuid
+from copy import deepcopy
+
+from conftest import MISSING_ID
+
+from app.models.models import Itinerary
+
+
+def count_itineraries(db, region):
+    return db.query(Itinerary).filter(Itinerary.region == region).count()
+
+
+def test_retry_with_header_returns_the_first_itinerary(client, db, itinerary_body):
+    headers = {"Idempotency-Key": uuid.uuid4().hex}
+    first = client.post("/itineraries/", json=itinerary_body, headers=headers)
+    assert first.status_code == 201
+    assert "Idempotent-Replayed" not in first.headers
+
+    retry = client.post("/itineraries/", json=itinerary_body, headers=headers)
+    assert retry.status_code == 201
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json() == first.json()
+    assert count_itineraries(db, itinerary_body["region"]) == 1
+
+
+def test_retry_with_field_returns_the_first_itinerary(client, db, itinerary_body):
+    body = {**itinerary_body, "idempotency_key": uuid.uuid4().hex}
+    first = client.post("/itineraries/", json=body).json()
+    retry = client.post("/itineraries/", json=body)
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json()["id"] == first["id"]
+    assert count_itineraries(db, itinerary_body["region"]) == 1
+
+
+def test_key_reused_with_a_different_request_is_rejected(client, db, itinerary_body):
+    headers = {"Idempotency-Key": uuid.uuid4().hex}
+    client.post("/itineraries/", json=itinerary_body, headers=headers)
+
+    conflict = client.post(
+        "/itineraries/", json={**itinerary_body, "name": "Other"}, headers=headers
+    )
+    assert conflict.status_code == 422
+    assert "different request" in conflict.json()["detail"]
+    assert count_itineraries(db, itinerary_body["region"]) == 1
+
+
+def test_different_keys_create_different_itineraries(client, db, itinerary_body):
+    for _ in range(2):
+        response = client.post(
+            "/itineraries/",
+            json=itinerary_body,
+            headers={"Idempotency-Key": uuid.uuid4().hex},
+        )
+        assert response.status_code == 201
+    assert count_itineraries(db, itinerary_body["region"]) == 2
+
+
+def test_header_and_field_must_agree(client, itinerary_body):
+    response = client.post(
+        "/itineraries/",
+        json={**itinerary_body, "idempotency_key": "a"},
+        headers={"Idempotency-Key": "b"},
+    )
+    assert response.status_code == 400
+
+
+def test_missing_references_are_rejected_without_storing_the_key(
+    client, db, catalog, itinerary_body
+):
+    headers = {"Idempotency-Key": uuid.uuid4().hex}
+    body = deepcopy(itinerary_body)
+    body["days"][0]["hotel_id"] = MISSING_ID
+    body["days"][1]["transfer_id"] = MISSING_ID + 1
+    body["days"][1]["activity_ids"] = [catalog["dive"], MISSING_ID + 2]
+
+    response = client.post("/itineraries/", json=body, headers=headers)
+    assert response.status_code == 400
+    detail = response.json()["detail"]
+    for missing in (MISSING_ID, MISSING_ID + 1, MISSING_ID + 2):
+        assert str(missing) in detail
+    assert count_itineraries(db, itinerary_body["region"]) == 0
+
+    # The key wasn't used up by the rejected request
+    response = client.post("/itineraries/", json=itinerary_body, headers=headers)
+    assert response.status_code == 201
+    assert "Idempotent-Replayed" not in response.headers
@@ -0,0 +1,102 @@
+import pytest
+from sqlalchemy.orm import Session
+
+from app.models.models import Itinerary
+from app.schemas.schemas import TransferTypeEnum
+from app.services.itinerary_service import ItineraryService
+
+
+@pytest.fixture
+def trips(catalog, create_itinerary):
+    c = catalog
+    return {
+        # Town only
+        "city": create_itinerary(
+            "City Break", [(c["budget_hotel"], [c["walk"]], None)]
+        ),
+        # Town, then the ferry to the beach
+        "combo": create_itinerary(
+            "Combo",
+            [
+                (c["budget_hotel"], [c["walk"]], None),
+                (c["resort"], [c["dive"]], c["ferry"]),
+            ],
+            is_recommended=1,
+        ),
+        # Beach only
+        "beach": create_itinerary(
+            "Beach Week",
+            [(c["resort"], [], None), (c["resort"], [c["dive"]], None)] * 2,
+        ),
+    }
+
+
+def listed(client, region, **params):
+    response = client.get("/itineraries/", params={"region": region, **params})
+    assert response.status_code == 200, response.text
+    return [itinerary["id"] for itinerary in response.json()]
+
+
+@pytest.mark.parametrize(
+    "filters, expected",
+    [
+        ({}, ["city", "combo", "beach"]),
+        ({"location_id": "beach"}, ["combo", "beach"]),
+        ({"hotel_id": "budget_hotel"}, ["city", "combo"]),
+        # Every hotel of the itinerary
+        ({"min_hotel_rating": 4.5}, ["beach"]),
+        ({"min_hotel_rating": 3.0}, ["city", "combo", "beach"]),
+        ({"activity_id": "walk"}, ["city", "combo"]),
+        ({"transfer_type": "ferry"}, ["combo"]),
+        ({"transfer_type": "airplane"}, []),
+        ({"min_nights": 2, "max_nights": 2}, ["combo"]),
+        ({"recommended": True}, ["combo"]),
+        ({"location_id": "beach", "max_nights": 2}, ["combo"]),
+    ],
+)
+def test_filters(client, catalog, trips, filters, expected):
+    # Entity IDs are given by their name in the catalog
+    params = {
+        name: catalog[value] if name.endswith("_id") else value
+        for name, value in filters.items()
+    }
+    assert listed(client, catalog["region"], **params) == [trips[t] for t in expected]
+
+
+def test_multiple_regions(client, catalog, trips):
+    response = client.get(
+        "/itineraries/",
+        params={
+            "regions": [catalog["region"], "Nowhere"],
+            "hotel_id": catalog["resort"],
+        },
+    )
+    assert [i["id"] for i in response.json()] == [trips["combo"], trips["beach"]]
+
+
+def test_sort_order(client, catalog, trips):
+    by_name = listed(client, catalog["region"], sort_by="name", sort_order="desc")
+    assert by_name == [trips["combo"], trips["city"], trips["beach"]]
+    by_nights = listed(client, catalog["region"], sort_by="duration_nights")
+    assert by_nights == [trips["city"], trips["combo"], trips["beach"]]
+
+
+def test_skip_and_limit_apply_after_filtering(client, catalog, trips):
+    page = listed(
+        client, catalog["region"], activity_id=catalog["dive"], skip=1, limit=1
+    )
+    assert page == [trips["beach"]]
+
+
+def test_nested_filters_compile_to_exists(db: Session):
+    query = ItineraryService._apply_filters(
+        db.query(Itinerary.id),
+        location_id=1,
+        hotel_id=1,
+        min_hotel_rating=4.0,
+        activity_id=1,
+        transfer_type=TransferTypeEnum.FERRY,
+    )
+    sql = str(query.statement.compile(db.get_bind()))
+    assert sql.count("EXISTS") >= 5
+    assert "JOIN" not in sql
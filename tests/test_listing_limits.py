@@ -0,0 +1,104 @@
+import msgpack
+import pytest
+
+import app.api.itineraries as itineraries_api
+from app.config import MAX_PAGE_SIZE
+
+
+@pytest.fixture
+def trips(catalog, create_itinerary, dangling_itinerary):
+    c = catalog
+    return [
+        create_itinerary("One", [(c["budget_hotel"], [c["walk"]], None)]),
+        create_itinerary(
+            "Two",
+            [
+                (c["budget_hotel"], [c["walk"]], None),
+                (c["resort"], [c["dive"]], c["ferry"]),
+            ],
+        ),
+        create_itinerary("Three", [(c["resort"], [c["dive"], c["dive"]], None)]),
+        dangling_itinerary,
+    ]
+
+
+@pytest.fixture
+def streamed(monkeypatch):
+    """
+    Stream every listing, one itinerary per chunk.
+    """
+    monkeypatch.setattr(itineraries_api, "STREAM_RESPONSE_ROWS", 0)
+    monkeypatch.setattr(itineraries_api, "STREAM_CHUNK_SIZE", 1)
+
+
+def listing(client, catalog, **params):
+    response = client.get(
+        "/itineraries/", params={"region": catalog["region"], **params}
+    )
+    assert response.status_code == 200, response.text
+    return response
+
+
+def test_page_size_is_capped(client):
+    response = client.get("/itineraries/", params={"limit": MAX_PAGE_SIZE + 1})
+    assert response.status_code == 422
+
+
+def test_oversized_responses_are_rejected(client, catalog, trips, monkeypatch):
+    monkeypatch.setattr(itineraries_api, "MAX_RESPONSE_ROWS", 5)
+    response = client.get("/itineraries/", params={"region": catalog["region"]})
+    assert response.status_code == 400
+    assert "Response too large" in response.json()["detail"]
+
+    # Fewer relationships make a smaller response
+    response = client.get(
+        "/itineraries/", params={"region": catalog["region"], "fields": "name"}
+    )
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize("shape", ["nested", "normalized"])
+@pytest.mark.parametrize("encoding", ["identity", "gzip"])
+def test_streamed_listings_match_built_ones(
+    client, catalog, trips, monkeypatch, shape, encoding
+):
+    built = listing(client, catalog, shape=shape).json()
+
+    monkeypatch.setattr(itineraries_api, "STREAM_RESPONSE_ROWS", 0)
+    monkeypatch.setattr(itineraries_api, "STREAM_CHUNK_SIZE", 1)
+    response = client.get(
+        "/itineraries/",
+        params={"region": catalog["region"], "shape": shape},
+        headers={"Accept-Encoding": encoding},
+    )
+    assert response.status_code == 200
+    assert "content-length" not in response.headers
+    assert response.json() == built
+
+
+@pytest.mark.parametrize("shape", ["nested", "normalized"])
+def test_streamed_msgpack_listings_match_json(client, catalog, trips, shape, streamed):
+    expected = listing(client, catalog, shape=shape).json()
+    response = listing(client, catalog, shape=shape, format="msgpack")
+    assert response.headers["content-type"] == "application/msgpack"
+    assert msgpack.unpackb(response.content, strict_map_key=False) == expected
+
+
+def test_streamed_normalized_listing_lists_each_entity_once(
+    client, catalog, trips, streamed
+):
+    body = listing(client, catalog, shape="normalized").json()
+    assert [i["id"] for i in body["itineraries"]] == sorted(trips)
+    assert set(body["hotels"]) == {str(catalog["budget_hotel"]), str(catalog["resort"])}
+    assert set(body["transfers"]) == {str(catalog["ferry"])}
+    assert set(body["activities"]) == {str(catalog["walk"]), str(catalog["dive"])}
+
+
+def test_streamed_normalized_listing_rejects_projections(
+    client, catalog, trips, streamed
+):
+    response = client.get(
+        "/itineraries/",
+        params={"region": catalog["region"], "shape": "normalized", "fields": "name"},
+    )
+    assert response.status_code == 400
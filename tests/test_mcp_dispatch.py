@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+from app.api.itineraries import router
+from app.mcp_dispatch import (
+    CREATE_ITINERARY,
+    LIST_ITINERARIES,
+    ToolCallError,
+    direct_tools,
+)
+
+
+def call(client, tool_name, arguments):
+    return json.loads(client.portal.call(direct_tools.call, tool_name, arguments, None))
+
+
+def test_arguments_are_derived_from_the_route(client):
+    route = next(r for r in router.routes if r.operation_id == "Get_All_Itineraries")
+    query = {param.name for param in route.dependant.query_params}
+    fields = set(LIST_ITINERARIES.parameters.model_fields)
+    # Including the parameters of dependencies, e.g. get_projection
+    assert fields == query | {"fields", "expand"}
+    assert CREATE_ITINERARY.locations["idempotency-key"] == "header"
+
+
+def test_invalid_arguments_are_reported_as_the_api_does(client):
+    with pytest.raises(ToolCallError) as e:
+        call(client, "Get_All_Itineraries", {"limit": -1})
+    assert e.value.status_code == 422
+    (error,) = client.get("/itineraries/", params={"limit": -1}).json()["detail"]
+    assert f'"loc":["query","limit"],"msg":"{error["msg"]}"' in str(e.value)
+
+
+def test_idempotency_key_header_is_honoured(client, itinerary_body):
+    arguments = {**itinerary_body, "idempotency-key": "mcp-direct-1"}
+    first = call(client, "Create_Itinerary", dict(arguments))
+    again = call(client, "Create_Itinerary", dict(arguments))
+    assert again["id"] == first["id"]
+
+    with pytest.raises(ToolCallError) as e:
+        call(client, "Create_Itinerary", {**arguments, "name": "Another"})
+    assert e.value.status_code == 422
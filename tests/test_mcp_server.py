@@ -0,0 +1,78 @@
+import asyncio
+import json
+
+import httpx
+
+from app.mcp_server import LazyFastApiMCP
+from app.middleware.rate_limit import MCP_CLIENT_HEADER, connection_client
+from main import app
+
+# LazyFastApiMCP overrides private methods of fastapi_mcp.FastApiMCP
+# (setup_server, _request, and the tools built by _build_tools). These tests
+# fail if an upgrade changes what the overrides rely on.
+
+
+def test_tools_are_built_on_first_use_and_cached(client, tmp_path):
+    cache_path = str(tmp_path / "mcp_tools.json")
+    mcp = LazyFastApiMCP(app, tools_cache_path=cache_path)
+    assert mcp._tools is None
+
+    names = {tool.name for tool in mcp.tools}
+    assert {"Get_All_Itineraries", "Create_Itinerary", "Get_All_Hotels"} <= names
+    assert mcp.operation_map["Create_Itinerary"]["method"] == "post"
+
+    with open(cache_path) as f:
+        assert {tool["name"] for tool in json.load(f)["tools"]} == names
+    cached = LazyFastApiMCP(app, tools_cache_path=cache_path)
+    assert [tool.name for tool in cached.tools] == [tool.name for tool in mcp.tools]
+    assert cached.operation_map == mcp.operation_map
+
+
+def test_proxied_calls_are_rate_limited_as_the_mcp_client(client):
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, json=[])
+
+    mcp = LazyFastApiMCP(
+        app,
+        dispatch="http",
+        tools_cache_path="",
+        http_client=httpx.AsyncClient(
+            transport=httpx.MockTransport(handler), base_url="http://apiserver"
+        ),
+    )
+
+    async def call():
+        token = connection_client.set("ip:203.0.113.7")
+        try:
+            return await mcp.call_tool("Get_All_Locations", {"limit": 1})
+        finally:
+            connection_client.reset(token)
+
+    result = asyncio.run(call())
+    assert json.loads(result[0].text) == []
+    (request,) = requests
+    assert request.url.path == "/locations/"
+    assert request.url.params["limit"] == "1"
+    assert request.headers[MCP_CLIENT_HEADER] == "ip:203.0.113.7"
+
+
+def test_direct_and_proxied_results_match(client):
+    direct = LazyFastApiMCP(app, dispatch="direct", tools_cache_path="")
+    proxied = LazyFastApiMCP(
+        app,
+        dispatch="http",
+        tools_cache_path="",
+        http_client=httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://apiserver"
+        ),
+    )
+    arguments = {"limit": 2, "fields": ["name", "region"]}
+
+    async def call(mcp):
+        (content,) = await mcp.call_tool("Get_All_Itineraries", dict(arguments))
+        return json.loads(content.text)
+
+    assert client.portal.call(call, direct) == client.portal.call(call, proxied)
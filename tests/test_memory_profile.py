@@ -0,0 +1,113 @@
+import tracemalloc
+
+import pytest
+
+import app.api.admin as admin_api
+from app.middleware.memory_profile import MemoryProfileMiddleware
+from app.services.memory_profile import (
+    memory_profiler,
+    profile_request,
+    profile_stage,
+    profile_step,
+)
+from main import app
+
+TOKEN = "test-admin-token"
+AUTHORIZED = {"Authorization": f"Bearer {TOKEN}"}
+
+
+@pytest.fixture
+def admin_token(monkeypatch):
+    monkeypatch.setattr(admin_api, "ADMIN_TOKEN", TOKEN)
+
+
+@pytest.fixture
+def profiling():
+    tracemalloc.start()
+    memory_profiler.reset()
+    try:
+        yield memory_profiler
+    finally:
+        tracemalloc.stop()
+        memory_profiler.reset()
+
+
+@pytest.mark.parametrize("method", ["GET", "DELETE"])
+def test_admin_endpoints_are_disabled_without_a_token(client, method):
+    response = client.request(method, "/admin/memory-profile", headers=AUTHORIZED)
+    assert response.status_code == 403
+
+
+@pytest.mark.parametrize("method", ["GET", "DELETE"])
+@pytest.mark.parametrize(
+    "authorization", [None, "Bearer wrong", f"Basic {TOKEN}", TOKEN]
+)
+def test_admin_endpoints_require_the_token(client, admin_token, method, authorization):
+    headers = {"Authorization": authorization} if authorization else {}
+    response = client.request(method, "/admin/memory-profile", headers=headers)
+    assert response.status_code == 401
+    assert response.headers["WWW-Authenticate"] == "Bearer"
+
+
+def test_profile_requires_profiling(client, admin_token):
+    response = client.get("/admin/memory-profile", headers=AUTHORIZED)
+    assert response.status_code == 404
+
+
+def allocate_temporary():
+    return bytearray(1 << 20)
+
+
+def call_sites(report):
+    return {
+        site["location"].rsplit(":", 1)[0]: site["bytes"]
+        for site in report["operations"]["op"]["stages"]["stage"]["top_call_sites"]
+    }
+
+
+@pytest.mark.parametrize("step", [True, False])
+def test_steps_attribute_temporary_allocations(profiling, step):
+    with profile_request("op"):
+        with profile_stage("stage"):
+            temporary = allocate_temporary()
+            if step:
+                profile_step()
+            del temporary
+
+    report = profiling.report()
+    stage = report["operations"]["op"]["stages"]["stage"]
+    assert stage["peak_bytes_max"] >= 1 << 20
+    assert stage["retained_bytes_mean"] < 1 << 20
+    sites = call_sites(report)
+    if step:
+        assert sites[__file__] >= 1 << 20
+    else:
+        # Freed before the stage ended, and never seen
+        assert sites.get(__file__, 0) < 1 << 20
+
+
+def test_requests_are_profiled_by_operation_and_stage(
+    client, catalog, create_itinerary, admin_token, profiling, monkeypatch
+):
+    # The middleware is only installed with MEMORY_PROFILING=1
+    monkeypatch.setattr(
+        app, "middleware_stack", MemoryProfileMiddleware(app.middleware_stack)
+    )
+    c = catalog
+    create_itinerary("Profiled", [(c["resort"], [c["dive"]], None)])
+    response = client.get("/itineraries/", params={"region": c["region"]})
+    assert response.status_code == 200
+
+    report = client.get("/admin/memory-profile", headers=AUTHORIZED).json()
+    operation = report["operations"]["Get_All_Itineraries"]
+    assert operation["requests"] == 1
+    assert set(operation["stages"]) == {"hydrate", "serialize", "encode"}
+    # The JSON text is freed once encoded, but still attributed
+    encode = operation["stages"]["encode"]
+    assert encode["allocated_bytes_by_library"]["json"] >= len(response.content)
+
+    assert client.delete("/admin/memory-profile", headers=AUTHORIZED).status_code == 204
+    assert (
+        client.get("/admin/memory-profile", headers=AUTHORIZED).json()["operations"]
+        == {}
+    )
@@ -0,0 +1,87 @@
+import uuid
+
+import pytest
+
+from app.models.models import JobLease
+from app.services import ranking_service
+from app.services.ranking_service import RankingService
+from app.services.sync import claim_lease
+
+
+def ranking(db, catalog):
+    db.expire_all()
+    return {
+        r.itinerary_id: r
+        for r in RankingService.get_top_ranked(db, region=catalog["region"])
+    }
+
+
+@pytest.fixture
+def trips(catalog, create_itinerary):
+    c = catalog
+    return {
+        # 40 + 5 a night
+        "walker": create_itinerary("Walker", [(c["budget_hotel"], [c["walk"]], None)]),
+        # 200 + 90 + 15 a night, recommended by the editors
+        "diver": create_itinerary(
+            "Diver", [(c["resort"], [c["dive"]], c["ferry"])], is_recommended=True
+        ),
+    }
+
+
+def test_rebuild_ranks_by_value_and_editorial_score(client, db, catalog, trips):
+    assert RankingService.rebuild_rankings(db) >= 2
+
+    ranked = ranking(db, catalog)
+    walker, diver = ranked[trips["walker"]], ranked[trips["diver"]]
+    assert walker.price_per_night == 45.0
+    assert diver.price_per_night == 305.0
+    assert walker.value == 1.0
+    assert diver.value == pytest.approx(45 / 305)
+    # Better value outweighs the editorial pick
+    assert walker.rank < diver.rank
+
+    response = client.get(
+        "/itineraries/recommended", params={"region": catalog["region"]}
+    )
+    assert response.status_code == 200
+    assert [r["itinerary"]["id"] for r in response.json()] == [
+        trips["walker"],
+        trips["diver"],
+    ]
+
+
+def test_dangling_references_are_not_priced(db, catalog, trips, dangling_itinerary):
+    RankingService.rebuild_rankings(db)
+
+    # Budget hotel, walk and dive over two nights; the missing hotel, transfer
+    # and activity of day 2 are left out
+    dangling = ranking(db, catalog)[dangling_itinerary]
+    assert dangling.price_per_night == 67.5
+    assert dangling.diversity > 0
+
+
+def test_an_itinerary_that_fails_is_left_out(db, catalog, trips, monkeypatch, capsys):
+    rollup = ranking_service._rollup
+
+    def failing(itinerary, rows, snapshot):
+        if itinerary.id == trips["diver"]:
+            raise KeyError(itinerary.id)
+        return rollup(itinerary, rows, snapshot)
+
+    monkeypatch.setattr(ranking_service, "_rollup", failing)
+    RankingService.rebuild_rankings(db)
+
+    assert list(ranking(db, catalog)) == [trips["walker"]]
+    assert f"Could not rank itinerary {trips['diver']}" in capsys.readouterr().err
+
+
+def test_lease_is_held_until_it_expires(db):
+    name = f"test-{uuid.uuid4().hex}"
+    assert claim_lease(db, name, 60)
+    assert not claim_lease(db, name, 60)
+
+    db.get(JobLease, name).expires_at = 0
+    db.commit()
+    assert claim_lease(db, name, 60)
+    assert not claim_lease(db, name, 60)
@@ -0,0 +1,84 @@
+from collections import OrderedDict
+
+import pytest
+
+from app.middleware import rate_limit
+from app.middleware.rate_limit import RateLimiter, rate_limiter
+
+
+@pytest.fixture
+def limited(client, monkeypatch):
+    """
+    Enable the rate limiter with a small budget: one listing (cost 4) or
+    four single reads per client and operation, refilled at one token per
+    second.
+    """
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(rate_limiter, "rate", 1.0)
+    monkeypatch.setattr(rate_limiter, "burst", 4.0)
+    monkeypatch.setattr(rate_limiter, "_buckets", OrderedDict())
+    monkeypatch.setattr(rate_limiter, "_in_flight", {})
+    return rate_limiter
+
+
+def test_exceeding_the_budget_returns_429_with_retry_after(client, limited):
+    assert client.get("/itineraries/", params={"limit": 1}).status_code == 200
+
+    response = client.get("/itineraries/", params={"limit": 1})
+    assert response.status_code == 429
+    # Four tokens at one per second
+    assert response.headers["Retry-After"] == "4"
+    assert "retry after 4 seconds" in response.json()["detail"]
+
+    # Each operation has a budget of its own
+    assert client.get("/hotels/").status_code == 200
+
+
+def test_unlimited_routes_are_not_counted(client, limited):
+    for _ in range(10):
+        assert client.get("/docs").status_code == 200
+
+
+def test_cache_hits_are_refunded(client, limited, catalog, create_itinerary):
+    c = catalog
+    itinerary_id = create_itinerary("Cached", [(c["resort"], [c["dive"]], None)])
+    statuses = [
+        client.get(f"/itineraries/{itinerary_id}").status_code for _ in range(8)
+    ]
+    # One miss at full cost, then hits at a fifth of it
+    assert statuses == [200] * 8
+
+
+def test_requests_are_limited_per_client():
+    limiter = RateLimiter(rate=1.0, burst=2.0)
+    assert limiter.acquire("ip:a", "Get_All_Hotels") is None
+    limiter.release("ip:a", "Get_All_Hotels")
+    assert limiter.acquire("ip:a", "Get_All_Hotels") is None
+    limiter.release("ip:a", "Get_All_Hotels")
+    assert limiter.acquire("ip:a", "Get_All_Hotels") == pytest.approx(1.0, abs=0.1)
+    assert limiter.acquire("ip:b", "Get_All_Hotels") is None
+
+
+def test_in_flight_requests_are_capped():
+    limiter = RateLimiter(burst=100, concurrency=3, operation_concurrency=2)
+    assert limiter.acquire("ip:a", "Get_All_Hotels") is None
+    assert limiter.acquire("ip:a", "Get_All_Hotels") is None
+    # Per operation
+    assert limiter.acquire("ip:a", "Get_All_Hotels") == 1.0
+    assert limiter.acquire("ip:a", "Get_All_Activities") is None
+    # Per client, across operations
+    assert limiter.acquire("ip:a", "Get_All_Locations") == 1.0
+    assert limiter.acquire("ip:b", "Get_All_Hotels") is None
+
+    limiter.release("ip:a", "Get_All_Hotels")
+    assert limiter.acquire("ip:a", "Get_All_Hotels") is None
+
+
+def test_mcp_client_header_is_only_trusted_from_internal_requests():
+    internal = {
+        "client": rate_limit.INTERNAL_CLIENT,
+        "headers": [(rate_limit.MCP_CLIENT_HEADER.encode(), b"ip:203.0.113.7")],
+    }
+    assert rate_limit.client_key(internal) == "ip:203.0.113.7"
+    external = {**internal, "client": ("198.51.100.1", 1234)}
+    assert rate_limit.client_key(external) == "ip:198.51.100.1"
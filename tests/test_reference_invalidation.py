@@ -0,0 +1,100 @@
+from conftest import MISSING_ID
+
+
+def get(client, path, **params):
+    response = client.get(path, params=params)
+    assert response.status_code == 200, response.text
+    return response
+
+
+def test_updating_an_activity_invalidates_only_itineraries_using_it(
+    client, catalog, create_itinerary
+):
+    c = catalog
+    at_resort = create_itinerary("Resort", [(c["resort"], [c["dive"]], None)])
+    elsewhere = create_itinerary("Town", [(c["budget_hotel"], [c["walk"]], None)])
+    for itinerary_id in (at_resort, elsewhere):
+        get(client, f"/itineraries/{itinerary_id}")
+        assert get(client, f"/itineraries/{itinerary_id}").headers["X-Cache"] == "HIT"
+
+    response = client.put(
+        f"/activities/{c['dive']}",
+        json={"name": "Wreck Dive", "location_id": c["beach"], "price": 120},
+    )
+    assert response.status_code == 200
+
+    updated = get(client, f"/itineraries/{at_resort}")
+    assert updated.headers["X-Cache"] == "MISS"
+    (day,) = updated.json()["days"]
+    assert day["activities"][0]["name"] == "Wreck Dive"
+    assert get(client, f"/itineraries/{elsewhere}").headers["X-Cache"] == "HIT"
+
+
+def test_batch_upserts_refresh_listings(client, catalog, create_itinerary):
+    c = catalog
+    itinerary_id = create_itinerary("Dive Trip", [(c["resort"], [c["dive"]], None)])
+    get(client, "/itineraries/", region=c["region"])
+    assert get(client, "/itineraries/", region=c["region"]).headers["X-Cache"] == "HIT"
+
+    response = client.post(
+        "/activities/batch",
+        json=[
+            {"id": c["dive"], "name": "Night Dive", "location_id": c["beach"]},
+            {"name": "Snorkel", "location_id": c["beach"]},
+        ],
+    )
+    assert response.status_code == 200
+
+    listing = get(client, "/itineraries/", region=c["region"])
+    assert listing.headers["X-Cache"] == "MISS"
+    (itinerary,) = listing.json()
+    assert itinerary["id"] == itinerary_id
+    assert itinerary["days"][0]["activities"][0]["name"] == "Night Dive"
+
+
+def test_new_reference_data_is_listed(client, catalog):
+    get(client, "/hotels/", limit=500)
+    response = client.post(
+        "/hotels/", json={"name": "Hostel", "location_id": catalog["town"]}
+    )
+    hotels = get(client, "/hotels/", limit=500).json()
+    assert response.json()["id"] in {hotel["id"] for hotel in hotels}
+
+
+def test_writes_referencing_missing_locations_are_rejected(client, catalog):
+    response = client.post(
+        "/hotels/", json={"name": "Nowhere", "location_id": MISSING_ID}
+    )
+    assert response.status_code == 400
+    assert str(MISSING_ID) in response.json()["detail"]
+
+    response = client.put(
+        f"/activities/{catalog['walk']}",
+        json={"name": "Walk", "location_id": MISSING_ID},
+    )
+    assert response.status_code == 400
+
+    response = client.post(
+        "/transfers/batch",
+        json=[
+            {
+                "origin_location_id": catalog["town"],
+                "destination_location_id": MISSING_ID,
+                "transfer_type": "bus",
+            },
+            {
+                "origin_location_id": MISSING_ID + 1,
+                "destination_location_id": catalog["beach"],
+                "transfer_type": "bus",
+            },
+        ],
+    )
+    assert response.status_code == 400
+    assert f"{MISSING_ID}, {MISSING_ID + 1}" in response.json()["detail"]
+
+    # Nothing was written
+    transfers = client.get("/transfers/", params={"limit": 500}).json()
+    assert MISSING_ID not in {t["destination_location_id"] for t in transfers}
+    activities = client.get("/activities/", params={"limit": 500}).json()
+    (walk,) = [a for a in activities if a["id"] == catalog["walk"]]
+    assert walk["location_id"] == catalog["town"]
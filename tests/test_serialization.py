@@ -0,0 +1,43 @@
+from conftest import MISSING_ID
+
+
+def test_nested_shape_skips_dangling_references(client, catalog, dangling_itinerary):
+    response = client.get(f"/itineraries/{dangling_itinerary}")
+    assert response.status_code == 200, response.text
+    valid, broken = response.json()["days"]
+    assert [a["id"] for a in valid["activities"]] == [catalog["walk"]]
+    assert broken["hotel_stay"]["hotel_id"] == MISSING_ID
+    assert broken["transfer"] is None
+    assert [a["id"] for a in broken["activities"]] == [catalog["dive"]]
+
+
+def test_normalized_shape_keeps_dangling_ids_without_entries(
+    client, catalog, dangling_itinerary
+):
+    response = client.get(
+        f"/itineraries/{dangling_itinerary}", params={"shape": "normalized"}
+    )
+    assert response.status_code == 200, response.text
+    body = response.json()
+    valid, broken = body["itineraries"][0]["days"]
+    assert broken["hotel_id"] == MISSING_ID
+    assert broken["transfer_id"] == MISSING_ID
+    assert broken["activity_ids"] == [MISSING_ID, catalog["dive"]]
+    assert set(body["hotels"]) == {str(catalog["budget_hotel"])}
+    assert body["transfers"] == {}
+    assert set(body["activities"]) == {str(catalog["walk"]), str(catalog["dive"])}
+
+
+def test_listings_including_a_dangling_itinerary_still_load(
+    client, catalog, create_itinerary, dangling_itinerary
+):
+    c = catalog
+    valid = create_itinerary("Valid", [(c["resort"], [c["dive"]], None)])
+    for shape in ("nested", "normalized"):
+        response = client.get(
+            "/itineraries/", params={"region": c["region"], "shape": shape}
+        )
+        assert response.status_code == 200, response.text
+        body = response.json()
+        itineraries = body if shape == "nested" else body["itineraries"]
+        assert {i["id"] for i in itineraries} == {valid, dangling_itinerary}
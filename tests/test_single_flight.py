@@ -0,0 +1,128 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.services import events
+from app.services.itinerary_service import ItineraryService
+from app.services.single_flight import SingleFlight, itinerary_reads
+
+CALLERS = 8
+
+
+def run_concurrently(flight, key, fn, callers=CALLERS):
+    """
+    Call `flight.do(key, fn)` from several threads at once, with `fn` held
+    until every caller has arrived. Returns the results or exceptions.
+    """
+    arrived = threading.Semaphore(0)
+    release = threading.Event()
+
+    def held():
+        release.wait(5)
+        return fn()
+
+    def call():
+        arrived.release()
+        try:
+            return flight.do(key, held)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(callers) as pool:
+        futures = [pool.submit(call) for _ in range(callers)]
+        for _ in range(callers):
+            arrived.acquire()
+        # Let the callers reach the flight before the leader finishes
+        time.sleep(0.1)
+        release.set()
+        return [future.result() for future in futures]
+
+
+def test_identical_calls_share_one_computation():
+    flight = SingleFlight()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"value": len(calls)}
+
+    results = run_concurrently(flight, "key", compute)
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert len(flight) == 0
+
+
+def test_callers_share_the_exception():
+    flight = SingleFlight()
+    calls = []
+
+    def fail():
+        calls.append(1)
+        raise RuntimeError("boom")
+
+    results = run_concurrently(flight, "key", fail)
+    assert len(calls) == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+    # Failures aren't remembered
+    assert flight.do("key", lambda: "ok") == "ok"
+
+
+def test_different_keys_are_not_coalesced():
+    flight = SingleFlight()
+    assert [flight.do(key, lambda key=key: key) for key in "ab"] == ["a", "b"]
+
+
+def test_calls_after_a_change_start_a_fresh_computation():
+    started = threading.Event()
+    release = threading.Event()
+
+    def stale():
+        started.set()
+        release.wait(5)
+        return "stale"
+
+    with ThreadPoolExecutor(1) as pool:
+        first = pool.submit(itinerary_reads.do, "test-key", stale)
+        assert started.wait(5)
+        events.publish(events.ITINERARY, [1])
+        try:
+            assert itinerary_reads.do("test-key", lambda: "fresh") == "fresh"
+        finally:
+            release.set()
+        # The call in flight still completes for its own callers
+        assert first.result() == "stale"
+
+
+@pytest.mark.parametrize("shape", ["nested", "normalized"])
+def test_concurrent_reads_of_an_itinerary_query_once(
+    client, catalog, create_itinerary, monkeypatch, shape
+):
+    c = catalog
+    itinerary_id = create_itinerary("Shared", [(c["resort"], [c["dive"]], None)])
+    calls = []
+    release = threading.Event()
+    get_itinerary_by_id = ItineraryService.get_itinerary_by_id
+
+    def held(*args, **kwargs):
+        calls.append(1)
+        release.wait(5)
+        return get_itinerary_by_id(*args, **kwargs)
+
+    monkeypatch.setattr(ItineraryService, "get_itinerary_by_id", held)
+
+    def get(_):
+        return client.get(f"/itineraries/{itinerary_id}", params={"shape": shape})
+
+    with ThreadPoolExecutor(CALLERS) as pool:
+        responses = pool.map(get, range(CALLERS))
+        # Let every request reach the flight before the leader's query ends
+        time.sleep(0.2)
+        release.set()
+        responses = list(responses)
+
+    assert len(calls) == 1
+    assert {r.status_code for r in responses} == {200}
+    assert len({r.content for r in responses}) == 1
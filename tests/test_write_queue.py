@@ -0,0 +1,136 @@
+import threading
+import uuid
+
+import pytest
+
+from conftest import MISSING_ID
+
+import app.api.itineraries as itineraries_api
+from app.models.models import Itinerary
+from app.schemas.schemas import ItineraryCreate, WriteStatus
+from app.services import write_queue
+from app.services.idempotency import CreateRequestKeys
+from app.services.itinerary_service import ItineraryService
+from app.services.write_queue import ItineraryWriteQueue, WriteQueueFull
+
+
+def submit(queue, itinerary_body, name, **changes):
+    itinerary = ItineraryCreate(**{**itinerary_body, "name": name, **changes})
+    return queue.submit(itinerary, CreateRequestKeys(itinerary, None))
+
+
+@pytest.fixture
+def batches(monkeypatch):
+    """
+    The sizes of the batches the writer commits.
+    """
+    sizes = []
+    create_itineraries = ItineraryService.create_itineraries
+
+    def recording(db, requests):
+        sizes.append(len(requests))
+        return create_itineraries(db, requests)
+
+    monkeypatch.setattr(ItineraryService, "create_itineraries", recording)
+    return sizes
+
+
+def test_queued_creates_are_written_in_batches_in_order(db, itinerary_body, batches):
+    queue = ItineraryWriteQueue(batch_size=3)
+    tickets = [submit(queue, itinerary_body, f"Trip {i}") for i in range(7)]
+    assert len(queue) == 7
+
+    queue.start()
+    # Stopping drains everything queued first
+    queue.stop()
+
+    assert len(queue) == 0
+    assert batches == [3, 3, 1]
+    ids = [ticket.future.result() for ticket in tickets]
+    assert ids == sorted(ids)
+    names = {i.id: i.name for i in db.query(Itinerary).filter(Itinerary.id.in_(ids))}
+    assert [names[i] for i in ids] == [f"Trip {i}" for i in range(7)]
+
+
+def test_a_failing_request_does_not_fail_its_batch(db, itinerary_body, batches):
+    queue = ItineraryWriteQueue(batch_size=10)
+    days = [{**itinerary_body["days"][0], "hotel_id": MISSING_ID}]
+    tickets = [
+        submit(queue, itinerary_body, "Before"),
+        submit(queue, itinerary_body, "Broken", days=days, duration_nights=1),
+        submit(queue, itinerary_body, "After"),
+    ]
+    queue.start()
+    queue.stop()
+
+    # The batch failed and was retried one by one
+    assert batches == [3]
+    before, broken, after = (ticket.to_dict() for ticket in tickets)
+    assert before["status"] == after["status"] == WriteStatus.DONE
+    assert broken["status"] == WriteStatus.FAILED
+    assert str(MISSING_ID) in broken["detail"]
+    assert before["itinerary_id"] < after["itinerary_id"]
+
+
+def test_a_full_queue_rejects_with_retry_after(itinerary_body):
+    queue = ItineraryWriteQueue(max_size=2)
+    submit(queue, itinerary_body, "One")
+    submit(queue, itinerary_body, "Two")
+    with pytest.raises(WriteQueueFull) as e:
+        submit(queue, itinerary_body, "Three")
+    assert e.value.retry_after >= 1
+
+
+@pytest.fixture
+def write_behind(client, monkeypatch):
+    monkeypatch.setattr(itineraries_api, "WRITE_BEHIND", True)
+    queue = write_queue.itinerary_write_queue
+    queue.start()
+    yield queue
+    queue.stop()
+
+
+def test_create_waits_for_the_queued_write(client, itinerary_body, write_behind):
+    headers = {"Idempotency-Key": uuid.uuid4().hex}
+    created = client.post("/itineraries/", json=itinerary_body, headers=headers)
+    assert created.status_code == 201
+    assert created.json() == client.get(f"/itineraries/{created.json()['id']}").json()
+
+    replayed = client.post("/itineraries/", json=itinerary_body, headers=headers)
+    assert replayed.status_code == 201
+    assert replayed.headers["Idempotent-Replayed"] == "true"
+    assert replayed.json() == created.json()
+
+
+def test_create_returns_a_ticket_when_the_write_is_slow(
+    client, itinerary_body, write_behind, monkeypatch
+):
+    release = threading.Event()
+    create_itineraries = ItineraryService.create_itineraries
+
+    def slow(db, requests):
+        release.wait(5)
+        return create_itineraries(db, requests)
+
+    monkeypatch.setattr(ItineraryService, "create_itineraries", slow)
+
+    response = client.post("/itineraries/", params={"wait": 0}, json=itinerary_body)
+    assert response.status_code == 202
+    ticket = response.json()
+    assert ticket["status"] == WriteStatus.PENDING
+    assert response.headers["Location"] == f"/itineraries/writes/{ticket['ticket_id']}"
+
+    release.set()
+    itinerary_id = write_behind.get_ticket(ticket["ticket_id"]).future.result(5)
+    status = client.get(response.headers["Location"]).json()
+    assert status["status"] == WriteStatus.DONE
+    assert status["itinerary_id"] == itinerary_id
+
+
+def test_missing_references_are_rejected_before_queueing(
+    client, itinerary_body, write_behind
+):
+    body = {**itinerary_body, "days": [{"day_number": 1, "hotel_id": MISSING_ID}]}
+    response = client.post("/itineraries/", json=body)
+    assert response.status_code == 400
+    assert len(write_behind) == 0